@@ -0,0 +1,466 @@
+"""
+Shared analytics layer: the aggregates the dashboard pages compute from the
+processed supplier frame
+
+Every function is pure (frame + parameters -> small result frame) and
+memoized in a process-wide LRU cache. Cache keys are built from a full
+content hash of the input frame, so a widget change only recomputes
+the aggregates whose input frame or parameters actually changed. A page
+that reads several aggregates of the same frame hashes it once with
+fingerprint() and passes data_fingerprint= to each of them.
+"""
+import functools
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from schema import STATUS_LATE, STATUS_ON_TIME
+
+# Upper bound on the memory held by cached results, in MB
+CACHE_MAX_MB = float(os.environ.get("ANALYTICS_CACHE_MAX_MB", "64"))
+
+
+def fingerprint(df):
+    """
+    Content fingerprint of a DataFrame
+
+    Digest of the shape, column names and dtypes and of the row hashes of
+    pd.util.hash_pandas_object (every cell and the index), so any edit gives a
+    new key, even one that leaves the column totals unchanged (two amounts
+    swapped, a supplier renamed). About 70 ms on a million rows.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((df.shape, list(df.columns), [str(t) for t in df.dtypes])).encode())
+    if len(df):
+        digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _result_size(value):
+    """Approximate memory held by a cached result, in bytes"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, bytes):
+        return len(value)
+    return 1024
+
+
+def _copy_result(value):
+    """Cached results are shared between sessions: hand out copies"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+class ResultCache:
+    """Thread-safe LRU cache bounded by the total size of the stored results"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key, value):
+        size = _result_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def size_bytes(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._entries)
+
+
+cache = ResultCache(int(CACHE_MAX_MB * 1024 * 1024))
+
+
+def cached_aggregate(func):
+    """
+    Memoize an aggregate whose first argument is a DataFrame
+    The key is (function, fingerprint of the frame, other arguments);
+    data_fingerprint=fingerprint(df), computed once by the caller, saves
+    hashing the frame again for every aggregate read from it
+    """
+    @functools.wraps(func)
+    def wrapper(df, *args, data_fingerprint=None, **kwargs):
+        data_fingerprint = data_fingerprint if data_fingerprint is not None else fingerprint(df)
+        key = (func.__qualname__, data_fingerprint, args, tuple(sorted(kwargs.items())))
+        entry = cache.get(key)
+        if entry is None:
+            result = func(df, *args, **kwargs)
+            cache.put(key, result)
+            return _copy_result(result)
+        return _copy_result(entry[0])
+
+    wrapper.uncached = func
+    return wrapper
+
+
+@cached_aggregate
+def supplier_delay_means(df):
+    """Average payment delay per supplier"""
+    return df.groupby('Nom du fournisseur', observed=True)['Délai de paiement'].mean().reset_index()
+
+
+@cached_aggregate
+def supplier_amount_totals(df):
+    """Total order amount per supplier"""
+    return df.groupby('Nom du fournisseur', observed=True)['Montant de la commande'].sum().reset_index()
+
+
+@cached_aggregate
+def supplier_penalty_totals(df):
+    """Total late payment penalties per supplier"""
+    return df.groupby('Nom du fournisseur', observed=True)['Montant pénalité'].sum().reset_index()
+
+
+@cached_aggregate
+def supplier_status_counts(df):
+    """Number of invoices per supplier and payment status"""
+    return df.groupby(['Nom du fournisseur', 'Statut du paiement'], observed=True).size().reset_index(name='count')
+
+
+@cached_aggregate
+def supplier_late_counts(df):
+    """Number of late invoices per supplier"""
+    late = df[df['Statut du paiement'] == STATUS_LATE]
+    return late.groupby('Nom du fournisseur', observed=True).size().reset_index(name='count')
+
+
+@cached_aggregate
+def supplier_kpis(df):
+    """
+    Per-supplier KPIs of the supplier dashboard, in a single groupby pass:
+    totals, average delay, penalties, unpaid share and late payment rate
+    """
+    unpaid = df['Date de paiement'].isna()
+    work = pd.DataFrame({
+        'Nom du fournisseur': df['Nom du fournisseur'],
+        'Montant de la commande': df['Montant de la commande'],
+        'Délai de paiement': df['Délai de paiement'],
+        'Montant pénalité': df['Montant pénalité'],
+        'Non payée': unpaid.astype(np.float64),
+        'En retard': (df['Statut du paiement'] == STATUS_LATE).astype(np.int64),
+        'Montant non payé': df['Montant de la commande'].where(unpaid, 0.0)
+    })
+
+    kpis = work.groupby('Nom du fournisseur', observed=True).agg(
+        **{
+            'Montant total': ('Montant de la commande', 'sum'),
+            'Délai moyen de paiement': ('Délai de paiement', 'mean'),
+            'Pénalités totales': ('Montant pénalité', 'sum'),
+            'Pourcentage non payé': ('Non payée', 'mean'),
+            'Nombre de commandes': ('Montant de la commande', 'size'),
+            'Commandes en retard': ('En retard', 'sum'),
+            'Montant non payé': ('Montant non payé', 'sum')
+        }
+    ).reset_index()
+
+    kpis['Pourcentage non payé'] = kpis['Pourcentage non payé'] * 100
+    kpis['Taux de retard (%)'] = (kpis['Commandes en retard'] / kpis['Nombre de commandes'] * 100).round(1)
+    return kpis
+
+
+@cached_aggregate
+def supplier_risk_scores(kpis, standard_delay=60):
+    """
+    Risk score (0-100) and category of each supplier from supplier_kpis:
+    40% late payment rate, 30% unpaid share, 30% average delay beyond the standard delay
+    """
+    scored = kpis.copy()
+    excess_delay = (scored['Délai moyen de paiement'] - standard_delay).clip(lower=0).fillna(0)
+    scored['Score de risque'] = (
+        scored['Taux de retard (%)'] * 0.4 +
+        scored['Pourcentage non payé'] * 0.3 +
+        (excess_delay / 10) * 0.3
+    ).round(1)
+    scored['Catégorie de risque'] = pd.cut(
+        scored['Score de risque'],
+        bins=[-np.inf, 15, 35, np.inf],
+        labels=['Faible', 'Moyen', 'Élevé'],
+        right=False
+    )
+    return scored
+
+
+@cached_aggregate
+def supplier_risk(df):
+    """Risk matrix of the audit summary: exposure, average delay and late rate per supplier"""
+    work = pd.DataFrame({
+        'Nom du fournisseur': df['Nom du fournisseur'],
+        'Montant de la commande': df['Montant de la commande'],
+        'Délai de paiement': df['Délai de paiement'],
+        'En retard': (df['Statut du paiement'] == STATUS_LATE).astype(np.float64) * 100
+    })
+    risk = work.groupby('Nom du fournisseur', observed=True).agg(
+        **{
+            'Exposition financière': ('Montant de la commande', 'sum'),
+            'Délai moyen': ('Délai de paiement', 'mean'),
+            'Taux de retard (%)': ('En retard', 'mean')
+        }
+    ).reset_index()
+    return risk
+
+
+# Compliance rates (%) at or above which the audit position is favorable / neutral
+AUDIT_FAVORABLE_RATE = 90
+AUDIT_NEUTRAL_RATE = 70
+
+
+def audit_position(compliance_rate):
+    """Audit position of a compliance rate (%): favorable, neutral or alert"""
+    if compliance_rate >= AUDIT_FAVORABLE_RATE:
+        return "Position favorable"
+    if compliance_rate >= AUDIT_NEUTRAL_RATE:
+        return "Position neutre"
+    return "Position d'alerte"
+
+
+@cached_aggregate
+def audit_summary(df):
+    """
+    Key audit indicators of the invoices (dict keyed by indicator label): invoice,
+    paid and late counts, compliance rate (% of the paid invoices paid on time),
+    total penalties, supplier with the most late invoices ("N/A" if none) and
+    audit position
+    """
+    total_invoices = len(df)
+    paid_invoices = int(df['Délai de paiement'].notna().sum())
+    non_compliant_invoices = int((df['Statut du paiement'] == STATUS_LATE).sum())
+    compliance_rate = (
+        (paid_invoices - non_compliant_invoices) / paid_invoices * 100 if paid_invoices > 0 else 0
+    )
+
+    worst_supplier = "N/A"
+    if non_compliant_invoices > 0:
+        late_by_supplier = supplier_late_counts.uncached(df)
+        worst_supplier = late_by_supplier.loc[late_by_supplier['count'].idxmax(), 'Nom du fournisseur']
+
+    return {
+        "Nombre total de factures": total_invoices,
+        "Factures payées": paid_invoices,
+        "Factures non conformes": non_compliant_invoices,
+        "Taux de conformité": compliance_rate,
+        "Total des pénalités": float(df['Montant pénalité'].sum()),
+        "Fournisseur avec le plus de retards": worst_supplier,
+        "Position d'audit": audit_position(compliance_rate)
+    }
+
+
+# Period granularities of period_summary: code -> name of the period column
+PERIOD_COLUMNS = {'D': 'Jour', 'W': 'Semaine', 'M': 'Mois', 'Q': 'Trimestre'}
+
+# strftime format of the period labels (weeks are labelled by their Monday)
+PERIOD_FORMATS = {'D': '%Y-%m-%d', 'W': '%Y-%m-%d', 'M': '%Y-%m', 'Q': None}
+
+
+def period_start(dates, period='M'):
+    """
+    Start of the day, week (Monday), month or quarter of each date, truncated
+    on the datetime64 values without going through pandas Period objects
+    """
+    values = dates.to_numpy()
+    if period == 'D':
+        starts = values.astype('datetime64[D]')
+    elif period == 'W':
+        days = values.astype('datetime64[D]')
+        # 1970-01-01 is a Thursday: (days + 3) % 7 is the weekday, Monday = 0
+        starts = days - ((days.astype(np.int64) + 3) % 7).astype('timedelta64[D]')
+    elif period in ('M', 'Q'):
+        starts = values.astype('datetime64[M]')
+        if period == 'Q':
+            starts = starts - (starts.astype(np.int64) % 3).astype('timedelta64[M]')
+    else:
+        raise ValueError(f"Unknown period {period!r}, expected one of {list(PERIOD_COLUMNS)}")
+    return pd.Series(starts.astype('datetime64[ns]'), index=dates.index)
+
+
+def period_labels(starts, period='M'):
+    """Display label of each period start: 2024-03-18, 2024-03 or 2024-T1"""
+    if period == 'Q':
+        return starts.dt.year.astype(str) + '-T' + starts.dt.quarter.astype(str)
+    return starts.dt.strftime(PERIOD_FORMATS[period])
+
+
+@cached_aggregate
+def period_summary(df, date_column='Date de commande', period='M'):
+    """
+    One row per day, week, month or quarter of date_column (rows without a date
+    are left out), computed in a single groupby over the period start: invoice
+    count, paid and late counts, compliance rate (% of the paid invoices paid on
+    time, unpaid invoices are not judged yet), average delay, penalty total and amount
+    The period column is named after the granularity (PERIOD_COLUMNS)
+    """
+    dates = pd.to_datetime(df[date_column])
+    valid = dates.notna()
+    work = pd.DataFrame({
+        'Période': period_start(dates[valid], period),
+        'Délai de paiement': df.loc[valid, 'Délai de paiement'],
+        'En retard': (df.loc[valid, 'Statut du paiement'] == STATUS_LATE).astype(np.int64)
+    })
+    for column in ['Montant pénalité', 'Montant de la commande']:
+        work[column] = df.loc[valid, column] if column in df.columns else 0.0
+
+    summary = work.groupby('Période').agg(
+        **{
+            'Nombre de factures': ('En retard', 'size'),
+            'Factures payées': ('Délai de paiement', 'count'),
+            'Factures en retard': ('En retard', 'sum'),
+            'Délai moyen': ('Délai de paiement', 'mean'),
+            'Montant pénalité': ('Montant pénalité', 'sum'),
+            'Montant total': ('Montant de la commande', 'sum')
+        }
+    ).reset_index()
+
+    summary['Taux de conformité'] = (
+        (summary['Factures payées'] - summary['Factures en retard']) / summary['Factures payées'] * 100
+    )
+    summary['Période'] = period_labels(summary['Période'], period)
+    return summary.rename(columns={'Période': PERIOD_COLUMNS[period]})
+
+
+def monthly_summary(df, date_column='Date de commande', data_fingerprint=None):
+    """period_summary by month ('Mois' column, labelled YYYY-MM)"""
+    return period_summary(df, date_column, 'M', data_fingerprint=data_fingerprint)
+
+
+# Granularities the monthly summary table (database.get_supplier_month_summary) can serve
+SUMMARY_PERIODS = ('M', 'Q')
+
+
+def month_window(date_from, date_to, first=None, last=None):
+    """
+    Months of the summary table covering exactly the orders dated from
+    date_from to date_to: (month_from, month_to), None meaning unbounded, or
+    None when a bound cuts a month that has orders outside the range
+    first / last are the first and last order dates of the data
+    """
+    month_from = month_to = None
+    if date_from is not None and not (first is not None and pd.Timestamp(date_from) <= pd.Timestamp(first)):
+        date_from = pd.Timestamp(date_from)
+        if date_from.day != 1:
+            return None
+        month_from = date_from
+    if date_to is not None and not (last is not None and pd.Timestamp(date_to) >= pd.Timestamp(last)):
+        date_to = pd.Timestamp(date_to)
+        if not date_to.is_month_end:
+            return None
+        month_to = date_to
+    return month_from, month_to
+
+
+def _summary_totals(summary, by):
+    """Summary rows added up over the by columns, with the average delay"""
+    totals = summary.groupby(by, observed=True)[
+        ['Nombre de factures', 'Montant total', 'Somme des délais', 'Nombre de délais', 'Montant non payé']
+    ].sum()
+    totals['Délai moyen'] = totals['Somme des délais'] / totals['Nombre de délais'].where(totals['Nombre de délais'] > 0)
+    return totals.reset_index()
+
+
+def summary_metrics(summary):
+    """
+    Headline figures of the dashboard from the summary rows (same values as on the invoice rows)
+    'Nombre de factures' counts every invoice, 'Factures payées' only those with a payment delay
+    """
+    delays = summary['Nombre de délais'].sum()
+    invoices = int(summary['Nombre de factures'].sum())
+    by_status = summary.groupby('Statut du paiement')[['Nombre de factures', 'Montant total']].sum()
+    status_total = by_status.reindex([STATUS_ON_TIME, STATUS_LATE], fill_value=0)
+    return {
+        'Nombre de factures': invoices,
+        'Factures payées': invoices - int(summary['Factures non payées'].sum()),
+        'Délai moyen': summary['Somme des délais'].sum() / delays if delays else np.nan,
+        'Délai maximum': summary['Délai maximum'].max(),
+        'Montant non payé': summary['Montant non payé'].sum(),
+        'Montant dans les délais': status_total.loc[STATUS_ON_TIME, 'Montant total'],
+        'Factures en retard': int(status_total.loc[STATUS_LATE, 'Nombre de factures'])
+    }
+
+
+@cached_aggregate
+def summary_supplier_delay_means(summary):
+    """supplier_delay_means from the summary rows"""
+    totals = _summary_totals(summary, 'Nom du fournisseur')
+    return totals[['Nom du fournisseur', 'Délai moyen']].rename(columns={'Délai moyen': 'Délai de paiement'})
+
+
+@cached_aggregate
+def summary_supplier_amount_totals(summary):
+    """supplier_amount_totals from the summary rows"""
+    totals = _summary_totals(summary, 'Nom du fournisseur')
+    return totals[['Nom du fournisseur', 'Montant total']].rename(columns={'Montant total': 'Montant de la commande'})
+
+
+@cached_aggregate
+def summary_supplier_status_counts(summary):
+    """supplier_status_counts from the summary rows"""
+    counts = summary.groupby(['Nom du fournisseur', 'Statut du paiement'])['Nombre de factures'].sum()
+    return counts[counts > 0].reset_index(name='count')
+
+
+@cached_aggregate
+def summary_period(summary, period='M'):
+    """
+    period_summary by month or quarter of order from the summary rows
+    (without the penalty total, which depends on the penalty settings)
+    """
+    starts = pd.to_datetime(summary['Mois'], format='%Y-%m')
+    if period == 'Q':
+        starts = starts.dt.to_period('Q').dt.start_time
+    work = summary.assign(
+        Période=starts,
+        **{'Factures en retard': summary['Nombre de factures'].where(summary['Statut du paiement'] == STATUS_LATE, 0)}
+    )
+    totals = _summary_totals(work, 'Période')
+    late = work.groupby('Période')['Factures en retard'].sum().to_numpy()
+
+    result = pd.DataFrame({
+        'Période': period_labels(totals['Période'], period),
+        'Nombre de factures': totals['Nombre de factures'],
+        'Factures payées': totals['Nombre de délais'],
+        'Factures en retard': late,
+        'Délai moyen': totals['Délai moyen'],
+        'Montant total': totals['Montant total']
+    })
+    result['Taux de conformité'] = (
+        (result['Factures payées'] - result['Factures en retard']) / result['Factures payées'] * 100
+    )
+    return result.rename(columns={'Période': PERIOD_COLUMNS[period]})
@@ -0,0 +1,244 @@
+"""
+Pluggable engine for the dashboard aggregations over the suppliers table
+
+With DuckDB installed, the aggregations of analytics.py run as vectorized SQL
+in an in-process DuckDB database that attaches the SQLite file read-only (or
+reads a Parquet copy of the table) and only the small result frame reaches
+pandas. Without DuckDB, or when its source cannot be opened, the same
+aggregations run in pandas on the invoice rows, so callers get the same frames
+from either engine. Callers that already hold the filtered rows get the pandas
+aggregate of those rows: a second scan of the table by DuckDB would cost more.
+
+The SQLite source needs the sqlite extension of DuckDB. It is only loaded, never
+installed, while serving requests; install it once on hosts with network access:
+python -c "import duckdb; duckdb.execute('INSTALL sqlite')"
+
+ANALYTICS_ENGINE selects the engine: 'auto' (DuckDB when available, pandas
+otherwise), 'duckdb' or 'pandas'. ANALYTICS_SOURCE is the Parquet file or
+directory DuckDB reads; empty means the SQLite database of database.py.
+"""
+import os
+import threading
+
+import pandas as pd
+
+import analytics
+from schema import STATUS_LATE, PAYMENT_STATUSES
+
+ENGINE_AUTO = 'auto'
+ENGINE_DUCKDB = 'duckdb'
+ENGINE_PANDAS = 'pandas'
+
+ANALYTICS_ENGINE = os.environ.get("ANALYTICS_ENGINE", ENGINE_AUTO)
+ANALYTICS_SOURCE = os.environ.get("ANALYTICS_SOURCE", "")
+
+# Canonical order of the payment statuses (the categorical order of schema.py), unknown statuses last
+STATUS_ORDER_SQL = (
+    "CASE statut_paiement "
+    + " ".join(f"WHEN '{status}' THEN {position}" for position, status in enumerate(PAYMENT_STATUSES))
+    + f" ELSE {len(PAYMENT_STATUSES)} END, statut_paiement"
+)
+
+# Start and label of the period of each order date, per granularity of analytics.period_summary
+PERIOD_SQL = {
+    'D': ("date_commande", "strftime(date_commande, '%Y-%m-%d')"),
+    'W': ("date_trunc('week', date_commande)", "strftime(date_trunc('week', date_commande), '%Y-%m-%d')"),
+    'M': ("date_trunc('month', date_commande)", "strftime(date_commande, '%Y-%m')"),
+    'Q': ("date_trunc('quarter', date_commande)",
+          "CAST(year(date_commande) AS VARCHAR) || '-T' || CAST(quarter(date_commande) AS VARCHAR)")
+}
+
+# One SQL query per aggregate of analytics.py, with the column labels of the pandas version
+# {where} receives the filters; rounding and derived rates are applied by _finish, as in pandas
+QUERIES = {
+    'supplier_delay_means': """
+        SELECT nom_fournisseur AS "Nom du fournisseur", AVG(delai_paiement) AS "Délai de paiement"
+        FROM invoices {where} GROUP BY 1 ORDER BY 1
+    """,
+    'supplier_amount_totals': """
+        SELECT nom_fournisseur AS "Nom du fournisseur", SUM(montant_commande) AS "Montant de la commande"
+        FROM invoices {where} GROUP BY 1 ORDER BY 1
+    """,
+    'supplier_penalty_totals': """
+        SELECT nom_fournisseur AS "Nom du fournisseur", SUM(montant_penalite) AS "Montant pénalité"
+        FROM invoices {where} GROUP BY 1 ORDER BY 1
+    """,
+    'supplier_status_counts': f"""
+        SELECT nom_fournisseur AS "Nom du fournisseur", statut_paiement AS "Statut du paiement", COUNT(*) AS count
+        FROM invoices {{where}} GROUP BY 1, 2 ORDER BY 1, {STATUS_ORDER_SQL}
+    """,
+    'supplier_late_counts': f"""
+        SELECT nom_fournisseur AS "Nom du fournisseur", COUNT(*) FILTER (WHERE statut_paiement = '{STATUS_LATE}') AS count
+        FROM invoices {{where}} GROUP BY 1 HAVING count > 0 ORDER BY 1
+    """,
+    'supplier_kpis': f"""
+        SELECT nom_fournisseur AS "Nom du fournisseur",
+               SUM(montant_commande) AS "Montant total",
+               AVG(delai_paiement) AS "Délai moyen de paiement",
+               SUM(montant_penalite) AS "Pénalités totales",
+               AVG(CASE WHEN date_paiement IS NULL THEN 100.0 ELSE 0.0 END) AS "Pourcentage non payé",
+               COUNT(*) AS "Nombre de commandes",
+               COUNT(*) FILTER (WHERE statut_paiement = '{STATUS_LATE}') AS "Commandes en retard",
+               SUM(CASE WHEN date_paiement IS NULL THEN montant_commande ELSE 0 END) AS "Montant non payé"
+        FROM invoices {{where}} GROUP BY 1 ORDER BY 1
+    """,
+    'supplier_risk': f"""
+        SELECT nom_fournisseur AS "Nom du fournisseur",
+               SUM(montant_commande) AS "Exposition financière",
+               AVG(delai_paiement) AS "Délai moyen",
+               AVG(CASE WHEN statut_paiement = '{STATUS_LATE}' THEN 100.0 ELSE 0.0 END) AS "Taux de retard (%)"
+        FROM invoices {{where}} GROUP BY 1 ORDER BY 1
+    """,
+    'period_summary': f"""
+        SELECT {{period_start}} AS period_start, {{period_label}} AS "Période",
+               COUNT(*) AS "Nombre de factures",
+               COUNT(delai_paiement) AS "Factures payées",
+               COUNT(*) FILTER (WHERE statut_paiement = '{STATUS_LATE}') AS "Factures en retard",
+               AVG(delai_paiement) AS "Délai moyen",
+               COALESCE(SUM(montant_penalite), 0) AS "Montant pénalité",
+               COALESCE(SUM(montant_commande), 0) AS "Montant total"
+        FROM invoices {{where}} GROUP BY 1, 2 ORDER BY 1
+    """
+}
+
+
+def _filters_sql(supplier=None, date_from=None, date_to=None, status=None):
+    """WHERE clause and parameters of the filters of database.query_suppliers"""
+    conditions = ["date_commande IS NOT NULL"]
+    params = []
+    for field, value in (('nom_fournisseur', supplier), ('statut_paiement', status)):
+        if value is None:
+            continue
+        values = [value] if isinstance(value, str) else list(value)
+        conditions.append(f"{field} IN ({', '.join('?' * len(values))})")
+        params.extend(values)
+    if date_from is not None:
+        conditions.append("date_commande >= CAST(? AS DATE)")
+        params.append(pd.Timestamp(date_from).strftime('%Y-%m-%d'))
+    if date_to is not None:
+        conditions.append("date_commande <= CAST(? AS DATE)")
+        params.append(pd.Timestamp(date_to).strftime('%Y-%m-%d'))
+    return "WHERE " + " AND ".join(conditions), params
+
+
+def _finish(name, result, period='M'):
+    """Derived columns the pandas aggregates compute after their groupby"""
+    if name == 'supplier_kpis':
+        result['Taux de retard (%)'] = (result['Commandes en retard'] / result['Nombre de commandes'] * 100).round(1)
+    elif name == 'period_summary':
+        result = result.drop(columns='period_start')
+        result['Taux de conformité'] = (
+            (result['Factures payées'] - result['Factures en retard']) / result['Factures payées'] * 100
+        )
+        result = result.rename(columns={'Période': analytics.PERIOD_COLUMNS[period]})
+    return result
+
+
+class DuckDBEngine:
+    """In-process DuckDB database exposing the suppliers table as the invoices view"""
+
+    name = ENGINE_DUCKDB
+
+    def __init__(self, source):
+        import duckdb
+
+        self.source = source
+        self._connection = duckdb.connect()
+        if source.endswith('.db'):
+            # SQLite scanner extension (installed beforehand, see above): attached read-only,
+            # dates cast from their ISO text
+            self._connection.execute("LOAD sqlite")
+            self._connection.execute(f"ATTACH '{source}' AS store (TYPE sqlite, READ_ONLY)")
+            table = "store.suppliers"
+        else:
+            path = os.path.join(source, '**', '*.parquet') if os.path.isdir(source) else source
+            table = f"read_parquet('{path}', hive_partitioning = true, union_by_name = true)"
+        self._connection.execute(f"""
+            CREATE VIEW invoices AS
+            SELECT * REPLACE (
+                CAST(date_commande AS DATE) AS date_commande,
+                CAST(date_paiement AS DATE) AS date_paiement
+            )
+            FROM {table}
+        """)
+        # Fail now rather than on the first dashboard query
+        self._connection.execute("SELECT COUNT(*) FROM invoices LIMIT 1").fetchall()
+
+    def aggregate(self, name, period='M', **filters):
+        """Result frame of the analytics.py aggregate name over the rows matching filters"""
+        where, params = _filters_sql(**filters)
+        period_start, period_label = PERIOD_SQL[period]
+        sql = QUERIES[name].format(where=where, period_start=period_start, period_label=period_label)
+        # A cursor is a separate connection to the same database: one per query, so threads do not share one
+        cursor = self._connection.cursor()
+        try:
+            result = cursor.execute(sql, params).df()
+        finally:
+            cursor.close()
+        return _finish(name, result, period)
+
+
+class PandasEngine:
+    """The pandas aggregates of analytics.py over the invoice rows"""
+
+    name = ENGINE_PANDAS
+
+    def aggregate(self, name, period='M', df=None, data_fingerprint=None, **filters):
+        """
+        Result frame of the analytics.py aggregate name over df (read from the database if None)
+        data_fingerprint: analytics.fingerprint(df) when the caller already computed it
+        """
+        if df is None:
+            import database as db
+            df = db.query_suppliers(**filters)
+            data_fingerprint = None
+        if name == 'period_summary':
+            return analytics.period_summary(df, 'Date de commande', period, data_fingerprint=data_fingerprint)
+        return getattr(analytics, name)(df, data_fingerprint=data_fingerprint)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+_pandas_engine = PandasEngine()
+
+
+def get_engine():
+    """
+    The engine selected by ANALYTICS_ENGINE, created once per process
+    'auto' falls back to pandas when DuckDB is not installed or its source cannot be opened
+    """
+    global _engine
+    if _engine is not None:
+        return _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = _create_engine(ANALYTICS_ENGINE)
+    return _engine
+
+
+def _create_engine(choice):
+    if choice == ENGINE_PANDAS:
+        return PandasEngine()
+    import database as db
+    source = ANALYTICS_SOURCE or db.DB_PATH
+    try:
+        return DuckDBEngine(source)
+    except Exception as e:
+        if choice == ENGINE_DUCKDB:
+            raise
+        print(f"Moteur DuckDB indisponible ({e}), agrégations calculées avec pandas")
+        return PandasEngine()
+
+
+def aggregate(name, df=None, period='M', data_fingerprint=None, **filters):
+    """
+    Aggregate name of analytics.py (supplier_kpis, period_summary, ...) over
+    the suppliers table rows matching the database.query_suppliers filters
+    (supplier, date_from, date_to, status). When the caller already holds the
+    filtered rows as df (with its data_fingerprint, if given), they are
+    aggregated in pandas; otherwise the selected engine reads the table
+    (DuckDB in SQL, or pandas after a filtered query)
+    """
+    if df is not None:
+        return _pandas_engine.aggregate(name, period, df=df, data_fingerprint=data_fingerprint)
+    return get_engine().aggregate(name, period, **filters)
@@ -1,14 +1,17 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from utils import (
     load_sample_data, process_data, calculate_penalties,
     calculate_bfr, calculate_dpo, calculate_cash_ratio,
-    calculate_current_ratio, get_download_link
+    calculate_current_ratio, get_download_link, PAYMENT_STATUSES
 )
+from schema import memory_report, session_memory_mb, READ_DTYPES
+import analytics
+from paginated_table import paginated_table
+from ingestion import ingest_upload, database_sink, STREAMING_THRESHOLD_MB
+from upload_cache import upload_cache, file_digest, stream_digest
 
 # Page configuration
 st.set_page_config(
@@ -29,6 +32,20 @@ st.markdown(hide_streamlit_style, unsafe_allow_html=True)
 
 # Import database module
 import database as db
+import parquet_mirror
+
+def set_processed_data(df, source):
+    """
+    Store the processed frame in the session state, with where it comes from
+    and its memory footprint with and without the compact schema
+    For the database source the invoices stay in the database: the frame is the
+    per-supplier overview (database.get_suppliers_overview) and the pages query the rows they show
+    """
+    st.session_state['processed_data'] = df
+    st.session_state['data_source'] = source
+    st.session_state['memory_report'] = memory_report(df)
+    # Forget which upload is loaded: the next upload is always applied
+    st.session_state.pop('upload_digest', None)
 
 # Session State initialization
 if 'data' not in st.session_state:
@@ -36,7 +53,7 @@ if 'data' not in st.session_state:
 if 'processed_data' not in st.session_state:
     # Check if we have data in the database
     if db.db_has_data():
-        st.session_state['processed_data'] = db.get_suppliers_dataframe()
+        set_processed_data(db.get_suppliers_overview(), 'database')
     else:
         st.session_state['processed_data'] = pd.DataFrame()
 
@@ -58,18 +75,66 @@ with st.sidebar:
     )
     
     if uploaded_file is not None:
-        try:
-            if uploaded_file.name.endswith('.csv'):
-                data = pd.read_csv(uploaded_file)
-            else:
-                data = pd.read_excel(uploaded_file)
-            
-            # Process the data
-            st.session_state['data'] = data
-            st.session_state['processed_data'] = process_data(data)
-            st.success("Données chargées avec succès!")
-        except Exception as e:
-            st.error(f"Erreur lors du chargement des données: {e}")
+        # Large exports are streamed to the database chunk by chunk instead of being read whole
+        stream_upload = st.checkbox(
+            "Import par blocs dans la base de données",
+            value=uploaded_file.size > STREAMING_THRESHOLD_MB * 1e6,
+            help="Lit le fichier par blocs et enregistre chaque bloc dans la base : recommandé pour les fichiers volumineux"
+        )
+        
+        if stream_upload:
+            # The uploader keeps the file across reruns: only import it once per content
+            # (a corrected export with the same name and size is imported again)
+            upload_key = stream_digest(uploaded_file)
+            if st.session_state.get('streamed_upload') != upload_key:
+                progress_bar = st.progress(0.0, text="Import en cours...")
+                
+                def show_progress(fraction, rows_read):
+                    progress_bar.progress(fraction if fraction is not None else 0.0, text=f"{rows_read:,} lignes lues")
+                
+                try:
+                    # Rows already in the database (same supplier and invoice number) are updated, not duplicated
+                    counts = {}
+                    rows_read, rows_stored = ingest_upload(
+                        uploaded_file, uploaded_file.name,
+                        sink=lambda chunk: database_sink(chunk, counts),
+                        on_progress=show_progress
+                    )
+                    db.finish_import()
+                    parquet_mirror.sync_if_enabled()
+                    st.session_state['streamed_upload'] = upload_key
+                    # Memory stays bounded: the session keeps the supplier overview, not the imported rows
+                    set_processed_data(db.get_suppliers_overview(), 'database')
+                    progress_bar.progress(1.0, text=f"{rows_read:,} lignes lues")
+                    st.success(
+                        f"{rows_stored} lignes sur {rows_read} importées dans la base de données : "
+                        f"{counts.get('inserted', 0)} ajoutée(s), {counts.get('updated', 0)} mise(s) à jour, "
+                        f"{counts.get('unchanged', 0)} inchangée(s)."
+                    )
+                except Exception as e:
+                    st.error(f"Erreur lors de l'import des données: {e}")
+        else:
+            try:
+                # Processed uploads are cached on disk by content: a file seen before is not parsed again
+                digest = file_digest(uploaded_file.getvalue())
+                if st.session_state.get('upload_digest') != digest:
+                    processed = upload_cache.get(digest)
+                    if processed is None:
+                        if uploaded_file.name.endswith('.csv'):
+                            data = pd.read_csv(uploaded_file, dtype=READ_DTYPES)
+                        else:
+                            data = pd.read_excel(uploaded_file, dtype=READ_DTYPES)
+                        
+                        # Process the data
+                        st.session_state['data'] = data
+                        processed = process_data(data)
+                        upload_cache.put(digest, processed)
+                    
+                    set_processed_data(processed, 'upload')
+                    st.session_state['upload_digest'] = digest
+                st.success("Données chargées avec succès!")
+            except Exception as e:
+                st.error(f"Erreur lors du chargement des données: {e}")
     
     # Sample data generation option
     if st.button("Générer des données d'exemple"):
@@ -99,7 +164,7 @@ with st.sidebar:
         
         df = pd.DataFrame(sample_data)
         st.session_state['data'] = df
-        st.session_state['processed_data'] = process_data(df)
+        set_processed_data(process_data(df), 'sample')
         st.success("Données d'exemple générées avec succès!")
     
     # Global filters
@@ -111,8 +176,12 @@ with st.sidebar:
         selected_supplier = st.selectbox("Fournisseur", suppliers)
         
         # Filter by date range
-        date_min = st.session_state['processed_data']['Date de commande'].min() if 'Date de commande' in st.session_state['processed_data'].columns else datetime.now()
-        date_max = st.session_state['processed_data']['Date de commande'].max() if 'Date de commande' in st.session_state['processed_data'].columns else datetime.now()
+        if st.session_state.get('data_source') == 'database':
+            date_min = st.session_state['processed_data']['Première commande'].min()
+            date_max = st.session_state['processed_data']['Dernière commande'].max()
+        else:
+            date_min = st.session_state['processed_data']['Date de commande'].min() if 'Date de commande' in st.session_state['processed_data'].columns else datetime.now()
+            date_max = st.session_state['processed_data']['Date de commande'].max() if 'Date de commande' in st.session_state['processed_data'].columns else datetime.now()
         
         date_range = st.date_input(
             "Période",
@@ -123,38 +192,108 @@ with st.sidebar:
         )
         
         # Filter by payment status
-        statuses = ["Tous", "Dans les délais", "En retard"]
+        statuses = ["Tous"] + PAYMENT_STATUSES
         selected_status = st.selectbox("Statut de paiement", statuses)
         
         # Apply filters to data
-        filtered_data = st.session_state['processed_data'].copy()
-        
-        if selected_supplier != "Tous":
-            filtered_data = filtered_data[filtered_data['Nom du fournisseur'] == selected_supplier]
-        
-        if len(date_range) == 2:
-            filtered_data = filtered_data[
-                (filtered_data['Date de commande'] >= pd.to_datetime(date_range[0])) &
-                (filtered_data['Date de commande'] <= pd.to_datetime(date_range[1]))
-            ]
-        
-        if selected_status != "Tous":
-            filtered_data = filtered_data[filtered_data['Statut du paiement'] == selected_status]
+        filtered_summary = None
+        filtered_query = None
+        if st.session_state.get('data_source') == 'database':
+            # Whole months selected: the metrics and charts read the monthly summary table
+            window = analytics.month_window(
+                date_range[0] if len(date_range) == 2 else None,
+                date_range[1] if len(date_range) == 2 else None,
+                date_min, date_max
+            )
+            if window is not None:
+                filtered_summary = db.get_supplier_month_summary(
+                    supplier=None if selected_supplier == "Tous" else selected_supplier,
+                    status=None if selected_status == "Tous" else selected_status,
+                    month_from=window[0],
+                    month_to=window[1]
+                )
+            
+            # Data comes from the database: let SQLite apply the filters on its indexes
+            filtered_query = dict(
+                supplier=None if selected_supplier == "Tous" else selected_supplier,
+                date_from=date_range[0] if len(date_range) == 2 else None,
+                date_to=date_range[1] if len(date_range) == 2 else None,
+                status=None if selected_status == "Tous" else selected_status
+            )
+            # Only the filters are kept in the session: the rows are read when the page is drawn
+            filtered_data = None
+        else:
+            filtered_data = st.session_state['processed_data'].copy()
+            
+            if selected_supplier != "Tous":
+                filtered_data = filtered_data[filtered_data['Nom du fournisseur'] == selected_supplier]
+            
+            if len(date_range) == 2:
+                filtered_data = filtered_data[
+                    (filtered_data['Date de commande'] >= pd.to_datetime(date_range[0])) &
+                    (filtered_data['Date de commande'] <= pd.to_datetime(date_range[1]))
+                ]
+            
+            if selected_status != "Tous":
+                filtered_data = filtered_data[filtered_data['Statut du paiement'] == selected_status]
         
         st.session_state['filtered_data'] = filtered_data
+        st.session_state['filtered_summary'] = filtered_summary
+        st.session_state['filtered_query'] = filtered_query
+        st.session_state['filtered_params'] = (
+            selected_supplier, tuple(str(day) for day in date_range), selected_status
+        )
+        
+        # Memory held by this session (all DataFrames in the session state)
+        if 'memory_report' in st.session_state:
+            report = st.session_state['memory_report']
+            st.caption(
+                f"Mémoire de la session : {session_memory_mb(st.session_state):.1f} Mo — "
+                f"données traitées : {report['after']:.1f} Mo "
+                f"(au lieu de {report['before']:.1f} Mo sans typage compact)"
+            )
 
 # Main content area for dashboard
 if 'processed_data' in st.session_state and not st.session_state['processed_data'].empty:
-    data = st.session_state.get('filtered_data', st.session_state['processed_data'])
+    summary = st.session_state.get('filtered_summary')
+    query = st.session_state.get('filtered_query')
+    if query is not None:
+        # Database source: the filtered rows are read for this run only, never stored in the session
+        # (or the Parquet mirror, when there is one, reads only the months of the period)
+        data = parquet_mirror.query_suppliers(**query)
+    else:
+        data = st.session_state.get('filtered_data', st.session_state['processed_data'])
+    # Hashed once per run for the cached aggregates and the table below
+    data_fingerprint = analytics.fingerprint(data)
+    
+    def dashboard_aggregate(name):
+        # Monthly summary table when it covers the filters, else pandas on the filtered rows:
+        # they are loaded for the metrics and the detailed table, so the table is not scanned again
+        if summary is not None:
+            return getattr(analytics, f"summary_{name}")(summary)
+        return getattr(analytics, name)(data, data_fingerprint=data_fingerprint)
     
     # Calculate key metrics
-    delay_mean = data['Délai de paiement'].mean() if 'Délai de paiement' in data.columns else 0
-    unpaid_amount = data[data['Date de paiement'].isna()]['Montant de la commande'].sum() if 'Date de paiement' in data.columns else 0
-    on_time_amount = data[data['Statut du paiement'] == 'Dans les délais']['Montant de la commande'].sum() if 'Statut du paiement' in data.columns else 0
-    late_payments_count = data[data['Statut du paiement'] == 'En retard'].shape[0] if 'Statut du paiement' in data.columns else 0
-    total_payments = data.shape[0]
+    if summary is not None:
+        # Database source on whole months: a few summary rows instead of every invoice
+        metrics = analytics.summary_metrics(summary)
+        delay_mean = metrics['Délai moyen']
+        unpaid_amount = metrics['Montant non payé']
+        on_time_amount = metrics['Montant dans les délais']
+        late_payments_count = metrics['Factures en retard']
+        total_payments = metrics['Factures payées']
+    else:
+        delay_mean = data['Délai de paiement'].mean() if 'Délai de paiement' in data.columns else 0
+        unpaid_amount = data[data['Date de paiement'].isna()]['Montant de la commande'].sum() if 'Date de paiement' in data.columns else 0
+        on_time_amount = data[data['Statut du paiement'] == 'Dans les délais']['Montant de la commande'].sum() if 'Statut du paiement' in data.columns else 0
+        late_payments_count = data[data['Statut du paiement'] == 'En retard'].shape[0] if 'Statut du paiement' in data.columns else 0
+        total_payments = int(data['Délai de paiement'].notna().sum()) if 'Délai de paiement' in data.columns else 0
+    # Share of the paid invoices paid on time: unpaid invoices are not judged yet
     compliance_rate = (total_payments - late_payments_count) / total_payments * 100 if total_payments > 0 else 0
     
+    # Plotting library: only loaded once there is data to chart
+    import plotly.express as px
+    
     # Display key metrics
     st.header("Aperçu général")
     
@@ -178,7 +317,7 @@ if 'processed_data' in st.session_state and not st.session_state['processed_data
     with tab1:
         # Payment delay by supplier
         fig_delay = px.bar(
-            data.groupby('Nom du fournisseur')['Délai de paiement'].mean().reset_index(),
+            dashboard_aggregate('supplier_delay_means'),
             x='Nom du fournisseur',
             y='Délai de paiement',
             title="Délai moyen de paiement par fournisseur",
@@ -190,7 +329,7 @@ if 'processed_data' in st.session_state and not st.session_state['processed_data
     with tab2:
         # Order amounts by supplier
         fig_amount = px.pie(
-            data.groupby('Nom du fournisseur')['Montant de la commande'].sum().reset_index(),
+            dashboard_aggregate('supplier_amount_totals'),
             values='Montant de la commande',
             names='Nom du fournisseur',
             title="Répartition des montants de commande par fournisseur"
@@ -200,7 +339,7 @@ if 'processed_data' in st.session_state and not st.session_state['processed_data
     with tab3:
         # Payment status distribution
         fig_status = px.bar(
-            data.groupby(['Nom du fournisseur', 'Statut du paiement']).size().reset_index(name='count'),
+            dashboard_aggregate('supplier_status_counts'),
             x='Nom du fournisseur',
             y='count',
             color='Statut du paiement',
@@ -212,17 +351,23 @@ if 'processed_data' in st.session_state and not st.session_state['processed_data
     # Display data table with option to download
     st.header("Données détaillées")
     
-    # Display the data table
-    st.dataframe(data, use_container_width=True)
+    # Display the data table one page at a time
+    paginated_table(data, key='details', data_fingerprint=data_fingerprint)
     
-    # Create a download button for the filtered data
-    excel_data = get_download_link(data)
-    st.download_button(
-        label="Télécharger les données filtrées (Excel)",
-        data=excel_data,
-        file_name="donnees_fournisseurs_filtrees.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    # The Excel export is only built when requested, once per set of filters
+    export_params = st.session_state.get('filtered_params')
+    
+    if st.button("Préparer l'export des données filtrées (Excel)"):
+        st.session_state['export_params'] = export_params
+    
+    if st.session_state.get('export_params') == export_params:
+        st.download_button(
+            label="Télécharger les données filtrées (Excel)",
+            data=get_download_link(data),
+            file_name="donnees_fournisseurs_filtrees.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            on_click="ignore"
+        )
 
 else:
     # Display information on how to get started
@@ -0,0 +1,28 @@
+"""
+Synthetic supplier ledgers shared by the benchmark scripts
+"""
+import numpy as np
+import pandas as pd
+
+
+def make_supplier_frame(n_rows, n_suppliers=200, seed=0):
+    """
+    Build a raw supplier ledger with the same columns as an uploaded file
+    About 10% of the orders are left unpaid; amounts have cents so that
+    (supplier, order date, amount) practically never repeats
+    """
+    rng = np.random.default_rng(seed)
+    suppliers = np.array([f"Fournisseur {i:04d}" for i in range(n_suppliers)])
+
+    order_dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365, n_rows), unit="D")
+    receipt_dates = order_dates + pd.to_timedelta(rng.integers(5, 20, n_rows), unit="D")
+    payment_dates = pd.Series(order_dates + pd.to_timedelta(rng.integers(20, 150, n_rows), unit="D"))
+    payment_dates[rng.random(n_rows) < 0.1] = pd.NaT
+
+    return pd.DataFrame({
+        'Nom du fournisseur': suppliers[rng.integers(0, n_suppliers, n_rows)],
+        'Date de commande': order_dates,
+        'Montant de la commande': rng.integers(100_000, 5_000_000, n_rows) / 100,
+        'Date de réception': receipt_dates,
+        'Date de paiement': payment_dates.to_numpy(),
+    })
@@ -0,0 +1,129 @@
+"""
+Dashboard aggregations (analytics_engine) on a large ledger: DuckDB running
+them as SQL over a Parquet copy of the suppliers table, compared with pandas
+loading the rows and grouping them, and with pandas on rows already in memory
+(the best case of a session that has loaded the whole table). Both engines
+must return the same frames.
+
+Requires duckdb (pip install duckdb) and is skipped without it; --sqlite also times DuckDB attached to a
+SQLite copy of the ledger (needs the DuckDB sqlite extension).
+
+Usage: python benchmarks/bench_analytics_engine.py [--rows N] [--sqlite]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Aggregates of the dashboard pages, with their period where they have one
+AGGREGATES = [
+    ('supplier_kpis', 'M'),
+    ('supplier_status_counts', 'M'),
+    ('supplier_risk', 'M'),
+    ('period_summary', 'M'),
+    ('period_summary', 'W')
+]
+
+
+def to_table_columns(processed, db):
+    """Processed frame with the column names and types of the suppliers table"""
+    table = processed.rename(columns=db.COLUMN_MAPPING)
+    for column in db.DATE_COLUMNS:
+        table[column] = table[column].astype('datetime64[ms]')
+    for column in ['nom_fournisseur', 'statut_paiement']:
+        table[column] = table[column].astype(str)
+    return table
+
+
+def run_all(engine, **kwargs):
+    """Every dashboard aggregate; returns (results, seconds)"""
+    start = time.perf_counter()
+    results = [engine.aggregate(name, period, **kwargs) for name, period in AGGREGATES]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--sqlite", action="store_true", help="also time DuckDB over a SQLite copy")
+    args = parser.parse_args()
+
+    # Without DuckDB the dashboards fall back to pandas (analytics_engine 'auto'): nothing to compare
+    try:
+        import duckdb
+    except ImportError:
+        print("duckdb is not installed (pip install duckdb): benchmark skipped")
+        return
+
+    tmp = tempfile.mkdtemp()
+    os.environ["SUPPLIERS_DB_PATH"] = os.path.join(tmp, "bench.db")
+
+    import pandas as pd
+    with contextlib.redirect_stdout(io.StringIO()):
+        import database as db
+    import analytics
+    from analytics_engine import DuckDBEngine, PandasEngine
+    from schema import apply_schema
+    from utils import process_data, calculate_penalties
+    from bench_month_summary import same_frames
+    from _data import make_supplier_frame
+
+    processed = calculate_penalties(process_data(make_supplier_frame(args.rows)))
+    parquet_path = os.path.join(tmp, "suppliers.parquet")
+    to_table_columns(processed, db).to_parquet(parquet_path, index=False)
+    print(f"rows: {len(processed):,}, Parquet copy: {os.path.getsize(parquet_path) / 1e6:.0f} MB")
+
+    # pandas: read the rows (what a session does before grouping), then group them
+    analytics.cache.clear()
+    start = time.perf_counter()
+    table = pd.read_parquet(parquet_path)
+    rows = apply_schema(table.rename(columns={field: label for label, field in db.COLUMN_MAPPING.items()}))
+    load_time = time.perf_counter() - start
+    expected, pandas_time = run_all(PandasEngine(), df=rows)
+    print(f"pandas (load)     {load_time:8.2f} s")
+    print(f"pandas (groupby)  {pandas_time:8.2f} s  load + groupby {load_time + pandas_time:.2f} s")
+
+    duck = DuckDBEngine(parquet_path)
+    results, duck_time = run_all(duck)
+    same = all(same_frames(a, b) for a, b in zip(expected, results))
+    print(f"duckdb (Parquet)  {duck_time:8.2f} s  ({(load_time + pandas_time) / duck_time:.0f}x load + groupby, "
+          f"{pandas_time / duck_time:.1f}x groupby only), same results: {same}")
+
+    # A filtered view: one supplier over one year
+    supplier = rows['Nom du fournisseur'].cat.categories[0]
+    filters = dict(supplier=supplier, date_from='2023-01-01', date_to='2023-12-31')
+    analytics.cache.clear()
+    start = time.perf_counter()
+    filtered = rows[(rows['Nom du fournisseur'] == supplier) &
+                    (rows['Date de commande'] >= '2023-01-01') & (rows['Date de commande'] <= '2023-12-31')]
+    filter_time = time.perf_counter() - start
+    expected_filtered, pandas_filtered_time = run_all(PandasEngine(), df=filtered)
+    pandas_filtered_time += filter_time
+    results_filtered, duck_filtered_time = run_all(duck, **filters)
+    same_filtered = all(same_frames(a, b) for a, b in zip(expected_filtered, results_filtered))
+    print(f"one supplier/year pandas {pandas_filtered_time * 1000:.0f} ms (filter + groupby of rows in memory), "
+          f"duckdb {duck_filtered_time * 1000:.0f} ms, same results: {same_filtered}")
+
+    if args.sqlite:
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.add_suppliers_bulk(processed, optimize=False)
+        try:
+            results, sqlite_time = run_all(DuckDBEngine(db.DB_PATH))
+            same = same and all(same_frames(a, b) for a, b in zip(expected, results))
+            print(f"duckdb (SQLite)   {sqlite_time:8.2f} s, same results: {same}")
+        except Exception as e:
+            print(f"duckdb (SQLite)   unavailable: {e}")
+
+    if not (same and same_filtered):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
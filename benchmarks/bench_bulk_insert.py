@@ -0,0 +1,56 @@
+"""
+Compare the per-row ingestion path (one session and one commit per row)
+with database.add_suppliers_bulk (batched INSERTs in a single transaction)
+
+Usage: python benchmarks/bench_bulk_insert.py [--rows N] [--batch-size B]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    # Point the database module at a throwaway file before importing it
+    tmp_dir = tempfile.mkdtemp()
+    os.environ["SUPPLIERS_DB_PATH"] = os.path.join(tmp_dir, "bench.db")
+
+    import database as db
+    from utils import process_data
+    from _data import make_supplier_frame
+
+    df = process_data(make_supplier_frame(args.rows))
+
+    # Rejected rows are reported on stdout by the database module; keep the output readable
+    db.delete_all_suppliers()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        per_row_success = sum(db.add_supplier(row.to_dict()) for _, row in df.iterrows())
+    per_row_time = time.perf_counter() - start
+
+    db.delete_all_suppliers()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        bulk_success, total = db.add_suppliers_bulk(df, batch_size=args.batch_size)
+    bulk_time = time.perf_counter() - start
+
+    print(f"rows: {total}")
+    print(f"per-row : {per_row_success:>8} ok  {per_row_time:8.2f} s  {total / per_row_time:>12,.0f} rows/s")
+    print(f"bulk    : {bulk_success:>8} ok  {bulk_time:8.2f} s  {total / bulk_time:>12,.0f} rows/s")
+    print(f"speed-up: x{per_row_time / bulk_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
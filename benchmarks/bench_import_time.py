@@ -0,0 +1,123 @@
+"""
+Cold-start import time (python -X importtime) of the calculation modules and
+of the header imports of app.py and of every page, checked against a budget
+
+The calculation modules must not load streamlit or plotly at all. Pages only
+import their header (streamlit, pandas, the calculation modules) before
+checking that data is loaded; plotting libraries come after that check. The
+script exits with status 1 when a target is over budget or loads a UI library
+it must not, so it can run in CI.
+
+Usage: python benchmarks/bench_import_time.py [--runs N] [--scale FACTOR]
+"""
+import argparse
+import ast
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+UI_LIBRARIES = ('streamlit', 'plotly')
+
+# Plotting modules the scripts only import after their data check (streamlit
+# itself loads plotly and the lazy plotly.graph_objects shell; plotly.express
+# is the heavy one)
+PLOTTING_MODULES = ('plotly.express',)
+
+# Budget of each calculation module, in ms (cumulative import time in a fresh interpreter)
+MODULE_BUDGETS_MS = {
+    'schema': 450,
+    'utils': 450,
+    'analytics': 450,
+    'treasury': 450,
+    'montecarlo': 500,
+    'liquidity': 450,
+    'reports': 500,
+    'penalties': 450,
+    'ingestion': 450,
+    'upload_cache': 450,
+    'change_sets': 450,
+    'database': 700,
+    'supplieranalyzer': 600,
+}
+
+# Budget of the header imports of app.py and of every page, in ms
+SCRIPT_BUDGET_MS = 1000
+
+
+def header_imports(path):
+    """Import statements at the top of a script, up to its first other statement"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    imports = []
+    for node in tree.body:
+        if not isinstance(node, (ast.Import, ast.ImportFrom)):
+            break
+        imports.append(ast.unparse(node))
+    return imports
+
+
+def import_time(statements, env):
+    """
+    Total import time (ms) of the statements in a fresh interpreter and the set
+    of modules they loaded
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', '; '.join(statements)],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{statements}: {result.stderr.strip().splitlines()[-1]}")
+
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.add(name.strip())
+        # Top-level entries (not indented) add up to the whole import
+        if not name.startswith('  '):
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="best of N fresh interpreters per target")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the budgets (slower machines)")
+    args = parser.parse_args()
+
+    env = dict(os.environ, SUPPLIERS_DB_PATH=os.path.join(tempfile.mkdtemp(), "bench.db"))
+    targets = [(module, [f"import {module}"], MODULE_BUDGETS_MS[module], True) for module in MODULE_BUDGETS_MS]
+    for script in ['app.py'] + sorted(glob.glob(os.path.join(ROOT, 'pages', '*.py'))):
+        path = os.path.join(ROOT, script)
+        targets.append((os.path.relpath(path, ROOT), header_imports(path), SCRIPT_BUDGET_MS, False))
+
+    failures = 0
+    print(f"{'target':<34}{'ms':>8}{'budget':>8}  status")
+    for name, statements, budget, headless in targets:
+        runs = [import_time(statements, env) for _ in range(args.runs)]
+        elapsed = min(ms for ms, _ in runs)
+        loaded = set().union(*(modules for _, modules in runs))
+        budget *= args.scale
+
+        problems = []
+        if elapsed > budget:
+            problems.append("over budget")
+        if headless:
+            packages = {module.split('.')[0] for module in loaded}
+            problems += [f"loads {library}" for library in UI_LIBRARIES if library in packages]
+        else:
+            problems += [f"loads {module} before the data check" for module in PLOTTING_MODULES if module in loaded]
+        failures += bool(problems)
+        print(f"{name:<34}{elapsed:>8.0f}{budget:>8.0f}  {', '.join(problems) or 'ok'}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
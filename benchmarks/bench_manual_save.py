@@ -0,0 +1,92 @@
+"""
+Saving edits of the manual entry page on a large suppliers table: the change
+set of the editor (one edited cell, an added and a deleted row) processed,
+written in one transaction and patched into the session frames, compared
+with the former save (process_data on the whole table, update_supplier for
+every row, full reload and isin anti-join, timed on a slice and extrapolated)
+
+Usage: python benchmarks/bench_manual_save.py [--rows N] [--legacy-rows N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--legacy-rows", type=int, default=2_000, help="rows the former save is timed on")
+    args = parser.parse_args()
+
+    os.environ["SUPPLIERS_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+    import numpy as np
+    import pandas as pd
+    with contextlib.redirect_stdout(io.StringIO()):
+        import database as db
+    from change_sets import editor_changes, valid_rows, patch_frame
+    from schema import apply_schema
+    from utils import process_data, calculate_penalties
+    from _data import make_supplier_frame
+
+    db.add_suppliers_from_dataframe(calculate_penalties(process_data(make_supplier_frame(args.rows))))
+    manual_data = db.get_suppliers_dataframe(categories=False)
+    processed_data = db.get_suppliers_dataframe()
+    print(f"rows: {len(manual_data):,}")
+
+    # What st.data_editor keeps in session state after the edits
+    edited_position = len(manual_data) // 2
+    state = {
+        'edited_rows': {str(edited_position): {'Date de paiement': '2024-12-31'}},
+        'added_rows': [{'Nom du fournisseur': 'Nouveau fournisseur', 'Date de commande': '2024-11-02',
+                        'Montant de la commande': 1200.0}],
+        'deleted_rows': [0]
+    }
+
+    start = time.perf_counter()
+    changed, added, deleted_ids = editor_changes(manual_data, state)
+    changed = calculate_penalties(process_data(changed[valid_rows(changed)].reset_index(drop=True)))
+    added = calculate_penalties(process_data(added[valid_rows(added)].reset_index(drop=True)))
+    new_ids = db.save_supplier_changes(changed, added, deleted_ids)
+    saved = pd.concat([changed, added.assign(id=new_ids)], ignore_index=True)
+    manual_data = patch_frame(manual_data, apply_schema(saved, categorical=False), deleted_ids)
+    processed_data = patch_frame(processed_data, saved, deleted_ids)
+    elapsed = time.perf_counter() - start
+    print(f"change set save   {elapsed * 1000:9.1f} ms (1 edited, 1 added, 1 deleted row)")
+
+    # The session frames match a full reload of the table
+    reloaded = db.get_suppliers_dataframe(categories=False)
+    same = (
+        len(reloaded) == len(manual_data) == len(processed_data)
+        and manual_data.set_index('id').sort_index()[['Date de paiement', 'Délai de paiement']].equals(
+            reloaded.set_index('id').sort_index()[['Date de paiement', 'Délai de paiement']])
+        and np.array_equal(np.sort(processed_data['id'].to_numpy()), np.sort(reloaded['id'].to_numpy()))
+    )
+    print(f"session frames match a full reload: {same}")
+
+    # Former save: the per-row part timed on a slice of the table and extrapolated
+    edited_data = manual_data.head(args.legacy_rows).copy()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _, row in process_data(edited_data).iterrows():
+            db.update_supplier(row['id'], row.to_dict())
+    per_row = (time.perf_counter() - start) / len(edited_data)
+
+    start = time.perf_counter()
+    fresh_data = db.get_suppliers_dataframe(categories=False)
+    non_db_data = processed_data[~processed_data['id'].isin(fresh_data['id'].tolist())]
+    pd.concat([non_db_data, fresh_data], ignore_index=True)
+    estimate = per_row * len(manual_data) + time.perf_counter() - start
+    print(f"former save       {estimate:9.1f} s (estimated from {len(edited_data):,} rows, {estimate / elapsed:,.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Wall time of montecarlo.monte_carlo over a one-year horizon for several path
+counts, checked against the target of 1 s per 100,000 paths (one core)
+
+Usage: python benchmarks/bench_monte_carlo.py [--paths 10000 100000 ...] [--movements N] [--horizon DAYS]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from montecarlo import monte_carlo
+from utils import process_data
+from _data import make_supplier_frame
+from bench_treasury_ledger import make_ledger, TODAY
+
+# Target wall time per 100,000 paths, in seconds
+TARGET_SECONDS_PER_100K = 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paths", type=int, nargs="+", default=[10_000, 50_000, 100_000, 400_000])
+    parser.add_argument("--movements", type=int, default=365, help="planned movements in the ledger")
+    parser.add_argument("--horizon", type=int, default=365)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the target (slower machines)")
+    args = parser.parse_args()
+
+    processed = process_data(make_supplier_frame(50_000))
+    ledger = make_ledger(args.movements)
+    print(f"movements: {args.movements}, horizon: {args.horizon} days, cpus: {os.cpu_count()}")
+
+    failures = 0
+    for n_paths in args.paths:
+        start = time.perf_counter()
+        bands = monte_carlo(ledger, processed, TODAY, horizon_days=args.horizon, n_paths=n_paths, seed=0)
+        elapsed = time.perf_counter() - start
+        target = TARGET_SECONDS_PER_100K * n_paths / 100_000 * args.scale
+        failures += elapsed > target
+        print(f"{n_paths:>9,} paths  {elapsed:7.3f} s  (target {target:.2f} s: {'ok' if elapsed <= target else 'over'}), "
+              f"max P(solde < 0) = {bands['Probabilité de solde négatif'].max():.1f}%")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Dashboard aggregates read from the supplier_month_summary table compared with
+the same aggregates computed on the invoice rows (query_suppliers, then
+groupby), plus the cost the table adds to writes: incremental refresh on
+add_supplier / update_supplier and the full rebuild after an import
+
+Usage: python benchmarks/bench_month_summary.py [--rows N] [--writes N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def row_aggregates(analytics, rows):
+    """The home page aggregates on the invoice rows"""
+    return {
+        'delay': analytics.supplier_delay_means(rows),
+        'amount': analytics.supplier_amount_totals(rows),
+        'month': analytics.period_summary(rows, 'Date de commande', 'M').drop(columns='Montant pénalité')
+    }
+
+
+def summary_aggregates(analytics, summary):
+    """The same aggregates on the summary rows"""
+    return {
+        'delay': analytics.summary_supplier_delay_means(summary),
+        'amount': analytics.summary_supplier_amount_totals(summary),
+        'month': analytics.summary_period(summary, 'M')
+    }
+
+
+def same_frames(left, right):
+    """Same labels and, within float rounding, same values"""
+    import numpy as np
+
+    if list(left.columns) != list(right.columns) or len(left) != len(right):
+        return False
+    for column in left.columns:
+        a, b = left[column].to_numpy(), right[column].to_numpy()
+        if a.dtype.kind in 'fi' and b.dtype.kind in 'fi':
+            if not np.allclose(a.astype(float), b.astype(float), equal_nan=True):
+                return False
+        elif not (left[column].astype(str).to_numpy() == right[column].astype(str).to_numpy()).all():
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--writes", type=int, default=200, help="single-row writes timed")
+    args = parser.parse_args()
+
+    os.environ["SUPPLIERS_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+    import numpy as np
+    import pandas as pd
+    with contextlib.redirect_stdout(io.StringIO()):
+        import database as db
+    import analytics
+    from utils import process_data
+    from _data import make_supplier_frame
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.add_suppliers_bulk(process_data(make_supplier_frame(args.rows)))
+
+    start = time.perf_counter()
+    db.rebuild_supplier_month_summary()
+    rebuild_time = time.perf_counter() - start
+
+    # The analytics cache is bypassed: every call below computes its aggregates
+    analytics.cache.clear()
+    start = time.perf_counter()
+    rows = db.query_suppliers()
+    expected = row_aggregates(analytics, rows)
+    rows_time = time.perf_counter() - start
+
+    analytics.cache.clear()
+    start = time.perf_counter()
+    summary = db.get_supplier_month_summary()
+    result = summary_aggregates(analytics, summary)
+    summary_time = time.perf_counter() - start
+
+    same = all(same_frames(expected[name], result[name]) for name in expected)
+    print(f"invoices: {len(rows):,}, summary rows: {len(summary):,}")
+    print(f"invoice rows      {rows_time * 1000:9.1f} ms (read + groupby)")
+    print(f"summary table     {summary_time * 1000:9.1f} ms ({rows_time / summary_time:.0f}x), same aggregates: {same}")
+    print(f"full rebuild      {rebuild_time * 1000:9.1f} ms")
+
+    # Single-row writes now also refresh their (supplier, month) summary rows
+    rng = np.random.default_rng(0)
+    ids = rng.choice(rows['id'].to_numpy(), args.writes, replace=False)
+    start = time.perf_counter()
+    for supplier_id in ids:
+        db.update_supplier(int(supplier_id), {'Montant de la commande': float(rng.integers(1000, 50000))})
+    update_time = (time.perf_counter() - start) / args.writes
+
+    template = {'Date de commande': pd.Timestamp('2023-06-15').date(), 'Délai de paiement': 30,
+                'Statut du paiement': 'Dans les délais'}
+    start = time.perf_counter()
+    for i in range(args.writes):
+        db.add_supplier({**template, 'Nom du fournisseur': f"Fournisseur {i % 200:04d}",
+                         'Montant de la commande': 1000 + i / 100})
+    add_time = (time.perf_counter() - start) / args.writes
+    print(f"update_supplier   {update_time * 1000:9.2f} ms per row, add_supplier {add_time * 1000:.2f} ms per row "
+          f"(summary refreshed in the same transaction)")
+
+    # The incrementally maintained table matches a rebuild
+    incremental = db.get_supplier_month_summary()
+    db.rebuild_supplier_month_summary()
+    consistent = same_frames(incremental, db.get_supplier_month_summary())
+    print(f"incremental summary matches a rebuild: {consistent}")
+
+    if not (same and consistent):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
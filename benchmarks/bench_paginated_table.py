@@ -0,0 +1,101 @@
+"""
+Detailed data tables: what st.dataframe serializes for the browser when it is
+given the whole sorted frame with a Styler (the former page tables) compared
+with paginated_table (search, sort and slicing in pandas, only the visible page
+styled). Sizes and times are those of Streamlit's own Arrow marshalling.
+
+Usage: python benchmarks/bench_paginated_table.py [--rows 10000 30000 ...] [--page-size N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Columns of the penalty table (pages/3_calcul_penalites.py)
+DISPLAY_COLUMNS = [
+    'Nom du fournisseur', 'Date de commande', 'Date de paiement', 'Montant de la commande',
+    'Délai de paiement', 'Jours de retard', 'Montant pénalité'
+]
+
+
+def highlight_late(val):
+    if isinstance(val, (int, float)) and val > 0:
+        return 'color: red'
+    return ''
+
+
+def style(styler):
+    return styler.map(highlight_late, subset=['Jours de retard', 'Montant pénalité'])
+
+
+def marshalled(data):
+    """(bytes sent to the browser, seconds) of st.dataframe(data)"""
+    from streamlit.elements.arrow import marshall
+    from streamlit.proto.Arrow_pb2 import Arrow as ArrowProto
+
+    proto = ArrowProto()
+    start = time.perf_counter()
+    marshall(proto, data, default_uuid="bench")
+    return proto.ByteSize(), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 30_000, 60_000])
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    import pandas as pd
+    import analytics
+    from paginated_table import row_order, page_rows
+    from utils import process_data, calculate_penalties
+    from _data import make_supplier_frame
+
+    print(f"{'rows':>9}  {'full frame + Styler':>22}  {'page (first sort)':>22}  {'next page':>10}  {'same rows':>9}")
+    all_same = True
+    for rows in args.rows:
+        with contextlib.redirect_stdout(io.StringIO()):
+            data = calculate_penalties(process_data(make_supplier_frame(rows)))
+
+        # Former tables: sort the whole frame, style every cell, send everything. Streamlit refuses a
+        # Styler over styler.render.max_elements cells (262,144 by default): raised here to time it
+        cells = len(data) * len(DISPLAY_COLUMNS)
+        over_limit = cells > pd.get_option("styler.render.max_elements")
+        pd.set_option("styler.render.max_elements", max(cells, pd.get_option("styler.render.max_elements")))
+        start = time.perf_counter()
+        sorted_data = data.sort_values('Montant pénalité', ascending=False)
+        full_bytes, _ = marshalled(style(sorted_data[DISPLAY_COLUMNS].style))
+        full_time = time.perf_counter() - start
+
+        # paginated_table: sort order memoized, one page styled and sent
+        analytics.cache.clear()
+        start = time.perf_counter()
+        positions = row_order(data, 'Montant pénalité', False, '', tuple(DISPLAY_COLUMNS))
+        page = page_rows(data, positions, 0, args.page_size, DISPLAY_COLUMNS)
+        page_bytes, _ = marshalled(style(page.style))
+        page_time = time.perf_counter() - start
+
+        # Paging reuses the memoized order
+        start = time.perf_counter()
+        positions = row_order(data, 'Montant pénalité', False, '', tuple(DISPLAY_COLUMNS))
+        marshalled(style(page_rows(data, positions, args.page_size, 2 * args.page_size, DISPLAY_COLUMNS).style))
+        next_time = time.perf_counter() - start
+
+        same = page['Montant pénalité'].equals(sorted_data['Montant pénalité'].iloc[:args.page_size])
+        all_same = all_same and same
+        print(f"{rows:>9,}  {full_bytes / 1e6:>8.1f} MB {full_time:>8.2f} s  "
+              f"{page_bytes / 1e3:>8.1f} kB {page_time * 1000:>6.0f} ms  {next_time * 1000:>7.0f} ms  {str(same):>9}"
+              + ("  (full frame over the default Styler limit)" if over_limit else ""))
+
+    if not all_same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Parquet mirror of the suppliers table (parquet_mirror.py): full sync, then
+the page queries answered by SQLite (database.query_suppliers) and by the
+mirror (partitions pruned on the order month, only the needed columns read,
+memory-mapped), and the incremental sync after a single edit
+
+Usage: python benchmarks/bench_parquet_mirror.py [--rows N] [--runs N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Audit page columns (reports.NON_COMPLIANT_COLUMNS and the payment status)
+AUDIT_COLUMNS = [
+    'Nom du fournisseur', 'Date de commande', 'Date de paiement', 'Montant de la commande',
+    'Délai de paiement', 'Jours de retard', 'Montant pénalité', 'Statut du paiement'
+]
+
+# (label, query_suppliers filters) of the timed page queries
+QUERIES = [
+    ("whole table", {}),
+    ("one year", {'date_from': '2023-01-01', 'date_to': '2023-12-31'}),
+    ("one quarter, audit columns", {'date_from': '2024-04-01', 'date_to': '2024-06-30', 'columns': AUDIT_COLUMNS}),
+    ("one supplier, one year", {'supplier': 'Fournisseur 0042', 'date_from': '2022-01-01', 'date_to': '2022-12-31'})
+]
+
+
+def best_of(runs, func):
+    """Fastest of runs calls: (result, seconds)"""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["SUPPLIERS_DB_PATH"] = os.path.join(tmp, "bench.db")
+    mirror_dir = os.path.join(tmp, "mirror")
+
+    import pandas as pd
+    with contextlib.redirect_stdout(io.StringIO()):
+        import database as db
+    import parquet_mirror
+    from utils import process_data, calculate_penalties
+    from _data import make_supplier_frame
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.add_suppliers_bulk(calculate_penalties(process_data(make_supplier_frame(args.rows))))
+
+    start = time.perf_counter()
+    months = parquet_mirror.sync_mirror(mirror_dir)
+    sync_time = time.perf_counter() - start
+    manifest = parquet_mirror.load_manifest(mirror_dir)
+    size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(mirror_dir) for name in names)
+    print(f"rows: {args.rows:,}, full sync: {months} partitions in {sync_time:.1f} s ({size / 1e6:.0f} MB)")
+
+    print(f"{'query':<28}{'rows':>10}{'partitions':>12}{'SQLite (s)':>12}{'mirror (s)':>12}{'same':>6}")
+    all_same = True
+    for label, filters in QUERIES:
+        expected, sqlite_time = best_of(args.runs, lambda: db.query_suppliers(**filters))
+        result, mirror_time = best_of(
+            args.runs, lambda: parquet_mirror.read_suppliers(directory=mirror_dir, manifest=manifest, **filters)
+        )
+        partitions = parquet_mirror.prune_partitions(manifest, filters.get('date_from'), filters.get('date_to'))
+        same = expected.reset_index(drop=True).equals(result.reset_index(drop=True))
+        all_same = all_same and same
+        print(f"{label:<28}{len(expected):>10,}{len(partitions):>6}/{len(manifest['partitions']):<5}"
+              f"{sqlite_time:>12.3f}{mirror_time:>12.3f}{str(same):>6}")
+
+    # One edit makes one month stale: the sync rewrites that month only
+    supplier_id = int(db.query_suppliers(date_from='2023-06-01', date_to='2023-06-30', columns=[])['id'].iloc[0])
+    db.update_supplier(supplier_id, {'Date de paiement': pd.Timestamp('2023-09-30').date()})
+    current = parquet_mirror.is_current(mirror_dir)
+    start = time.perf_counter()
+    months = parquet_mirror.sync_mirror(mirror_dir)
+    print(f"after one edit: current={current}, incremental sync of {months} month(s) in "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms, current={parquet_mirror.is_current(mirror_dir)}")
+
+    if not all_same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
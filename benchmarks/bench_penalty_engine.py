@@ -0,0 +1,115 @@
+"""
+Penalty engine (penalties.py) on millions of invoices: timings against the
+single-rate formula calculate_penalties used to apply and with negotiated terms
+for every supplier and a multi-year rate schedule, cross-checked at scale
+against the former formula and a day-by-day accrual (the golden cases
+themselves are in tests/test_penalties.py)
+
+Usage: python benchmarks/bench_penalty_engine.py [--rows N] [--rate-changes N] [--sample N]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from penalties import TERMS_COLUMNS, SCHEDULE_COLUMNS, REFERENCE_RECEIPT, START_REFERENCES, accrue_penalties
+from utils import process_data, calculate_penalties, late_days, PENALTY_INTEREST_RATE, STANDARD_PAYMENT_DELAY
+from _data import make_supplier_frame
+
+
+def legacy_penalties(data):
+    """The formula calculate_penalties used to apply: one delay, one rate"""
+    late = late_days(data['Délai de paiement'], STANDARD_PAYMENT_DELAY)
+    return late, (data['Montant de la commande'] * PENALTY_INTEREST_RATE * late) / 365
+
+
+def make_terms(data, seed=0):
+    """Negotiated terms for every supplier: 30 to 120 days from order or receipt"""
+    rng = np.random.default_rng(seed)
+    suppliers = data['Nom du fournisseur'].cat.categories
+    return pd.DataFrame({
+        TERMS_COLUMNS[0]: suppliers,
+        TERMS_COLUMNS[1]: rng.choice([30, 45, 60, 90, 120], len(suppliers)),
+        TERMS_COLUMNS[2]: rng.choice(START_REFERENCES, len(suppliers))
+    })
+
+
+def make_schedule(n_changes, seed=0):
+    """A rate change every few months over the ledger years"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        SCHEDULE_COLUMNS[0]: pd.date_range("2020-01-01", "2025-12-31", periods=n_changes).normalize(),
+        SCHEDULE_COLUMNS[1]: rng.uniform(0.02, 0.08, n_changes).round(4)
+    })
+
+
+def day_by_day(row, terms, schedule):
+    """Per-row reference: sum the rate in force on every late day"""
+    supplier_terms = terms.set_index(TERMS_COLUMNS[0]).loc[row['Nom du fournisseur']]
+    reference = row['Date de réception'] if supplier_terms[TERMS_COLUMNS[2]] == REFERENCE_RECEIPT else row['Date de commande']
+    due = reference + pd.Timedelta(days=int(supplier_terms[TERMS_COLUMNS[1]]))
+    if pd.isna(row['Date de paiement']) or row['Date de paiement'] <= due:
+        return 0.0
+    total = 0.0
+    for day in pd.date_range(due, row['Date de paiement'] - pd.Timedelta(days=1)):
+        in_force = schedule[schedule[SCHEDULE_COLUMNS[0]] <= day]
+        rate = in_force[SCHEDULE_COLUMNS[1]].iloc[-1] if not in_force.empty else schedule[SCHEDULE_COLUMNS[1]].iloc[0]
+        total += rate
+    return row['Montant de la commande'] * total / 365
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--rate-changes", type=int, default=24)
+    parser.add_argument("--sample", type=int, default=300, help="invoices checked day by day")
+    args = parser.parse_args()
+
+    data = process_data(make_supplier_frame(args.rows))
+    terms = make_terms(data)
+    schedule = make_schedule(args.rate_changes)
+    print(f"rows: {len(data):,}, suppliers: {len(terms)}, rate periods: {len(schedule)}")
+
+    # Golden check 1: default terms and a single rate give the former formula
+    start = time.perf_counter()
+    legacy_late, legacy_penalty = legacy_penalties(data)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    default = calculate_penalties(data)
+    default_time = time.perf_counter() - start
+    same_days = np.array_equal(default['Jours de retard'].to_numpy(), legacy_late.to_numpy())
+    same_penalties = np.allclose(default['Montant pénalité'], legacy_penalty, rtol=1e-12, atol=0, equal_nan=True)
+    print(f"single rate       {default_time * 1000:9.1f} ms (former formula {legacy_time * 1000:.1f} ms), "
+          f"same days late: {same_days}, same penalties: {same_penalties}")
+
+    # Timing with negotiated terms and the rate schedule
+    start = time.perf_counter()
+    late, penalty = accrue_penalties(data, terms, schedule)
+    elapsed = time.perf_counter() - start
+    print(f"terms + schedule  {elapsed * 1000:9.1f} ms ({len(data) / elapsed / 1e6:.1f} M invoices/s), "
+          f"{(late > 0).sum():,} late, {penalty.sum():,.2f} € of penalties")
+
+    # Golden check 2: day-by-day accrual on a sample of late invoices
+    sample = data[late > 0].sample(min(args.sample, int((late > 0).sum())), random_state=0)
+    start = time.perf_counter()
+    expected = sample.apply(day_by_day, axis=1, args=(terms, schedule)).to_numpy()
+    per_row_time = (time.perf_counter() - start) / len(sample)
+    positions = data.index.get_indexer(sample.index)
+    same = np.allclose(penalty[positions], expected, rtol=1e-9)
+    print(f"day-by-day check  {len(sample):,} invoices, same penalties: {same} "
+          f"(per-row Python: ~{per_row_time * len(data) / 60:.0f} min for every invoice)")
+
+    if not (same_days and same_penalties and same):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compliance trend over 5 years of daily orders: analytics.period_summary (one
+groupby per granularity) compared with the per-period filter + pd.concat loop
+the audit page used to run
+
+Usage: python benchmarks/bench_period_summary.py [--rows N]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from analytics import period_summary, PERIOD_COLUMNS
+from utils import process_data
+from _data import make_supplier_frame
+
+# pandas Period frequency of each granularity, for the legacy loop
+LEGACY_FREQUENCIES = {'D': 'D', 'W': 'W-SUN', 'M': 'M', 'Q': 'Q'}
+
+
+def legacy_compliance(filtered_data, period):
+    """The loop of the audit page: one boolean filter and one concat per period"""
+    period_data = filtered_data.copy()
+    period_data['Période'] = pd.to_datetime(period_data['Date de commande']).dt.to_period(LEGACY_FREQUENCIES[period]).astype(str)
+
+    compliance = pd.DataFrame()
+    for label in period_data['Période'].unique():
+        subset = period_data[period_data['Période'] == label]
+        compliant = subset.shape[0] - subset[subset['Statut du paiement'] == 'En retard'].shape[0]
+        compliance_rate = (compliant / subset.shape[0]) * 100
+        compliance = pd.concat([compliance, pd.DataFrame([{'Période': label, 'Taux de conformité': compliance_rate}])])
+    return compliance
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    args = parser.parse_args()
+
+    data = process_data(make_supplier_frame(args.rows))
+    span = data['Date de commande'].max() - data['Date de commande'].min()
+    print(f"rows: {len(data):,}, span: {span.days} days")
+    print(f"{'period':<11}{'periods':>9}{'loop (s)':>11}{'groupby (ms)':>14}{'speed-up':>10}")
+
+    for period, name in PERIOD_COLUMNS.items():
+        start = time.perf_counter()
+        legacy = legacy_compliance(data, period)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        summary = period_summary.uncached(data, 'Date de commande', period)
+        elapsed = time.perf_counter() - start
+
+        same = np.allclose(
+            np.sort(legacy['Taux de conformité'].to_numpy(dtype=float)),
+            np.sort(summary['Taux de conformité'].to_numpy())
+        )
+        print(f"{name:<11}{len(summary):>9,}{legacy_time:>11.2f}{elapsed * 1000:>14.1f}"
+              f"{legacy_time / elapsed:>9.0f}x{'' if same else '  (results differ!)'}")
+
+
+if __name__ == "__main__":
+    main()
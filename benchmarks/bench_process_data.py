@@ -0,0 +1,77 @@
+"""
+Throughput of utils.process_data + utils.calculate_penalties compared with
+the previous per-row implementation (Series.apply with Python lambdas)
+
+Usage: python benchmarks/bench_process_data.py [--rows N]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from utils import process_data, calculate_penalties, PENALTY_INTEREST_RATE
+from _data import make_supplier_frame
+
+
+def legacy_process(df, standard_delay=60):
+    """The per-row implementation process_data and calculate_penalties used to have"""
+    for col in ['Date de commande', 'Date de réception', 'Date de paiement']:
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+    df['Délai de paiement'] = (df['Date de paiement'] - df['Date de commande']).dt.days
+    df['Statut du paiement'] = df['Délai de paiement'].apply(
+        lambda x: 'Dans les délais' if x <= standard_delay else 'En retard'
+    )
+    df['Montant de la commande'] = pd.to_numeric(df['Montant de la commande'], errors='coerce')
+    df = df.copy()
+    df['Jours de retard'] = df['Délai de paiement'].apply(lambda x: max(0, x - standard_delay))
+    df['Montant pénalité'] = df['Montant de la commande'] * PENALTY_INTEREST_RATE * df['Jours de retard'] / 365
+    return df
+
+
+def vectorized_process(df):
+    return calculate_penalties(process_data(df))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    raw = make_supplier_frame(args.rows)
+    results = {}
+    for name, func in [("apply", legacy_process), ("vectorized", vectorized_process)]:
+        df = raw.copy()
+        start = time.perf_counter()
+        results[name] = func(df)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<11}{elapsed:8.3f} s  {args.rows / elapsed:>14,.0f} rows/s")
+
+    # Both implementations agree on every paid invoice; unpaid ones now get their own status.
+    # Values are compared, not their text: the dtypes differ and the penalties by float rounding
+    paid = results["vectorized"]['Date de paiement'].notna()
+    all_same = True
+    for col in ['Statut du paiement', 'Jours de retard', 'Montant pénalité']:
+        expected, result = results["apply"].loc[paid, col], results["vectorized"].loc[paid, col]
+        if col == 'Statut du paiement':
+            expected, result = expected.astype(str), result.astype(str)
+        try:
+            pd.testing.assert_series_equal(expected, result, check_dtype=False)
+            same = True
+        except AssertionError:
+            same = False
+        all_same = all_same and same
+        print(f"{col:<20} equal on paid invoices: {same}")
+    print(results["vectorized"]['Statut du paiement'].value_counts().to_string())
+
+    if not all_same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
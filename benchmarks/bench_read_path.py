@@ -0,0 +1,72 @@
+"""
+Compare the ORM read path (get_all_suppliers -> to_dict -> DataFrame)
+with the columnar database.get_suppliers_dataframe
+
+Usage: python benchmarks/bench_read_path.py [--rows N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(func):
+    """
+    Run func twice: once for wall time, once under tracemalloc for the peak
+    allocated memory (tracing slows Python-level loops down too much to time them)
+    Returns (result, seconds, peak MB)
+    """
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    os.environ["SUPPLIERS_DB_PATH"] = os.path.join(tmp_dir, "bench.db")
+
+    import pandas as pd
+    import database as db
+    from utils import process_data
+    from _data import make_supplier_frame
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.add_suppliers_bulk(process_data(make_supplier_frame(args.rows)))
+
+    def orm_path():
+        df = pd.DataFrame(db.get_all_suppliers())
+        for col in ['Date de commande', 'Date de réception', 'Date de paiement']:
+            df[col] = pd.to_datetime(df[col])
+        return df
+
+    orm_df, orm_time, orm_peak = measure(orm_path)
+    col_df, col_time, col_peak = measure(db.get_suppliers_dataframe)
+
+    print(f"rows: {len(col_df)}")
+    print(f"{'path':<10}{'time (s)':>10}{'peak (MB)':>12}{'frame (MB)':>12}")
+    for name, df, elapsed, peak in [("orm", orm_df, orm_time, orm_peak), ("columnar", col_df, col_time, col_peak)]:
+        size = df.memory_usage(deep=True).sum() / 1e6
+        print(f"{name:<10}{elapsed:>10.2f}{peak:>12.1f}{size:>12.1f}")
+    print(f"speed-up: x{orm_time / col_time:.1f}, peak memory: x{orm_peak / col_peak:.1f} lower")
+
+
+if __name__ == "__main__":
+    main()
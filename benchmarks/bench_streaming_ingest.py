@@ -0,0 +1,81 @@
+"""
+Compare the whole-file upload path (read_csv/read_excel -> process_data -> add_suppliers_bulk)
+with the chunked ingestion.ingest_upload on the same file: time and peak memory
+
+Usage: python benchmarks/bench_streaming_ingest.py [--rows N] [--chunk-rows N] [--excel]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(func):
+    """Run func under tracemalloc, returns (result, seconds, peak MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=50_000)
+    parser.add_argument("--excel", action="store_true", help="benchmark an .xlsx file instead of a CSV")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    os.environ["SUPPLIERS_DB_PATH"] = os.path.join(tmp_dir, "bench.db")
+
+    import pandas as pd
+    import database as db
+    from ingestion import ingest_upload
+    from utils import process_data
+    from _data import make_supplier_frame
+
+    name = "upload.xlsx" if args.excel else "upload.csv"
+    path = os.path.join(tmp_dir, name)
+    frame = make_supplier_frame(args.rows)
+    if args.excel:
+        frame.to_excel(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+    del frame
+    print(f"rows: {args.rows}, file: {os.path.getsize(path) / 1e6:.1f} MB")
+
+    def whole_file():
+        with open(path, "rb") as source:
+            data = pd.read_excel(source) if args.excel else pd.read_csv(source)
+        return db.add_suppliers_bulk(process_data(data))[0]
+
+    def streaming():
+        with open(path, "rb") as source:
+            stored = ingest_upload(source, name, chunk_rows=args.chunk_rows)[1]
+        db.finish_import()
+        return stored
+
+    print(f"{'path':<12}{'rows stored':>12}{'time (s)':>10}{'peak (MB)':>12}")
+    results = {}
+    for label, func in [("whole file", whole_file), ("streaming", streaming)]:
+        db.delete_all_suppliers()
+        stored, elapsed, peak = measure(func)
+        results[label] = peak
+        print(f"{label:<12}{stored:>12}{elapsed:>10.2f}{peak:>12.1f}")
+    print(f"peak memory: x{results['whole file'] / results['streaming']:.1f} lower")
+
+
+if __name__ == "__main__":
+    main()
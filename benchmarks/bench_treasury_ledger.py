@@ -0,0 +1,116 @@
+"""
+Scenario simulation of the cash tracking page: the vectorized treasury.simulate_scenario
+compared with the previous per-row .loc/.iloc balance loops
+
+The loops are quadratic-ish in practice (every .loc write goes through the
+indexing machinery), so they run on a smaller ledger and are extrapolated.
+
+Usage: python benchmarks/bench_treasury_ledger.py [--rows N] [--legacy-rows N]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+from treasury import simulate_scenario, TYPE_OPENING, TYPE_OUTFLOW, TYPE_INFLOW
+
+TODAY = pd.Timestamp("2025-01-01")
+
+
+def make_ledger(n_rows, seed=0):
+    """Opening balance followed by n_rows dated inflows and outflows, in date order"""
+    rng = np.random.default_rng(seed)
+    amounts = rng.integers(1000, 20000, n_rows).astype(float)
+    ledger = pd.DataFrame({
+        'Date': TODAY + pd.to_timedelta(np.sort(rng.integers(1, 3 * 365, n_rows)), unit="D"),
+        'Type': np.where(rng.random(n_rows) < 0.7, TYPE_OUTFLOW, TYPE_INFLOW),
+        'Fournisseur': 'Fournisseur',
+        'Montant prévu': amounts,
+        'Montant payé': amounts,
+        'Écart': 0.0,
+        'Solde': 0.0,
+    })
+    opening = pd.DataFrame([{
+        'Date': TODAY, 'Type': TYPE_OPENING, 'Fournisseur': '',
+        'Montant prévu': 100000.0, 'Montant payé': 100000.0, 'Écart': 0.0, 'Solde': 100000.0
+    }])
+    return pd.concat([opening, ledger], ignore_index=True)
+
+
+def legacy_scenario(treasury_data, initial_balance, new_initial_balance, payment_reduction, emergency_funding):
+    """The balance loops the scenario planner used to run (payment reduction + funding)"""
+    scenario_data = treasury_data.copy()
+
+    balance_diff = new_initial_balance - initial_balance
+    scenario_data.loc[0, 'Montant prévu'] = new_initial_balance
+    scenario_data.loc[0, 'Montant payé'] = new_initial_balance
+    scenario_data.loc[0, 'Solde'] = new_initial_balance
+    for i in range(1, len(scenario_data)):
+        scenario_data.loc[i, 'Solde'] += balance_diff
+
+    future_payment_indices = scenario_data[
+        (scenario_data['Date'] > TODAY) & (scenario_data['Type'] == TYPE_OUTFLOW)
+    ].index
+    reduction_factor = 1 - (payment_reduction / 100)
+    scenario_data.loc[future_payment_indices, 'Montant prévu'] *= reduction_factor
+    scenario_data.loc[future_payment_indices, 'Montant payé'] *= reduction_factor
+    current_balance = scenario_data.loc[0, 'Solde']
+    for i in range(1, len(scenario_data)):
+        if scenario_data.loc[i, 'Type'] == TYPE_OUTFLOW:
+            current_balance -= scenario_data.loc[i, 'Montant payé']
+        elif scenario_data.loc[i, 'Type'] == TYPE_INFLOW:
+            current_balance += scenario_data.loc[i, 'Montant payé']
+        scenario_data.loc[i, 'Solde'] = current_balance
+
+    funding_date = scenario_data[scenario_data['Date'] > TODAY]['Date'].min()
+    funding_entry = pd.DataFrame([{
+        'Date': funding_date, 'Type': TYPE_INFLOW, 'Fournisseur': "Financement d'urgence",
+        'Montant prévu': emergency_funding, 'Montant payé': emergency_funding, 'Écart': 0, 'Solde': 0
+    }])
+    scenario_data = pd.concat([scenario_data, funding_entry], ignore_index=True).sort_values('Date', kind='stable')
+    current_balance = scenario_data.iloc[0]['Solde']
+    for i in range(1, len(scenario_data)):
+        if scenario_data.iloc[i]['Type'] == TYPE_OUTFLOW:
+            current_balance -= scenario_data.iloc[i]['Montant payé']
+        elif scenario_data.iloc[i]['Type'] == TYPE_INFLOW:
+            current_balance += scenario_data.iloc[i]['Montant payé']
+        scenario_data.iloc[i, scenario_data.columns.get_loc('Solde')] = current_balance
+    return scenario_data
+
+
+def vectorized_scenario(ledger):
+    return simulate_scenario(
+        ledger, TODAY, opening_balance=150000.0, outflow_reduction=0.2, funding=50000.0
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--legacy-rows", type=int, default=2_000)
+    args = parser.parse_args()
+
+    small = make_ledger(args.legacy_rows)
+    start = time.perf_counter()
+    legacy = legacy_scenario(small, 100000.0, 150000.0, 20, 50000.0)
+    legacy_time = time.perf_counter() - start
+    same = np.allclose(legacy['Solde'].to_numpy(dtype=float), vectorized_scenario(small)['Solde'].to_numpy())
+    print(f"loops       {args.legacy_rows:>9,} movements {legacy_time:9.3f} s "
+          f"(~{legacy_time * args.rows / args.legacy_rows:,.0f} s extrapolated to {args.rows:,})")
+
+    ledger = make_ledger(args.rows)
+    start = time.perf_counter()
+    vectorized_scenario(ledger)
+    elapsed = time.perf_counter() - start
+    print(f"vectorized  {args.rows:>9,} movements {elapsed * 1000:9.1f} ms")
+    print(f"balances identical to the loops on {args.legacy_rows:,} movements: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Treasury ledger stored in the treasury_movements table: batched append of a
+multi-year ledger, single inserts (the running balance is only rewritten from
+the inserted date onward) and the date-window load of the cash tracking page
+
+Usage: python benchmarks/bench_treasury_store.py [--rows N] [--window-days DAYS]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--window-days", type=int, default=120)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    os.environ["SUPPLIERS_DB_PATH"] = os.path.join(tmp_dir, "bench.db")
+
+    import numpy as np
+    import pandas as pd
+    with contextlib.redirect_stdout(io.StringIO()):
+        import database as db
+    from treasury import carry_forward, compute_balances, TYPE_OUTFLOW
+    from bench_treasury_ledger import make_ledger, TODAY
+
+    ledger = make_ledger(args.rows)
+    stored, elapsed = timed(lambda: db.add_treasury_movements(ledger))
+    print(f"batched append    {stored:>9,} movements {elapsed:9.3f} s")
+
+    last_date = ledger['Date'].max()
+    for label, date in [("insert (last day)", last_date), ("insert (mid-ledger)", TODAY + (last_date - TODAY) / 2)]:
+        movement = {'Date': date, 'Type': TYPE_OUTFLOW, 'Fournisseur': 'Fournisseur',
+                    'Montant prévu': 1000.0, 'Montant payé': 1000.0, 'Écart': 0.0}
+        _, elapsed = timed(lambda: db.add_treasury_movement(movement))
+        print(f"{label:<18}{'':>20}{elapsed * 1000:9.1f} ms")
+
+    start = TODAY + pd.Timedelta(days=365)
+    end = start + pd.Timedelta(days=args.window_days)
+
+    def load_window():
+        window = db.get_treasury_movements(start, end).drop(columns='id')
+        return carry_forward(window, db.get_treasury_balance_before(start), start)
+
+    window, elapsed = timed(load_window)
+    print(f"window load       {len(window):>9,} movements {elapsed * 1000:9.1f} ms ({args.window_days} days)")
+    _, elapsed = timed(db.get_treasury_movements)
+    print(f"full load         {stored + 2:>9,} movements {elapsed * 1000:9.1f} ms")
+
+    same = np.allclose(window['Solde'].to_numpy(), compute_balances(window)['Solde'].to_numpy())
+    print(f"stored balances of the window match a recomputation: {same}")
+
+
+if __name__ == "__main__":
+    main()
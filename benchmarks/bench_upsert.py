@@ -0,0 +1,65 @@
+"""
+Re-importing a ledger with database.upsert_suppliers (INSERT ... ON CONFLICT
+DO UPDATE on the supplier and invoice number, in batches): first import, identical
+re-import, then a re-import where some invoices were paid and new ones added.
+The table must never hold a duplicate invoice.
+
+Usage: python benchmarks/bench_upsert.py [--rows N] [--batch-size B] [--changed FRACTION] [--new FRACTION]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--changed", type=float, default=0.1, help="fraction of invoices paid since the first import")
+    parser.add_argument("--new", type=float, default=0.05, help="fraction of new invoices in the re-import")
+    args = parser.parse_args()
+
+    os.environ["SUPPLIERS_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+    import pandas as pd
+    with contextlib.redirect_stdout(io.StringIO()):
+        import database as db
+    from utils import process_data
+    from _data import make_supplier_frame
+
+    ledger = make_supplier_frame(args.rows)
+    ledger['Numéro de facture'] = [f"F{i:08d}" for i in range(len(ledger))]
+
+    # The later export: unpaid invoices got paid, new invoices were added
+    updated_ledger = ledger.copy()
+    unpaid = updated_ledger.index[updated_ledger['Date de paiement'].isna()]
+    paid_now = unpaid[:int(args.rows * args.changed)]
+    updated_ledger.loc[paid_now, 'Date de paiement'] = updated_ledger.loc[paid_now, 'Date de commande'] + pd.Timedelta(days=75)
+    new_invoices = make_supplier_frame(int(args.rows * args.new), seed=1)
+    new_invoices['Numéro de facture'] = [f"F{i:08d}" for i in range(len(ledger), len(ledger) + len(new_invoices))]
+    updated_ledger = pd.concat([updated_ledger, new_invoices], ignore_index=True)
+
+    print(f"{'import':<22}{'rows':>9}{'inserted':>10}{'updated':>9}{'unchanged':>11}{'seconds':>9}{'rows/s':>10}")
+    for label, frame in [("first import", ledger), ("identical re-import", ledger), ("updated re-import", updated_ledger)]:
+        processed = process_data(frame.copy())
+        start = time.perf_counter()
+        inserted, updated, unchanged = db.upsert_suppliers(processed, batch_size=args.batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<22}{len(processed):>9,}{inserted:>10,}{updated:>9,}{unchanged:>11,}"
+              f"{elapsed:>9.2f}{len(processed) / elapsed:>10,.0f}")
+
+    stored = db.get_suppliers_dataframe()
+    duplicates = stored.duplicated(['Nom du fournisseur', 'Numéro de facture']).sum()
+    print(f"rows in the table: {len(stored):,} (expected {len(updated_ledger):,}), duplicate invoices: {duplicates}")
+
+
+if __name__ == "__main__":
+    main()
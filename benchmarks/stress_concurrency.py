@@ -0,0 +1,114 @@
+"""
+Concurrency stress test: N reader threads and M writer threads hammer the
+same SQLite file through the database module for a fixed duration
+
+Readers run filtered queries (query_suppliers), writers alternate between
+add_supplier and update_supplier. Every failed operation, including
+"database is locked", is counted. Compare with the rollback journal by
+running with SUPPLIERS_DB_JOURNAL_MODE=DELETE
+
+Usage: python benchmarks/stress_concurrency.py [--readers N] [--writers M] [--duration S] [--rows R]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+class ErrorCounter(io.TextIOBase):
+    """Stand-in for stdout that counts the error lines printed by the database module"""
+
+    def __init__(self):
+        self.error_lines = 0
+        self.locked = 0
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        with self._lock:
+            if "Erreur" in text:
+                self.error_lines += 1
+            if "locked" in text:
+                self.locked += 1
+        return len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    os.environ["SUPPLIERS_DB_PATH"] = os.path.join(tmp_dir, "bench.db")
+
+    import database as db
+    from utils import process_data
+    from _data import make_supplier_frame
+
+    seed = process_data(make_supplier_frame(args.rows, n_suppliers=50))
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.add_suppliers_bulk(seed)
+    suppliers = seed['Nom du fournisseur'].unique().tolist()
+    template = seed.iloc[0].to_dict()
+
+    stop = threading.Event()
+    counts = {"reads": 0, "writes": 0, "failed_writes": 0}
+    counts_lock = threading.Lock()
+    read_latencies = []
+
+    def reader(worker_id):
+        rng = random.Random(worker_id)
+        while not stop.is_set():
+            start = time.perf_counter()
+            db.query_suppliers(supplier=rng.choice(suppliers), date_from="2022-01-01")
+            elapsed = time.perf_counter() - start
+            with counts_lock:
+                counts["reads"] += 1
+                read_latencies.append(elapsed)
+
+    def writer(worker_id):
+        rng = random.Random(1000 + worker_id)
+        while not stop.is_set():
+            if rng.random() < 0.5:
+                ok = db.add_supplier({**template, 'Nom du fournisseur': rng.choice(suppliers),
+                                      'Montant de la commande': round(rng.uniform(1000, 50000), 2)})
+            else:
+                ok = db.update_supplier(rng.randint(1, args.rows), {'Montant de la commande': rng.uniform(1000, 50000)})
+            with counts_lock:
+                counts["writes"] += 1
+                counts["failed_writes"] += not ok
+
+    errors = ErrorCounter()
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    with contextlib.redirect_stdout(errors):
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    read_latencies.sort()
+    p50 = read_latencies[len(read_latencies) // 2] * 1000 if read_latencies else float("nan")
+    p95 = read_latencies[int(len(read_latencies) * 0.95)] * 1000 if read_latencies else float("nan")
+    print(f"journal_mode={db.SQLITE_JOURNAL_MODE} readers={args.readers} writers={args.writers} duration={args.duration}s")
+    print(f"reads : {counts['reads']:>8}  ({counts['reads'] / args.duration:,.0f}/s)  p50 {p50:.1f} ms  p95 {p95:.1f} ms")
+    print(f"writes: {counts['writes']:>8}  ({counts['writes'] / args.duration:,.0f}/s)  failed {counts['failed_writes']}")
+    print(f"errors: {errors.error_lines}  (database is locked: {errors.locked})")
+    return 1 if errors.error_lines else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Change sets of the manual entry editor
+
+st.data_editor keeps its edits in st.session_state[key] as row positions of
+the frame it was given: {'edited_rows': {position: {column: value}},
+'added_rows': [{column: value}], 'deleted_rows': [position]}. editor_changes
+turns that into the rows to update, insert and delete, so a save only
+processes and writes those rows, and patch_frame applies the saved rows to the
+frames kept in the session by id instead of reloading the whole table.
+"""
+import numpy as np
+import pandas as pd
+
+DATE_COLUMNS = ['Date de commande', 'Date de réception', 'Date de paiement']
+
+# Columns the suppliers table requires (rows missing one are not saved)
+REQUIRED_COLUMNS = ['Nom du fournisseur', 'Date de commande', 'Montant de la commande']
+
+
+def _editor_value(column, value):
+    """Editor cell value (JSON: dates are ISO strings) in the dtype of the frame"""
+    if column in DATE_COLUMNS:
+        return pd.to_datetime(value, errors='coerce') if value not in (None, '') else pd.NaT
+    if column == 'Montant de la commande':
+        return pd.to_numeric(value, errors='coerce') if value not in (None, '') else np.nan
+    return value
+
+
+def editor_changes(original, state):
+    """
+    Rows changed, added and deleted in a st.data_editor over original
+    Returns (changed rows with their id, added rows, ids of the deleted rows)
+    """
+    deleted = sorted(int(position) for position in state.get('deleted_rows', []))
+    edited = {
+        int(position): cells
+        for position, cells in state.get('edited_rows', {}).items()
+        if int(position) not in set(deleted)
+    }
+
+    changed_rows = []
+    for position in sorted(edited):
+        row = original.iloc[position].to_dict()
+        row.update({column: _editor_value(column, value) for column, value in edited[position].items()})
+        changed_rows.append(row)
+    changed = pd.DataFrame(changed_rows, columns=original.columns)
+
+    columns = [col for col in original.columns if col != 'id']
+    added = pd.DataFrame(
+        [{column: _editor_value(column, value) for column, value in row.items()} for row in state.get('added_rows', [])],
+        columns=columns
+    )
+    for col in DATE_COLUMNS:
+        for frame in (changed, added):
+            if col in frame.columns:
+                frame[col] = pd.to_datetime(frame[col], errors='coerce')
+
+    deleted_ids = original['id'].iloc[deleted].dropna().astype(int).tolist() if 'id' in original.columns else []
+    return changed, added, deleted_ids
+
+
+def valid_rows(df):
+    """Mask of the rows that have every required column (and a non-blank supplier name)"""
+    mask = df[REQUIRED_COLUMNS].notna().all(axis=1)
+    return mask & (df['Nom du fournisseur'].astype(str).str.strip() != '')
+
+
+def patch_frame(df, rows, deleted_ids=()):
+    """
+    Apply saved rows to df by id: rows whose id is in df are overwritten in
+    place, the others are appended, and deleted ids are dropped
+    Categorical columns gain the new categories; returns the patched frame
+    """
+    if df.empty:
+        return rows[~rows['id'].isin(deleted_ids)].reset_index(drop=True)
+
+    positions = pd.Index(df['id']).get_indexer(rows['id'])
+    existing = positions >= 0
+
+    for col in rows.columns.intersection(df.columns):
+        values = rows[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            new_categories = pd.Index(values.dropna().astype(str).unique()).difference(df[col].cat.categories)
+            if len(new_categories):
+                df[col] = df[col].cat.add_categories(new_categories)
+        else:
+            common = np.result_type(df[col].dtype, values.dtype) if values.dtype != object else object
+            if common != df[col].dtype:
+                df[col] = df[col].astype(common)
+        if existing.any():
+            df.iloc[positions[existing], df.columns.get_loc(col)] = values.to_numpy()[existing]
+
+    # Appended and deleted rows: one copy of the frame for both
+    if len(deleted_ids):
+        df = df[~df['id'].isin(deleted_ids).to_numpy()]
+    if not existing.all():
+        appended = rows[~existing].reindex(columns=df.columns)
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                appended[col] = pd.Categorical(appended[col].astype(object), categories=df[col].cat.categories)
+        df = pd.concat([df, appended], ignore_index=True)
+    elif len(deleted_ids):
+        df = df.reset_index(drop=True)
+    return df
@@ -1,35 +1,112 @@
 import os
 import sqlite3
+import threading
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, Column, Integer, String, Float, Date, text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from pandas.api.types import union_categoricals
+from sqlalchemy import (
+    create_engine, event, inspect, Column, Integer, String, Float, Date, Index, text, insert, update, delete,
+    bindparam, or_
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import declarative_base, sessionmaker
 from datetime import datetime
+from schema import apply_schema
 
 # Définir le chemin de la base de données
-DB_PATH = "data/suppliers.db"
+DB_PATH = os.environ.get("SUPPLIERS_DB_PATH", "data/suppliers.db")
+
+# Nombre de lignes envoyées par instruction INSERT lors des imports en masse
+DEFAULT_BATCH_SIZE = 5000
+
+# Nombre de lignes lues à la fois par le chemin de lecture colonne par colonne
+READ_CHUNK_SIZE = 50000
+
+# Au-delà de ce nombre de couples (fournisseur, mois) touchés par une écriture,
+# la table supplier_month_summary est reconstruite entièrement plutôt que mois par mois
+SUMMARY_REFRESH_MAX_KEYS = 500
+
+# Identifiant d'une facture : son numéro chez le fournisseur (index unique ux_suppliers_invoice_key,
+# utilisé par upsert_suppliers). Deux factures d'un même fournisseur, d'une même date et d'un même montant
+# restent distinctes
+INVOICE_KEY = ('nom_fournisseur', 'numero_facture')
+INVOICE_KEY_INDEX = 'ux_suppliers_invoice_key'
+
+# Clé naturelle des lignes sans numéro de facture : upsert_suppliers les rapproche des lignes stockées
+# sans numéro de mêmes valeurs, occurrence par occurrence (la k-ième ligne identique du fichier correspond
+# à la k-ième ligne identique de la table), si bien que des factures identiques restent distinctes
+NATURAL_KEY = ('nom_fournisseur', 'date_commande', 'montant_commande', 'date_reception')
+
+# Réglages SQLite, surchargeables par variables d'environnement
+# - WAL permet aux lectures de se poursuivre pendant qu'une session écrit
+# - synchronous=NORMAL reste sûr en WAL et évite un fsync à chaque commit
+# - cache_size négatif = taille en Kio (64 Mio par défaut), mmap_size en octets
+SQLITE_JOURNAL_MODE = os.environ.get("SUPPLIERS_DB_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.environ.get("SUPPLIERS_DB_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE = int(os.environ.get("SUPPLIERS_DB_CACHE_SIZE", "-65536"))
+SQLITE_MMAP_SIZE = int(os.environ.get("SUPPLIERS_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_TEMP_STORE = os.environ.get("SUPPLIERS_DB_TEMP_STORE", "MEMORY")
+
+# Attente maximale (en secondes) d'un verrou avant l'erreur "database is locked"
+SQLITE_BUSY_TIMEOUT = float(os.environ.get("SUPPLIERS_DB_BUSY_TIMEOUT", "30"))
+
+# Taille du pool de connexions partagé par les sessions Streamlit
+POOL_SIZE = int(os.environ.get("SUPPLIERS_DB_POOL_SIZE", "5"))
+POOL_MAX_OVERFLOW = int(os.environ.get("SUPPLIERS_DB_POOL_MAX_OVERFLOW", "10"))
 
 # S'assurer que le répertoire data existe
-os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
+
+# Fonction pour créer un moteur SQLAlchemy configuré pour les accès concurrents
+def create_db_engine(db_path=DB_PATH):
+    db_engine = create_engine(
+        f'sqlite:///{db_path}',
+        poolclass=QueuePool,
+        pool_size=POOL_SIZE,
+        max_overflow=POOL_MAX_OVERFLOW,
+        connect_args={
+            'timeout': SQLITE_BUSY_TIMEOUT,
+            # Les connexions du pool sont partagées entre les threads de Streamlit
+            'check_same_thread': False
+        }
+    )
+
+    # Appliquer les pragmas à chaque nouvelle connexion du pool
+    @event.listens_for(db_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA temp_store={SQLITE_TEMP_STORE}")
+        cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT * 1000)}")
+        cursor.close()
+
+    return db_engine
 
 # Créer le moteur SQLAlchemy
-engine = create_engine(f'sqlite:///{DB_PATH}')
+engine = create_db_engine(DB_PATH)
 Base = declarative_base()
 Session = sessionmaker(bind=engine)
 
 # Définir le modèle de données pour les fournisseurs
 class Supplier(Base):
     __tablename__ = 'suppliers'
+    __table_args__ = (Index(INVOICE_KEY_INDEX, *INVOICE_KEY, unique=True),)
     
     id = Column(Integer, primary_key=True)
-    nom_fournisseur = Column(String(100), nullable=False)
-    date_commande = Column(Date, nullable=False)
+    nom_fournisseur = Column(String(100), nullable=False, index=True)
+    numero_facture = Column(String(50), nullable=True)
+    date_commande = Column(Date, nullable=False, index=True)
     montant_commande = Column(Float, nullable=False)
     date_reception = Column(Date, nullable=True)
-    date_paiement = Column(Date, nullable=True)
-    delai_paiement = Column(Integer, nullable=True)
+    date_paiement = Column(Date, nullable=True, index=True)
+    delai_paiement = Column(Integer, nullable=True, index=True)
     jours_retard = Column(Integer, nullable=True)
-    statut_paiement = Column(String(20), nullable=True)
+    statut_paiement = Column(String(20), nullable=True, index=True)
     montant_penalite = Column(Float, nullable=True)
     
     def to_dict(self):
@@ -43,14 +120,261 @@ class Supplier(Base):
             'Délai de paiement': self.delai_paiement,
             'Jours de retard': self.jours_retard,
             'Statut du paiement': self.statut_paiement,
-            'Montant pénalité': self.montant_penalite
+            'Montant pénalité': self.montant_penalite,
+            'Numéro de facture': self.numero_facture
         }
 
+# Définir le modèle de la table de synthèse mensuelle par fournisseur et statut de paiement
+# Maintenue dans la même transaction que chaque écriture sur suppliers (voir _refresh_supplier_months)
+# pour que les tableaux de bord lisent quelques milliers de lignes au lieu de toutes les factures
+class SupplierMonthSummary(Base):
+    __tablename__ = 'supplier_month_summary'
+
+    nom_fournisseur = Column(String(100), primary_key=True)
+    mois = Column(String(7), primary_key=True)
+    statut_paiement = Column(String(20), primary_key=True)
+    nombre_factures = Column(Integer, nullable=False)
+    montant_total = Column(Float, nullable=False)
+    somme_delais = Column(Integer, nullable=False)
+    nombre_delais = Column(Integer, nullable=False)
+    delai_max = Column(Integer, nullable=True)
+    factures_non_payees = Column(Integer, nullable=False)
+    montant_non_paye = Column(Float, nullable=False)
+
+# Définir le modèle des versions des mois de commande : chaque transaction qui écrit dans suppliers
+# attribue un nouveau numéro de version aux mois qu'elle touche (voir _touch_months), ce qui indique
+# aux copies de la table (miroir Parquet) les mois à relire
+class SupplierMonthVersion(Base):
+    __tablename__ = 'supplier_month_versions'
+
+    mois = Column(String(7), primary_key=True)
+    version = Column(Integer, nullable=False)
+
+# Correspondance entre les colonnes du DataFrame de synthèse et celles de la table supplier_month_summary
+SUMMARY_COLUMN_MAPPING = {
+    'Nom du fournisseur': 'nom_fournisseur',
+    'Mois': 'mois',
+    'Statut du paiement': 'statut_paiement',
+    'Nombre de factures': 'nombre_factures',
+    'Montant total': 'montant_total',
+    'Somme des délais': 'somme_delais',
+    'Nombre de délais': 'nombre_delais',
+    'Délai maximum': 'delai_max',
+    'Factures non payées': 'factures_non_payees',
+    'Montant non payé': 'montant_non_paye'
+}
+
+# Correspondance entre les colonnes du DataFrame et celles de la table suppliers
+COLUMN_MAPPING = {
+    'Nom du fournisseur': 'nom_fournisseur',
+    'Date de commande': 'date_commande',
+    'Montant de la commande': 'montant_commande',
+    'Date de réception': 'date_reception',
+    'Date de paiement': 'date_paiement',
+    'Délai de paiement': 'delai_paiement',
+    'Jours de retard': 'jours_retard',
+    'Statut du paiement': 'statut_paiement',
+    'Montant pénalité': 'montant_penalite',
+    'Numéro de facture': 'numero_facture'
+}
+
+# Définir le modèle de données pour les mouvements de trésorerie
+# solde est le solde courant après le mouvement, maintenu à chaque insertion
+class TreasuryMovement(Base):
+    __tablename__ = 'treasury_movements'
+    
+    id = Column(Integer, primary_key=True)
+    date = Column(Date, nullable=False, index=True)
+    type_mouvement = Column(String(20), nullable=False)
+    fournisseur = Column(String(100), nullable=True)
+    montant_prevu = Column(Float, nullable=False, default=0.0)
+    montant_paye = Column(Float, nullable=False, default=0.0)
+    ecart = Column(Float, nullable=True)
+    solde = Column(Float, nullable=True)
+    notes = Column(String(255), nullable=True)
+
+# Correspondance entre les colonnes du registre de trésorerie et celles de la table treasury_movements
+TREASURY_COLUMN_MAPPING = {
+    'Date': 'date',
+    'Type': 'type_mouvement',
+    'Fournisseur': 'fournisseur',
+    'Montant prévu': 'montant_prevu',
+    'Montant payé': 'montant_paye',
+    'Écart': 'ecart',
+    'Solde': 'solde',
+    'Notes': 'notes'
+}
+
 # Créer la base de données et les tables si elles n'existent pas
-def init_db():
-    Base.metadata.create_all(engine)
+def init_db(bind=None):
+    bind = bind if bind is not None else engine
+    Base.metadata.create_all(bind)
+    _add_invoice_number_column(bind)
+    # create_all ne crée les index qu'avec les nouvelles tables : les ajouter aux bases existantes
+    # L'index unique n'est pas créé tant que la table contient des doublons : ils sont signalés, jamais supprimés
+    existing_indexes = {index['name'] for index in inspect(bind).get_indexes('suppliers')}
+    # Index uniques créés par upsert_suppliers pour d'autres clés que INVOICE_KEY : ils refusaient des lignes légitimes
+    stale_indexes = {name for name in existing_indexes if name.startswith('ux_suppliers_')} - {INVOICE_KEY_INDEX}
+    if stale_indexes:
+        with bind.begin() as connection:
+            for name in sorted(stale_indexes):
+                connection.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+    skip_indexes = set()
+    if INVOICE_KEY_INDEX not in existing_indexes and _report_duplicate_invoices(bind):
+        skip_indexes.add(INVOICE_KEY_INDEX)
+    for table in (Supplier.__table__, TreasuryMovement.__table__):
+        for index in table.indexes:
+            if index.name not in skip_indexes:
+                index.create(bind, checkfirst=True)
+    # Base antérieure à la table de synthèse ou aux versions de mois : les construire à partir des factures existantes
+    with bind.begin() as connection:
+        if connection.exec_driver_sql("SELECT 1 FROM suppliers LIMIT 1").first() is not None:
+            if connection.exec_driver_sql("SELECT 1 FROM supplier_month_summary LIMIT 1").first() is None:
+                _rebuild_supplier_months(connection)
+            if connection.exec_driver_sql("SELECT 1 FROM supplier_month_versions LIMIT 1").first() is None:
+                _touch_months(connection)
     print(f"Base de données initialisée dans {DB_PATH}")
 
+# Fonction pour ajouter la colonne numero_facture à une base antérieure à l'identifiant de facture
+# L'ancien index unique sur (fournisseur, date de commande, montant) est retiré : il refusait des factures distinctes
+# Tous les mois reçoivent une nouvelle version pour que les copies de la table (miroir Parquet) soient réécrites
+def _add_invoice_number_column(bind):
+    columns = {column['name'] for column in inspect(bind).get_columns('suppliers')}
+    if 'numero_facture' in columns:
+        return
+    with bind.begin() as connection:
+        connection.exec_driver_sql("ALTER TABLE suppliers ADD COLUMN numero_facture VARCHAR(50)")
+        connection.exec_driver_sql("DROP INDEX IF EXISTS ux_suppliers_natural_key")
+        _touch_months(connection)
+
+# Fonction pour lister les factures en double (même fournisseur et même numéro de facture)
+# Retourne un dataframe avec le fournisseur, le numéro, le nombre de lignes et leurs ids
+def get_duplicate_invoices(bind=None):
+    bind = bind if bind is not None else engine
+    key = ', '.join(INVOICE_KEY)
+    try:
+        with bind.connect() as connection:
+            rows = connection.exec_driver_sql(
+                f"SELECT {key}, COUNT(*), GROUP_CONCAT(id) FROM suppliers "
+                f"WHERE numero_facture IS NOT NULL GROUP BY {key} HAVING COUNT(*) > 1 ORDER BY {key}"
+            ).all()
+        return pd.DataFrame(rows, columns=['Nom du fournisseur', 'Numéro de facture', 'Nombre de lignes', 'ids'])
+    except Exception as e:
+        print(f"Erreur lors de la recherche des factures en double: {e}")
+        return pd.DataFrame()
+
+# Fonction pour signaler les factures en double, qui empêchent de créer l'index unique
+# Retourne True s'il y en a : les lignes sont conservées et l'index unique n'est pas créé
+def _report_duplicate_invoices(bind):
+    duplicates = get_duplicate_invoices(bind)
+    if duplicates.empty:
+        return False
+    print(
+        f"{len(duplicates)} facture(s) en double ({duplicates['Nombre de lignes'].sum()} lignes) : "
+        f"l'index unique {INVOICE_KEY_INDEX} n'est pas créé et upsert_suppliers refuse les imports "
+        f"jusqu'à leur correction (voir database.get_duplicate_invoices)"
+    )
+    for row in duplicates.head(10).itertuples(index=False):
+        print(f"  - {row[0]} / facture {row[1]} : lignes {row[3]}")
+    return True
+
+# Agrégation des factures par fournisseur, mois de commande et statut de paiement
+# (les dates sont stockées au format ISO AAAA-MM-JJ : le mois est le préfixe AAAA-MM)
+SUMMARY_SELECT_SQL = f"""
+    INSERT INTO supplier_month_summary ({', '.join(SUMMARY_COLUMN_MAPPING.values())})
+    SELECT nom_fournisseur, substr(date_commande, 1, 7), COALESCE(statut_paiement, 'Non déterminé'),
+           COUNT(*), SUM(montant_commande), COALESCE(SUM(delai_paiement), 0), COUNT(delai_paiement),
+           MAX(delai_paiement), SUM(date_paiement IS NULL),
+           SUM(CASE WHEN date_paiement IS NULL THEN montant_commande ELSE 0 END)
+    FROM suppliers {{where}}
+    GROUP BY 1, 2, 3
+"""
+
+# Fonction pour calculer le couple (fournisseur, mois AAAA-MM) d'une facture dans la table de synthèse
+def _month_key(supplier_name, order_date):
+    return supplier_name, pd.Timestamp(order_date).strftime('%Y-%m')
+
+# Fonction pour calculer les couples (fournisseur, mois) des lignes d'un dataframe, en une passe vectorisée
+def _frame_month_keys(df):
+    if df is None or df.empty:
+        return set()
+    dates = pd.to_datetime(df['Date de commande'], errors='coerce')
+    keys = pd.DataFrame({
+        'nom': df['Nom du fournisseur'].astype(object),
+        'mois': dates.dt.strftime('%Y-%m')
+    }).dropna().drop_duplicates()
+    return set(zip(keys['nom'], keys['mois']))
+
+# Fonction pour attribuer un nouveau numéro de version aux mois donnés, dans la transaction en cours
+# months=None désigne tous les mois (ceux de suppliers et ceux déjà versionnés)
+def _touch_months(connection, months=None):
+    if months is None:
+        months = [row[0] for row in connection.exec_driver_sql(
+            "SELECT DISTINCT substr(date_commande, 1, 7) FROM suppliers UNION SELECT mois FROM supplier_month_versions"
+        )]
+    months = sorted(set(months))
+    if not months:
+        return
+    version = connection.exec_driver_sql("SELECT COALESCE(MAX(version), 0) + 1 FROM supplier_month_versions").scalar()
+    connection.exec_driver_sql(
+        "INSERT INTO supplier_month_versions (mois, version) VALUES (?, ?) "
+        "ON CONFLICT (mois) DO UPDATE SET version = excluded.version",
+        [(month, version) for month in months]
+    )
+
+# Fonction pour reconstruire toute la table de synthèse dans la transaction en cours
+def _rebuild_supplier_months(connection):
+    connection.exec_driver_sql("DELETE FROM supplier_month_summary")
+    connection.exec_driver_sql(SUMMARY_SELECT_SQL.format(where=""))
+
+# Fonction pour recalculer les lignes de synthèse des couples (fournisseur, mois) donnés, dans la transaction en cours
+# Les mois concernés reçoivent aussi une nouvelle version
+# Chaque mois est relu via l'index sur la date de commande ; au-delà de SUMMARY_REFRESH_MAX_KEYS couples,
+# la table est reconstruite en une seule passe
+def _refresh_supplier_months(connection, keys):
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    _touch_months(connection, {month for _, month in keys})
+    if len(keys) > SUMMARY_REFRESH_MAX_KEYS:
+        _rebuild_supplier_months(connection)
+        return
+    connection.exec_driver_sql(
+        "DELETE FROM supplier_month_summary WHERE nom_fournisseur = ? AND mois = ?", keys
+    )
+    connection.exec_driver_sql(
+        SUMMARY_SELECT_SQL.format(
+            where="WHERE nom_fournisseur = ? AND date_commande >= ? || '-01' AND date_commande < date(? || '-01', '+1 month')"
+        ),
+        [(name, month, month) for name, month in keys]
+    )
+
+# Fonction pour lire les couples (fournisseur, mois) de factures existantes, avant leur modification
+def _supplier_month_keys(connection, supplier_ids):
+    ids = [int(i) for i in supplier_ids]
+    if not ids:
+        return set()
+    rows = connection.execute(
+        Supplier.__table__.select().with_only_columns(Supplier.nom_fournisseur, Supplier.date_commande)
+        .where(Supplier.id.in_(ids))
+    ).all()
+    return {_month_key(name, order_date) for name, order_date in rows}
+
+# Fonction pour reconstruire la table de synthèse, par exemple après un import par blocs
+def rebuild_supplier_month_summary():
+    try:
+        with engine.begin() as connection:
+            _rebuild_supplier_months(connection)
+        return True
+    except Exception as e:
+        print(f"Erreur lors de la reconstruction de la synthèse mensuelle: {e}")
+        return False
+
+# Fonction pour terminer un import réalisé sans optimize (par blocs) : synthèse mensuelle puis statistiques des index
+def finish_import():
+    rebuild_supplier_month_summary()
+    optimize_db()
+
 # Fonction pour ajouter un fournisseur à la base de données
 def add_supplier(supplier_data):
     session = Session()
@@ -64,9 +388,12 @@ def add_supplier(supplier_data):
             delai_paiement=supplier_data.get('Délai de paiement'),
             jours_retard=supplier_data.get('Jours de retard', 0),
             statut_paiement=supplier_data.get('Statut du paiement', 'Non déterminé'),
-            montant_penalite=supplier_data.get('Montant pénalité', 0.0)
+            montant_penalite=supplier_data.get('Montant pénalité', 0.0),
+            numero_facture=supplier_data.get('Numéro de facture')
         )
         session.add(supplier)
+        session.flush()
+        _refresh_supplier_months(session.connection(), {_month_key(supplier.nom_fournisseur, supplier.date_commande)})
         session.commit()
         return True
     except Exception as e:
@@ -88,33 +415,531 @@ def get_all_suppliers():
     finally:
         session.close()
 
-# Fonction pour convertir un dataframe en liste de fournisseurs et les ajouter à la base
-def add_suppliers_from_dataframe(df):
+# Fonction pour convertir un dataframe en enregistrements prêts pour un INSERT en masse
+# Les lignes sans nom, date de commande ou montant valides sont écartées
+# with_id=True ajoute l'id de chaque ligne sous la clé supplier_id (pour les UPDATE)
+def _dataframe_to_records(df, with_id=False):
+    n = len(df)
+    columns = {}
+
+    def column(name):
+        if name in df.columns:
+            return df[name]
+        return pd.Series([None] * n, index=df.index, dtype=object)
+
+    # Colonnes de date : NaT -> None, sinon objet date Python
+    for label in ['Date de commande', 'Date de réception', 'Date de paiement']:
+        values = pd.to_datetime(column(label), errors='coerce')
+        columns[COLUMN_MAPPING[label]] = values.dt.date.astype(object).where(values.notna(), None)
+
+    # Colonnes numériques
+    amount = pd.to_numeric(column('Montant de la commande'), errors='coerce')
+    columns['montant_commande'] = amount.astype(object).where(amount.notna(), None)
+
+    delay = pd.to_numeric(column('Délai de paiement'), errors='coerce').astype('Int64')
+    columns['delai_paiement'] = delay.astype(object).where(delay.notna(), None)
+
+    if 'Jours de retard' in df.columns:
+        late_days = pd.to_numeric(df['Jours de retard'], errors='coerce').astype('Int64')
+        columns['jours_retard'] = late_days.astype(object).where(late_days.notna(), None)
+    else:
+        columns['jours_retard'] = pd.Series([0] * n, index=df.index, dtype=object)
+
+    if 'Montant pénalité' in df.columns:
+        penalty = pd.to_numeric(df['Montant pénalité'], errors='coerce')
+        columns['montant_penalite'] = penalty.astype(object).where(penalty.notna(), None)
+    else:
+        columns['montant_penalite'] = pd.Series([0.0] * n, index=df.index, dtype=object)
+
+    if 'Statut du paiement' in df.columns:
+        status = df['Statut du paiement'].astype(object)
+        columns['statut_paiement'] = status.where(status.notna(), None)
+    else:
+        columns['statut_paiement'] = pd.Series(['Non déterminé'] * n, index=df.index, dtype=object)
+
+    names = column('Nom du fournisseur').astype(object)
+    columns['nom_fournisseur'] = names.where(names.notna(), None)
+
+    # Numéro de facture en texte, tel qu'il a été lu (les fichiers sont lus avec schema.READ_DTYPES) ; vide -> None
+    numbers = column('Numéro de facture').astype('string').str.strip()
+    columns['numero_facture'] = numbers.astype(object).where(numbers.notna() & (numbers != ''), None)
+
+    if with_id:
+        columns['supplier_id'] = pd.to_numeric(df['id']).astype(object)
+
+    # Les colonnes obligatoires doivent être renseignées
+    valid = (
+        columns['nom_fournisseur'].notna().to_numpy() &
+        columns['date_commande'].notna().to_numpy() &
+        columns['montant_commande'].notna().to_numpy()
+    )
+
+    return pd.DataFrame(columns)[valid].to_dict('records')
+
+# Fonction pour insérer un lot d'enregistrements dans la transaction en cours
+# En cas d'échec, le lot est rejoué ligne par ligne pour isoler les lignes fautives
+def _insert_batch(connection, records):
+    try:
+        with connection.begin_nested():
+            connection.execute(insert(Supplier.__table__), records)
+        return len(records)
+    except Exception as e:
+        print(f"Erreur lors de l'insertion d'un lot, reprise ligne par ligne: {e}")
+
     success_count = 0
-    total_count = len(df)
-    
-    for _, row in df.iterrows():
-        supplier_data = row.to_dict()
-        if add_supplier(supplier_data):
+    for record in records:
+        try:
+            with connection.begin_nested():
+                connection.execute(insert(Supplier.__table__), [record])
             success_count += 1
-    
+        except Exception as e:
+            print(f"Erreur lors de l'ajout du fournisseur: {e}")
+    return success_count
+
+# Fonction pour ajouter un dataframe entier en une seule transaction, par lots
+# optimize=False (import par blocs) laisse à l'appelant la mise à jour de la synthèse mensuelle via finish_import
+# (les mois touchés reçoivent tout de même une nouvelle version)
+def add_suppliers_bulk(df, batch_size=DEFAULT_BATCH_SIZE, optimize=True):
+    total_count = len(df)
+    if total_count == 0:
+        return 0, 0
+
+    records = _dataframe_to_records(df)
+    if len(records) < total_count:
+        print(f"{total_count - len(records)} ligne(s) ignorée(s): nom, date de commande ou montant invalide")
+    success_count = 0
+
+    try:
+        with engine.begin() as connection:
+            for start in range(0, len(records), batch_size):
+                success_count += _insert_batch(connection, records[start:start + batch_size])
+            keys = _frame_month_keys(df)
+            if optimize:
+                _refresh_supplier_months(connection, keys)
+            else:
+                _touch_months(connection, {month for _, month in keys})
+    except Exception as e:
+        print(f"Erreur lors de l'import en masse des fournisseurs: {e}")
+        return 0, total_count
+
+    if optimize:
+        optimize_db()
+
     return success_count, total_count
 
+# Fonction pour créer l'index unique déclaré de l'identifiant de facture s'il manque (requis par ON CONFLICT)
+# Retourne False quand la table contient des doublons de la clé (voir get_duplicate_invoices) : l'index n'est pas créé
+def _ensure_key_index(connection):
+    try:
+        with connection.begin_nested():
+            connection.exec_driver_sql(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {INVOICE_KEY_INDEX} ON suppliers ({', '.join(INVOICE_KEY)})"
+            )
+        return True
+    except IntegrityError:
+        return False
+
+# Fonction pour lire les couples (fournisseur, mois) des factures existantes de mêmes numéros, avant leur mise à jour
+# (la date de commande ne fait pas partie de la clé : une facture mise à jour peut changer de mois)
+def _invoice_month_keys(connection, records, batch_size=DEFAULT_BATCH_SIZE):
+    numbers = sorted({record['numero_facture'] for record in records if record['numero_facture'] is not None})
+    keys = set()
+    for start in range(0, len(numbers), batch_size):
+        rows = connection.execute(
+            Supplier.__table__.select().with_only_columns(Supplier.nom_fournisseur, Supplier.date_commande)
+            .where(Supplier.numero_facture.in_(numbers[start:start + batch_size]))
+        ).all()
+        keys |= {_month_key(name, order_date) for name, order_date in rows}
+    return keys
+
+# Fonction pour rapprocher des enregistrements des lignes stockées de mêmes valeurs de clé, sans index unique
+# La k-ième occurrence d'une valeur dans records correspond à la k-ième ligne stockée de cette valeur (ordre des ids)
+# unnumbered=True ne considère que les lignes stockées sans numéro de facture
+# Retourne l'id de la ligne rapprochée de chaque enregistrement, ou None
+def _match_stored_rows(connection, records, key, unnumbered=False, batch_size=DEFAULT_BATCH_SIZE):
+    if not records:
+        return []
+    columns = ', '.join(key)
+    occurrences = {}
+    rows = []
+    for position, record in enumerate(records):
+        values = tuple(record[column] for column in key)
+        occurrences[values] = occurrences.get(values, 0) + 1
+        # Valeurs au format stocké par SQLite (dates ISO AAAA-MM-JJ)
+        rows.append((position, occurrences[values]) + tuple(
+            value.isoformat() if hasattr(value, 'isoformat') else value for value in values
+        ))
+
+    connection.exec_driver_sql("DROP TABLE IF EXISTS temp.upsert_keys")
+    connection.exec_driver_sql(f"CREATE TEMP TABLE upsert_keys (position INTEGER, occurrence INTEGER, {columns})")
+    placeholders = ', '.join('?' * (len(key) + 2))
+    for start in range(0, len(rows), batch_size):
+        connection.exec_driver_sql(f"INSERT INTO upsert_keys VALUES ({placeholders})", rows[start:start + batch_size])
+
+    # Seules les lignes stockées de mêmes deux premières colonnes de clé sont numérotées
+    prefilter = ' AND '.join(f"{column} IN (SELECT {column} FROM upsert_keys)" for column in key[:2])
+    matches = connection.exec_driver_sql(f"""
+        SELECT k.position, s.id
+        FROM upsert_keys k
+        JOIN (
+            SELECT id, {columns}, ROW_NUMBER() OVER (PARTITION BY {columns} ORDER BY id) AS occurrence
+            FROM suppliers
+            WHERE {prefilter}
+            {"AND numero_facture IS NULL" if unnumbered else ""}
+        ) s ON s.occurrence = k.occurrence AND {' AND '.join(f"s.{column} IS k.{column}" for column in key)}
+    """).all()
+    connection.exec_driver_sql("DROP TABLE temp.upsert_keys")
+
+    ids = [None] * len(records)
+    for position, supplier_id in matches:
+        ids[position] = supplier_id
+    return ids
+
+# Fonction pour écrire des enregistrements rapprochés par _match_stored_rows : mise à jour des lignes rapprochées
+# (seulement si une colonne a changé), ajout des autres. Retourne (insérées, mises à jour)
+def _write_matched(connection, records, ids, batch_size=DEFAULT_BATCH_SIZE):
+    table = Supplier.__table__
+    columns = list(COLUMN_MAPPING.values())
+    values = {column: bindparam(f"new_{column}", type_=table.c[column].type) for column in columns}
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam('match_id'))
+        .where(or_(*[table.c[column].is_distinct_from(values[column]) for column in columns]))
+        .values(values)
+    )
+    updates = [
+        {'match_id': supplier_id, **{f"new_{column}": record[column] for column in columns}}
+        for record, supplier_id in zip(records, ids) if supplier_id is not None
+    ]
+    inserts = [record for record, supplier_id in zip(records, ids) if supplier_id is None]
+
+    updated = 0
+    for start in range(0, len(updates), batch_size):
+        updated += connection.execute(statement, updates[start:start + batch_size]).rowcount
+    for start in range(0, len(inserts), batch_size):
+        connection.execute(insert(table), inserts[start:start + batch_size])
+    return len(inserts), updated
+
+# Fonction pour insérer ou mettre à jour un dataframe selon l'identifiant de facture, par lots, en une seule transaction
+# Une ligne dont la clé existe déjà met à jour les autres colonnes, seulement si l'une d'elles a changé
+# Retourne (insérées, mises à jour, inchangées) ; les doublons de clé du fichier comptent comme inchangés
+# (la dernière occurrence l'emporte) et les lignes invalides (nom, date ou montant manquant) sont ignorées
+# Les lignes sans valeur de clé (sans numéro de facture) sont rapprochées sur NATURAL_KEY : un fichier sans
+# numéros réimporté ne duplique pas ses factures. Tant que des doublons de la table empêchent de créer l'index
+# unique de la clé, les lignes sont rapprochées de la première ligne stockée de même clé au lieu d'ON CONFLICT
+# Une autre clé que INVOICE_KEY est rapprochée de la même façon : aucun index unique n'est créé pour elle, il
+# refuserait ensuite les lignes légitimement identiques des autres écritures (add_supplier, add_suppliers_bulk)
+# optimize=False (import par blocs) laisse à l'appelant la mise à jour de la synthèse mensuelle via finish_import
+# (les mois touchés reçoivent tout de même une nouvelle version)
+def upsert_suppliers(df, key=INVOICE_KEY, batch_size=DEFAULT_BATCH_SIZE, optimize=True):
+    if len(df) == 0:
+        return 0, 0, 0
+
+    records = _dataframe_to_records(df)
+    if len(records) < len(df):
+        print(f"{len(df) - len(records)} ligne(s) ignorée(s): nom, date de commande ou montant invalide")
+    keyed = {}
+    unkeyed = []
+    for record in records:
+        record_key = tuple(record[column] for column in key)
+        if None in record_key:
+            unkeyed.append(record)
+        else:
+            keyed[record_key] = record
+    keyed_records = list(keyed.values())
+
+    table = Supplier.__table__
+    statement = sqlite_insert(table)
+    update_columns = [column for column in COLUMN_MAPPING.values() if column not in key]
+    statement = statement.on_conflict_do_update(
+        index_elements=list(key),
+        set_={column: statement.excluded[column] for column in update_columns},
+        # Pas d'écriture quand rien n'a changé : la ligne n'est alors pas retournée
+        where=or_(*[table.c[column].is_distinct_from(statement.excluded[column]) for column in update_columns])
+    ).returning(table.c.id)
+
+    inserted = updated = 0
+    try:
+        with engine.begin() as connection:
+            # Mois des factures existantes avant mise à jour, puis ceux des nouvelles valeurs
+            if tuple(key) == INVOICE_KEY:
+                keys = _invoice_month_keys(connection, keyed_records, batch_size) | _frame_month_keys(df)
+            if tuple(key) == INVOICE_KEY and _ensure_key_index(connection):
+                # Les lignes insérées reçoivent un id supérieur au plus grand id existant
+                max_id = connection.exec_driver_sql("SELECT COALESCE(MAX(id), 0) FROM suppliers").scalar()
+                for start in range(0, len(keyed_records), batch_size):
+                    ids = connection.execute(statement, keyed_records[start:start + batch_size]).scalars().all()
+                    new_rows = sum(1 for supplier_id in ids if supplier_id > max_id)
+                    inserted += new_rows
+                    updated += len(ids) - new_rows
+            else:
+                if tuple(key) == INVOICE_KEY:
+                    print(
+                        f"Doublons de la clé ({', '.join(key)}) dans la table : rapprochement sans index unique "
+                        f"(voir database.get_duplicate_invoices)"
+                    )
+                ids = _match_stored_rows(connection, keyed_records, key, batch_size=batch_size)
+                inserted, updated = _write_matched(connection, keyed_records, ids, batch_size)
+            if unkeyed:
+                ids = _match_stored_rows(connection, unkeyed, NATURAL_KEY, unnumbered=True, batch_size=batch_size)
+                counts = _write_matched(connection, unkeyed, ids, batch_size)
+                inserted += counts[0]
+                updated += counts[1]
+            # Une autre clé peut déplacer une facture vers n'importe quel fournisseur ou mois
+            if tuple(key) != INVOICE_KEY:
+                _touch_months(connection)
+                if optimize:
+                    _rebuild_supplier_months(connection)
+            elif optimize:
+                _refresh_supplier_months(connection, keys)
+            else:
+                _touch_months(connection, {month for _, month in keys})
+    except Exception as e:
+        print(f"Erreur lors de l'import des fournisseurs: {e}")
+        return 0, 0, 0
+
+    if optimize:
+        optimize_db()
+
+    return inserted, updated, len(records) - inserted - updated
+
+# Fonction pour mettre à jour les statistiques des index utilisées par le planificateur de requêtes
+# Appelée une seule fois à la fin d'un import par blocs plutôt qu'après chaque bloc
+def optimize_db():
+    try:
+        with engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA optimize")
+    except Exception as e:
+        print(f"Erreur lors de l'optimisation de la base: {e}")
+
+# Fonction pour convertir un dataframe en liste de fournisseurs et les ajouter à la base
+def add_suppliers_from_dataframe(df, batch_size=DEFAULT_BATCH_SIZE):
+    return add_suppliers_bulk(df, batch_size=batch_size)
+
+# Colonnes de date stockées au format ISO (AAAA-MM-JJ) par SQLite
+DATE_COLUMNS = ['date_commande', 'date_reception', 'date_paiement']
+
+# Fonction pour convertir un bloc de valeurs brutes SQLite en tableau typé
+def _to_column(name, values, categories):
+    if name in DATE_COLUMNS:
+        return pd.to_datetime(pd.Series(values, dtype=object), format='%Y-%m-%d', errors='coerce').to_numpy()
+    if name == 'id':
+        return np.array(values, dtype=np.int64)
+    if name in ('montant_commande', 'delai_paiement', 'jours_retard', 'montant_penalite'):
+        return np.array(values, dtype=np.float64)
+    if name == 'nom_fournisseur' and categories:
+        return pd.Categorical(values)
+    return np.array(values, dtype=object)
+
+# Fonction pour lire la table suppliers colonne par colonne, sans objets ORM
+# Les lignes sont parcourues par blocs et chaque bloc est converti en tableaux typés
+# connect : fonction retournant une connexion DB-API (par défaut une connexion du pool du moteur)
+def _read_suppliers_columns(columns, where="", params=(), categories=True, chunk_size=READ_CHUNK_SIZE, connect=None):
+    sql = f"SELECT {', '.join(columns)} FROM suppliers {where} ORDER BY id"
+    chunks = {name: [] for name in columns}
+
+    connection = connect() if connect is not None else engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for name, values in zip(columns, zip(*rows)):
+                chunks[name].append(_to_column(name, values, categories))
+    finally:
+        connection.close()
+
+    labels = {'id': 'id', **{field: label for label, field in COLUMN_MAPPING.items()}}
+    if not chunks[columns[0]]:
+        return pd.DataFrame(columns=[labels[name] for name in columns])
+
+    data = {}
+    for name in columns:
+        if isinstance(chunks[name][0], pd.Categorical):
+            data[labels[name]] = union_categoricals(chunks[name], sort_categories=True)
+        else:
+            data[labels[name]] = np.concatenate(chunks[name])
+    return pd.DataFrame(data)
+
 # Fonction pour récupérer les fournisseurs sous forme de dataframe
-def get_suppliers_dataframe():
-    suppliers = get_all_suppliers()
-    if not suppliers:
+# categories=False conserve les noms de fournisseurs en texte (utile pour l'éditeur de données)
+def get_suppliers_dataframe(categories=True):
+    try:
+        df = _read_suppliers_columns(['id'] + list(COLUMN_MAPPING.values()), categories=categories)
+        return apply_schema(df, categorical=categories)
+    except Exception as e:
+        print(f"Erreur lors de la récupération des fournisseurs: {e}")
         return pd.DataFrame()
-    
-    df = pd.DataFrame(suppliers)
-    
-    # Convertir les colonnes de date
-    date_columns = ['Date de commande', 'Date de réception', 'Date de paiement']
-    for col in date_columns:
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col])
-    
-    return df
+
+# Fonction pour lire la table suppliers d'une autre base SQLite (copie ou sauvegarde), en lecture seule
+# Les colonnes absentes d'une base antérieure (numero_facture) sont lues comme vides, sans migrer la copie
+def read_suppliers_snapshot(db_path, categories=True):
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"Base de données introuvable: {db_path}")
+    uri = f"file:{os.path.abspath(db_path)}?mode=ro"
+    connection = sqlite3.connect(uri, uri=True)
+    try:
+        stored = {row[1] for row in connection.execute("PRAGMA table_info(suppliers)")}
+    finally:
+        connection.close()
+    columns = ['id'] + list(COLUMN_MAPPING.values())
+    df = _read_suppliers_columns(
+        [name for name in columns if name in stored],
+        categories=categories,
+        connect=lambda: sqlite3.connect(uri, uri=True)
+    )
+    for label, field in COLUMN_MAPPING.items():
+        if field not in stored:
+            df[label] = None
+    return apply_schema(df, categorical=categories)
+
+# Fonction pour normaliser une borne de date en chaîne ISO comparable aux valeurs SQLite
+def _iso_date(value):
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+# Fonction pour récupérer les fournisseurs filtrés directement par SQLite
+# Les filtres s'appuient sur les index de la table ; None désactive un filtre
+# - supplier : nom ou liste de noms de fournisseurs
+# - date_from / date_to : bornes incluses sur la date de commande
+# - status : statut ou liste de statuts de paiement
+# - paid : True pour les commandes payées, False pour les commandes non payées
+# - delay_min / delay_max : bornes incluses sur le délai de paiement (jours)
+# - columns : colonnes du DataFrame à récupérer (l'id est toujours inclus)
+def query_suppliers(supplier=None, date_from=None, date_to=None, status=None, paid=None,
+                    delay_min=None, delay_max=None, columns=None, categories=True):
+    conditions = []
+    params = []
+
+    for field, value in (('nom_fournisseur', supplier), ('statut_paiement', status)):
+        if value is None:
+            continue
+        values = [value] if isinstance(value, str) else list(value)
+        conditions.append(f"{field} IN ({', '.join('?' * len(values))})")
+        params.extend(values)
+
+    if date_from is not None:
+        conditions.append("date_commande >= ?")
+        params.append(_iso_date(date_from))
+    if date_to is not None:
+        conditions.append("date_commande <= ?")
+        params.append(_iso_date(date_to))
+
+    if paid is not None:
+        conditions.append("date_paiement IS NOT NULL" if paid else "date_paiement IS NULL")
+
+    # Les factures non payées n'ont pas de délai : une borne de délai les exclut
+    if delay_min is not None:
+        conditions.append("delai_paiement >= ?")
+        params.append(int(delay_min))
+    if delay_max is not None:
+        conditions.append("delai_paiement <= ?")
+        params.append(int(delay_max))
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    labels = list(COLUMN_MAPPING) if columns is None else [c for c in columns if c != 'id']
+    fields = ['id'] + [COLUMN_MAPPING[label] for label in labels]
+
+    try:
+        df = _read_suppliers_columns(fields, where, params, categories=categories)
+        return apply_schema(df, categorical=categories)
+    except Exception as e:
+        print(f"Erreur lors de la récupération des fournisseurs: {e}")
+        return pd.DataFrame()
+
+# Fonction pour lire les factures d'une période de commande (bornes incluses), toutes colonnes, dans l'ordre des ids
+# Contrairement à query_suppliers, les erreurs SQLite sont levées : une copie de la table (miroir Parquet)
+# ne doit pas prendre une base verrouillée pour une période sans factures
+def read_order_period(date_from, date_to, categories=True):
+    df = _read_suppliers_columns(
+        ['id'] + list(COLUMN_MAPPING.values()),
+        "WHERE date_commande >= ? AND date_commande <= ?",
+        (_iso_date(date_from), _iso_date(date_to)),
+        categories=categories
+    )
+    return apply_schema(df, categorical=categories)
+
+# Fonction pour récupérer la synthèse mensuelle par fournisseur et statut (table supplier_month_summary)
+# Mêmes filtres que query_suppliers ; month_from / month_to sont des mois inclus (AAAA-MM ou date)
+def get_supplier_month_summary(supplier=None, status=None, month_from=None, month_to=None):
+    conditions = []
+    params = []
+
+    for field, value in (('nom_fournisseur', supplier), ('statut_paiement', status)):
+        if value is None:
+            continue
+        values = [value] if isinstance(value, str) else list(value)
+        conditions.append(f"{field} IN ({', '.join('?' * len(values))})")
+        params.extend(values)
+
+    if month_from is not None:
+        conditions.append("mois >= ?")
+        params.append(pd.Timestamp(month_from).strftime('%Y-%m'))
+    if month_to is not None:
+        conditions.append("mois <= ?")
+        params.append(pd.Timestamp(month_to).strftime('%Y-%m'))
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    labels = list(SUMMARY_COLUMN_MAPPING)
+    try:
+        with engine.connect() as connection:
+            rows = connection.exec_driver_sql(
+                f"SELECT {', '.join(SUMMARY_COLUMN_MAPPING.values())} FROM supplier_month_summary {where} "
+                "ORDER BY mois, nom_fournisseur, statut_paiement",
+                tuple(params)
+            ).all()
+
+        df = pd.DataFrame.from_records(rows, columns=labels)
+        for label in ['Montant total', 'Délai maximum', 'Montant non payé']:
+            df[label] = df[label].astype(np.float64)
+        for label in ['Nombre de factures', 'Somme des délais', 'Nombre de délais', 'Factures non payées']:
+            df[label] = df[label].astype(np.int64)
+        return df
+    except Exception as e:
+        print(f"Erreur lors de la récupération de la synthèse mensuelle: {e}")
+        return pd.DataFrame(columns=labels)
+
+# Colonnes de l'aperçu par fournisseur (get_suppliers_overview)
+OVERVIEW_COLUMNS = [
+    'Nom du fournisseur', 'Nombre de factures', 'Montant total', 'Montant non payé',
+    'Première commande', 'Dernière commande', 'Délai minimum', 'Délai maximum'
+]
+
+# Fonction pour récupérer une ligne par fournisseur : nombre de factures, montants, première et dernière
+# date de commande, délais extrêmes. Une session sur la base garde cet aperçu au lieu de toutes les factures
+def get_suppliers_overview():
+    try:
+        with engine.connect() as connection:
+            rows = connection.exec_driver_sql("""
+                SELECT nom_fournisseur, COUNT(*), COALESCE(SUM(montant_commande), 0),
+                       COALESCE(SUM(CASE WHEN date_paiement IS NULL THEN montant_commande END), 0),
+                       MIN(date_commande), MAX(date_commande), MIN(delai_paiement), MAX(delai_paiement)
+                FROM suppliers
+                GROUP BY nom_fournisseur
+                ORDER BY nom_fournisseur
+            """).all()
+
+        df = pd.DataFrame.from_records(rows, columns=OVERVIEW_COLUMNS)
+        df['Nombre de factures'] = df['Nombre de factures'].astype(np.int64)
+        for label in ['Montant total', 'Montant non payé', 'Délai minimum', 'Délai maximum']:
+            df[label] = df[label].astype(np.float64)
+        for label in ['Première commande', 'Dernière commande']:
+            df[label] = pd.to_datetime(df[label])
+        return df
+    except Exception as e:
+        print(f"Erreur lors de la récupération de l'aperçu des fournisseurs: {e}")
+        return pd.DataFrame(columns=OVERVIEW_COLUMNS)
+
+# Fonction pour récupérer la version de chaque mois de commande ({'AAAA-MM': version})
+# Un mois dont la version a changé depuis une copie de la table a été modifié depuis cette copie
+def get_month_versions():
+    try:
+        with engine.connect() as connection:
+            return dict(connection.exec_driver_sql("SELECT mois, version FROM supplier_month_versions").all())
+    except Exception as e:
+        print(f"Erreur lors de la récupération des versions des mois: {e}")
+        return None
 
 # Fonction pour mettre à jour un fournisseur existant
 def update_supplier(supplier_id, supplier_data):
@@ -122,6 +947,7 @@ def update_supplier(supplier_id, supplier_data):
     try:
         supplier = session.query(Supplier).filter(Supplier.id == supplier_id).first()
         if supplier:
+            old_key = _month_key(supplier.nom_fournisseur, supplier.date_commande)
             if 'Nom du fournisseur' in supplier_data:
                 supplier.nom_fournisseur = supplier_data['Nom du fournisseur']
             if 'Date de commande' in supplier_data:
@@ -140,7 +966,13 @@ def update_supplier(supplier_id, supplier_data):
                 supplier.statut_paiement = supplier_data['Statut du paiement']
             if 'Montant pénalité' in supplier_data:
                 supplier.montant_penalite = supplier_data['Montant pénalité']
+            if 'Numéro de facture' in supplier_data:
+                supplier.numero_facture = supplier_data['Numéro de facture']
             
+            session.flush()
+            _refresh_supplier_months(
+                session.connection(), {old_key, _month_key(supplier.nom_fournisseur, supplier.date_commande)}
+            )
             session.commit()
             return True
         return False
@@ -151,13 +983,47 @@ def update_supplier(supplier_id, supplier_data):
     finally:
         session.close()
 
+# Fonction pour enregistrer un ensemble de modifications de l'éditeur en une seule transaction
+# updates contient les lignes modifiées avec leur id, inserts les nouvelles lignes, delete_ids les ids supprimés
+# Retourne la liste des ids attribués aux lignes ajoutées (dans leur ordre), ou None en cas d'erreur
+def save_supplier_changes(updates=None, inserts=None, delete_ids=()):
+    table = Supplier.__table__
+    try:
+        with engine.begin() as connection:
+            # Mois de synthèse à recalculer : ceux des lignes avant modification, puis ceux des nouvelles valeurs
+            update_records = _dataframe_to_records(updates, with_id=True) if updates is not None and not updates.empty else []
+            insert_records = _dataframe_to_records(inserts) if inserts is not None and not inserts.empty else []
+            keys = _supplier_month_keys(connection, [record['supplier_id'] for record in update_records] + list(delete_ids))
+            keys |= _frame_month_keys(updates) | _frame_month_keys(inserts)
+
+            if update_records:
+                statement = update(table).where(table.c.id == bindparam('supplier_id'))
+                connection.execute(statement, update_records)
+
+            new_ids = []
+            if insert_records:
+                statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+                new_ids = connection.execute(statement, insert_records).scalars().all()
+
+            if len(delete_ids):
+                connection.execute(delete(table).where(table.c.id.in_([int(i) for i in delete_ids])))
+
+            _refresh_supplier_months(connection, keys)
+        return new_ids
+    except Exception as e:
+        print(f"Erreur lors de l'enregistrement des modifications: {e}")
+        return None
+
 # Fonction pour supprimer un fournisseur
 def delete_supplier(supplier_id):
     session = Session()
     try:
         supplier = session.query(Supplier).filter(Supplier.id == supplier_id).first()
         if supplier:
+            key = _month_key(supplier.nom_fournisseur, supplier.date_commande)
             session.delete(supplier)
+            session.flush()
+            _refresh_supplier_months(session.connection(), {key})
             session.commit()
             return True
         return False
@@ -172,7 +1038,9 @@ def delete_supplier(supplier_id):
 def delete_all_suppliers():
     session = Session()
     try:
+        _touch_months(session.connection())
         session.query(Supplier).delete()
+        session.query(SupplierMonthSummary).delete()
         session.commit()
         return True
     except Exception as e:
@@ -182,6 +1050,155 @@ def delete_all_suppliers():
     finally:
         session.close()
 
+# Flux signé d'un mouvement : + solde initial et encaissements, - décaissements, 0 sinon
+SIGNED_FLOW_SQL = """
+    CASE type_mouvement
+        WHEN 'Solde initial' THEN COALESCE(montant_paye, 0)
+        WHEN 'Encaissement' THEN COALESCE(montant_paye, 0)
+        WHEN 'Décaissement' THEN -COALESCE(montant_paye, 0)
+        ELSE 0
+    END
+"""
+
+# Ordre du registre : par date, le solde initial en premier dans sa journée, puis par ordre de saisie
+LEDGER_ORDER_SQL = "date, type_mouvement != 'Solde initial', id"
+LEDGER_ORDER_DESC_SQL = "date DESC, type_mouvement != 'Solde initial' DESC, id DESC"
+
+# Fonction pour recalculer les soldes courants à partir d'une date
+# Seuls les mouvements datés de start_date ou après sont réécrits, en une instruction
+def _refresh_treasury_balances(connection, start_date):
+    base = connection.exec_driver_sql(
+        f"SELECT solde FROM treasury_movements WHERE date < ? ORDER BY {LEDGER_ORDER_DESC_SQL} LIMIT 1",
+        (start_date,)
+    ).scalar()
+    connection.exec_driver_sql(
+        f"""
+        UPDATE treasury_movements SET solde = running.balance
+        FROM (
+            SELECT id, ? + SUM({SIGNED_FLOW_SQL}) OVER (ORDER BY {LEDGER_ORDER_SQL}) AS balance
+            FROM treasury_movements WHERE date >= ?
+        ) AS running
+        WHERE treasury_movements.id = running.id
+        """,
+        (base or 0.0, start_date)
+    )
+
+# Fonction pour convertir un registre de trésorerie en enregistrements prêts pour un INSERT en masse
+def _treasury_records(df):
+    n = len(df)
+    columns = {}
+
+    def column(name, default=None):
+        if name in df.columns:
+            return df[name]
+        return pd.Series([default] * n, index=df.index, dtype=object)
+
+    dates = pd.to_datetime(column('Date'), errors='coerce')
+    columns['date'] = dates.dt.date.astype(object).where(dates.notna(), None)
+
+    for label in ['Montant prévu', 'Montant payé', 'Écart']:
+        values = pd.to_numeric(column(label, 0.0), errors='coerce').fillna(0.0)
+        columns[TREASURY_COLUMN_MAPPING[label]] = values.astype(object)
+
+    for label in ['Type', 'Fournisseur', 'Notes']:
+        values = column(label).astype(object)
+        columns[TREASURY_COLUMN_MAPPING[label]] = values.where(values.notna(), None)
+
+    # Le solde est calculé par la base après l'insertion
+    columns['solde'] = pd.Series([None] * n, index=df.index, dtype=object)
+
+    valid = columns['date'].notna().to_numpy() & columns['type_mouvement'].notna().to_numpy()
+    return pd.DataFrame(columns)[valid].to_dict('records')
+
+# Fonction pour ajouter des mouvements de trésorerie par lots, dans une seule transaction
+# Les soldes courants sont ensuite recalculés à partir de la plus ancienne date insérée
+def add_treasury_movements(df, batch_size=DEFAULT_BATCH_SIZE):
+    records = _treasury_records(df)
+    if not records:
+        return 0
+
+    try:
+        with engine.begin() as connection:
+            for start in range(0, len(records), batch_size):
+                connection.execute(insert(TreasuryMovement.__table__), records[start:start + batch_size])
+            _refresh_treasury_balances(connection, min(record['date'] for record in records))
+        return len(records)
+    except Exception as e:
+        print(f"Erreur lors de l'ajout des mouvements de trésorerie: {e}")
+        return 0
+
+# Fonction pour ajouter un mouvement de trésorerie (dictionnaire avec les colonnes du registre)
+def add_treasury_movement(movement):
+    return add_treasury_movements(pd.DataFrame([movement])) == 1
+
+# Fonction pour récupérer les mouvements de trésorerie d'une fenêtre de dates (bornes incluses)
+# Seules les lignes de la fenêtre sont lues, via l'index sur la date
+def get_treasury_movements(date_from=None, date_to=None):
+    conditions = []
+    params = []
+    if date_from is not None:
+        conditions.append("date >= ?")
+        params.append(_iso_date(date_from))
+    if date_to is not None:
+        conditions.append("date <= ?")
+        params.append(_iso_date(date_to))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    fields = ['id'] + list(TREASURY_COLUMN_MAPPING.values())
+    labels = ['id'] + list(TREASURY_COLUMN_MAPPING)
+    try:
+        connection = engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(
+                f"SELECT {', '.join(fields)} FROM treasury_movements {where} ORDER BY {LEDGER_ORDER_SQL}",
+                params
+            )
+            rows = cursor.fetchall()
+        finally:
+            connection.close()
+
+        df = pd.DataFrame.from_records(rows, columns=labels)
+        df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d')
+        for label in ['Montant prévu', 'Montant payé', 'Écart', 'Solde']:
+            df[label] = df[label].astype(np.float64)
+        df['Fournisseur'] = df['Fournisseur'].fillna('')
+        return df
+    except Exception as e:
+        print(f"Erreur lors de la récupération des mouvements de trésorerie: {e}")
+        return pd.DataFrame(columns=labels)
+
+# Fonction pour récupérer le solde à la fin de la journée précédant une date
+# Retourne None s'il n'y a aucun mouvement avant cette date
+def get_treasury_balance_before(date):
+    try:
+        with engine.connect() as connection:
+            return connection.exec_driver_sql(
+                f"SELECT solde FROM treasury_movements WHERE date < ? ORDER BY {LEDGER_ORDER_DESC_SQL} LIMIT 1",
+                (_iso_date(date),)
+            ).scalar()
+    except Exception as e:
+        print(f"Erreur lors de la récupération du solde de trésorerie: {e}")
+        return None
+
+# Fonction pour récupérer la première et la dernière date du registre de trésorerie
+def get_treasury_date_range():
+    try:
+        with engine.connect() as connection:
+            first, last = connection.exec_driver_sql(
+                "SELECT MIN(date), MAX(date) FROM treasury_movements"
+            ).one()
+        if first is None:
+            return None, None
+        return pd.Timestamp(first), pd.Timestamp(last)
+    except Exception as e:
+        print(f"Erreur lors de la récupération des dates de trésorerie: {e}")
+        return None, None
+
+# Fonction pour vérifier si le registre de trésorerie contient des mouvements
+def treasury_has_data():
+    return get_treasury_date_range()[0] is not None
+
 # Fonction pour vérifier si la base de données existe et contient des données
 def db_has_data():
     try:
@@ -199,5 +1216,27 @@ def db_has_data():
         print(f"Erreur lors de la vérification de la base de données: {e}")
         return False
 
-# Initialiser la base de données au démarrage du module
-init_db()
\ No newline at end of file
+# Initialisation du schéma une seule fois par processus, à la première connexion du pool
+# (et non plus à l'import du module, pour que les scripts qui n'utilisent pas la base démarrent vite)
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+# Fonction pour garantir que les tables et index existent avant le premier accès à la base
+# Le schéma est créé par un moteur dédié : le pool principal est en train d'ouvrir sa connexion
+def ensure_db():
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        schema_engine = create_db_engine(DB_PATH)
+        try:
+            init_db(schema_engine)
+        finally:
+            schema_engine.dispose()
+        _schema_ready = True
+
+@event.listens_for(engine, "connect")
+def _ensure_schema_on_connect(dbapi_connection, connection_record):
+    ensure_db()
\ No newline at end of file
@@ -0,0 +1,220 @@
+"""
+Streaming ingestion of large supplier exports (CSV or Excel)
+
+The file is never loaded whole: CSV is parsed by pandas in chunks of rows and
+Excel is walked row by row with openpyxl in read-only mode. Each chunk goes
+through process_data and is handed to a sink (by default the suppliers table,
+upserted on the invoice number so that a file can be imported again), so peak
+memory depends on the chunk size, not on the size of the file.
+
+The quick import box of the manual entry page is parsed the same way: the
+whole pasted block goes through a single pd.read_csv call and is validated in
+one vectorized pass.
+"""
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from schema import READ_DTYPES, TEXT_COLUMNS
+from utils import process_data
+
+# Number of rows parsed, processed and written at a time
+INGEST_CHUNK_ROWS = int(os.environ.get("INGEST_CHUNK_ROWS", "50000"))
+
+# Uploads above this size (in MB) are streamed to the database by default
+STREAMING_THRESHOLD_MB = float(os.environ.get("STREAMING_THRESHOLD_MB", "50"))
+
+# Fields of a quick import line, in order (the first three are required)
+QUICK_IMPORT_COLUMNS = [
+    'Nom du fournisseur',
+    'Date de commande',
+    'Montant de la commande',
+    'Date de réception',
+    'Date de paiement',
+    'Numéro de facture'
+]
+QUICK_IMPORT_DATE_FORMAT = '%d/%m/%Y'
+
+
+def _file_size(source):
+    """Size of a seekable file object, in bytes (0 if unknown)"""
+    try:
+        position = source.tell()
+        size = source.seek(0, os.SEEK_END)
+        source.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return 0
+
+
+def iter_csv_chunks(source, chunk_rows=INGEST_CHUNK_ROWS):
+    """
+    Yield (chunk, fraction of the file read) from a CSV file object
+    The fraction comes from the position of the underlying file
+    """
+    size = _file_size(source)
+    for chunk in pd.read_csv(source, chunksize=chunk_rows, dtype=READ_DTYPES):
+        fraction = min(source.tell() / size, 1.0) if size else None
+        yield chunk, fraction
+
+
+def _excel_columns(header):
+    """Column labels of the header row, named like pandas for empty cells"""
+    return [
+        str(value) if value is not None else f"Unnamed: {index}"
+        for index, value in enumerate(header)
+    ]
+
+
+def _excel_frame(batch, columns):
+    """Frame of a batch of sheet rows; identifier cells typed as numbers are read as their text"""
+    frame = pd.DataFrame.from_records(batch, columns=columns)
+    for col in TEXT_COLUMNS:
+        if col in frame.columns:
+            frame[col] = frame[col].map(str, na_action='ignore')
+    return frame
+
+
+def iter_excel_chunks(source, chunk_rows=INGEST_CHUNK_ROWS):
+    """
+    Yield (chunk, fraction of the rows read) from the first sheet of an Excel file
+    openpyxl's read-only mode streams the sheet XML instead of building every cell
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        total_rows = sheet.max_row or 0
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _excel_columns(header)
+
+        batch = []
+        read_rows = 1
+        for row in rows:
+            read_rows += 1
+            if all(value is None for value in row):
+                continue
+            batch.append(row)
+            if len(batch) >= chunk_rows:
+                yield _excel_frame(batch, columns), (
+                    min(read_rows / total_rows, 1.0) if total_rows else None
+                )
+                batch = []
+        if batch:
+            yield _excel_frame(batch, columns), 1.0
+    finally:
+        workbook.close()
+
+
+def iter_upload_chunks(source, name, chunk_rows=INGEST_CHUNK_ROWS):
+    """Yield (chunk, fraction read) from an uploaded CSV or Excel file, by file extension"""
+    if name.lower().endswith('.csv'):
+        return iter_csv_chunks(source, chunk_rows)
+    return iter_excel_chunks(source, chunk_rows)
+
+
+def database_sink(chunk, counts=None):
+    """
+    Upsert a processed chunk into the suppliers table, returns the number of rows stored
+    counts: optional dict accumulating the inserted, updated and unchanged rows
+    """
+    import database as db
+
+    inserted, updated, unchanged = db.upsert_suppliers(chunk, optimize=False)
+    if counts is not None:
+        for name, value in (('inserted', inserted), ('updated', updated), ('unchanged', unchanged)):
+            counts[name] = counts.get(name, 0) + value
+    return inserted + updated + unchanged
+
+
+def ingest_upload(source, name, sink=database_sink, chunk_rows=INGEST_CHUNK_ROWS, on_progress=None):
+    """
+    Stream an uploaded file chunk by chunk: parse, process_data, then sink(chunk)
+    on_progress(fraction, rows_read) is called after each chunk (fraction may be None)
+    Returns (rows read, rows stored by the sink)
+    """
+    rows_read = 0
+    rows_stored = 0
+    for chunk, fraction in iter_upload_chunks(source, name, chunk_rows):
+        rows_read += len(chunk)
+        stored = sink(process_data(chunk))
+        rows_stored += len(chunk) if stored is None else stored
+        if on_progress is not None:
+            on_progress(fraction, rows_read)
+    return rows_read, rows_stored
+
+
+def _parse_distinct(values, parse):
+    """
+    Apply parse to the distinct values of a text column only (a ledger repeats
+    the same dates and supplier names on many lines) and map the result back
+    """
+    codes, uniques = pd.factorize(values)
+    # Missing values (code -1) map to a trailing missing entry
+    parsed = parse(pd.Series(np.append(uniques.astype(object), None), dtype=object))
+    result = parsed.take(np.where(codes >= 0, codes, len(uniques)))
+    result.index = values.index
+    return result
+
+
+def parse_quick_import(text):
+    """
+    Parse the CSV lines pasted in the quick import box
+    (supplier, order date, amount[, receipt date[, payment date[, invoice number]]], dates as DD/MM/YYYY)
+    Returns (valid entries, errors) where errors lists (line number, line, reason)
+    for every invalid line; blank lines and fields past the sixth are ignored
+    """
+    # A trailing line with every field makes the parser accept blocks of shorter lines
+    # (it is blank, so it is dropped with the blank lines)
+    raw = pd.read_csv(
+        io.StringIO(text + '\n' + ',' * (len(QUICK_IMPORT_COLUMNS) - 1)),
+        header=None,
+        names=QUICK_IMPORT_COLUMNS,
+        usecols=range(len(QUICK_IMPORT_COLUMNS)),
+        index_col=False,
+        dtype=str,
+        skipinitialspace=True,
+        skip_blank_lines=False
+    )
+    # Blank lines are kept by the parser so that the index is the line number - 1
+    raw = raw[raw.notna().any(axis=1)]
+
+    names = _parse_distinct(raw['Nom du fournisseur'], lambda values: values.str.strip())
+    entries = pd.DataFrame({'Nom du fournisseur': names}, index=raw.index)
+    for col in ['Date de commande', 'Date de réception', 'Date de paiement']:
+        entries[col] = _parse_distinct(raw[col], lambda values: pd.to_datetime(
+            values.str.strip(), format=QUICK_IMPORT_DATE_FORMAT, errors='coerce'
+        ))
+    entries['Montant de la commande'] = pd.to_numeric(
+        raw['Montant de la commande'].str.strip(), errors='coerce'
+    ).astype(np.float64)
+    entries['Numéro de facture'] = raw['Numéro de facture'].str.strip()
+    entries = entries[QUICK_IMPORT_COLUMNS]
+
+    # One reason per invalid line: the first check it fails
+    checks = [
+        (names.isna() | (names == ''), "nom du fournisseur manquant"),
+        (raw['Date de commande'].isna() | raw['Montant de la commande'].isna(),
+         "au moins 3 champs attendus (fournisseur, date de commande, montant)"),
+        (entries['Date de commande'].isna(), "date de commande invalide (JJ/MM/AAAA)"),
+        (entries['Montant de la commande'].isna(), "montant invalide"),
+        (raw['Date de réception'].notna() & entries['Date de réception'].isna(), "date de réception invalide (JJ/MM/AAAA)"),
+        (raw['Date de paiement'].notna() & entries['Date de paiement'].isna(), "date de paiement invalide (JJ/MM/AAAA)"),
+    ]
+    invalid = np.logical_or.reduce([mask.to_numpy() for mask, _ in checks])
+    reasons = np.select([mask.to_numpy() for mask, _ in checks], [reason for _, reason in checks], default='')
+
+    errors = []
+    if invalid.any():
+        lines = text.splitlines()
+        errors = [
+            (line + 1, lines[line] if line < len(lines) else '', reason)
+            for line, reason in zip(raw.index[invalid], reasons[invalid].tolist())
+        ]
+    return entries[~invalid].reset_index(drop=True), errors
@@ -0,0 +1,141 @@
+"""
+Liquidity gaps of a treasury ledger
+
+The ledger only has a balance on movement dates; the balance of every other
+calendar day is the balance after the last movement before it. daily_balances
+resamples the ledger to that daily (or business-day) series, negative_runs
+finds the negative-balance runs with a vectorized run-length encoding, and
+GapIndex answers "is this date in a gap" and "largest gap in a window" in
+O(log n) for dashboards and alerts.
+"""
+import numpy as np
+import pandas as pd
+
+from treasury import compute_balances
+
+GAP_COLUMNS = ['Début', 'Fin', 'Jours', 'Solde minimum', 'Déficit (€·jours)']
+
+
+def daily_balances(ledger, start=None, end=None, freq='D'):
+    """
+    End-of-day balance of the ledger on each day (freq='D') or business day (freq='B')
+    between start and end (defaults: first and last movement dates)
+    Days before the first movement have no balance and are left out
+    """
+    ledger = compute_balances(ledger)
+    if ledger.empty:
+        return pd.Series(dtype=np.float64, name='Solde')
+
+    # Last balance of each movement day
+    by_day = ledger.groupby(ledger['Date'].dt.normalize())['Solde'].last()
+    start = pd.Timestamp(start).normalize() if start is not None else by_day.index[0]
+    end = pd.Timestamp(end).normalize() if end is not None else by_day.index[-1]
+    if end < start:
+        return pd.Series(dtype=np.float64, name='Solde')
+
+    calendar = pd.date_range(min(start, by_day.index[0]), end, freq='D')
+    balances = by_day.reindex(calendar).ffill()
+    balances = balances[balances.index >= start].dropna()
+    if freq != 'D':
+        balances = balances[balances.index.isin(pd.date_range(start, end, freq=freq))]
+    balances.name = 'Solde'
+    return balances
+
+
+def negative_runs(balances):
+    """
+    Runs of consecutive days with a negative balance, one row per run:
+    start, end, number of days, minimum balance and cumulative deficit in euro-days
+    """
+    values = balances.to_numpy(dtype=np.float64)
+    negative = np.concatenate(([0], (values < 0).astype(np.int8), [0]))
+    edges = np.diff(negative)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    if len(starts) == 0:
+        return pd.DataFrame(columns=GAP_COLUMNS)
+
+    dates = balances.index
+    # reduceat over the run boundaries: one vectorized pass for all runs
+    boundaries = np.column_stack((starts, ends + 1)).ravel()
+    boundaries = boundaries[boundaries < len(values)]
+    minimums = np.minimum.reduceat(values, boundaries)[::2]
+    deficits = -np.add.reduceat(values, boundaries)[::2]
+
+    return pd.DataFrame({
+        'Début': dates[starts],
+        'Fin': dates[ends],
+        'Jours': ends - starts + 1,
+        'Solde minimum': minimums,
+        'Déficit (€·jours)': deficits
+    })
+
+
+class GapIndex:
+    """
+    Sorted, non-overlapping negative runs with O(log n) point and window queries
+    Windows are answered with a sparse table of range maxima built in O(n log n)
+    """
+
+    def __init__(self, runs):
+        self.runs = runs.reset_index(drop=True)
+        self.intervals = pd.IntervalIndex.from_arrays(
+            pd.to_datetime(self.runs['Début']), pd.to_datetime(self.runs['Fin']), closed='both'
+        )
+        self._starts = self.intervals.left.to_numpy()
+        self._ends = self.intervals.right.to_numpy()
+        self._tables = {}
+
+    @classmethod
+    def from_ledger(cls, ledger, start=None, end=None, freq='D'):
+        return cls(negative_runs(daily_balances(ledger, start, end, freq)))
+
+    def __len__(self):
+        return len(self.runs)
+
+    def gap_at(self, date):
+        """The run containing date (a row of runs), or None"""
+        date = np.datetime64(pd.Timestamp(date), 'ns')
+        position = int(np.searchsorted(self._starts, date, side='right')) - 1
+        if position >= 0 and date <= self._ends[position]:
+            return self.runs.iloc[position]
+        return None
+
+    def contains(self, date):
+        """Whether date falls in a negative-balance run"""
+        return self.gap_at(date) is not None
+
+    def _sparse_table(self, column):
+        """Argmax of column over every range of 2^k runs, one array per level"""
+        if column not in self._tables:
+            values = self.runs[column].to_numpy(dtype=np.float64)
+            levels = [np.arange(len(values))]
+            width = 1
+            while 2 * width <= len(values):
+                previous = levels[-1]
+                left, right = previous[:-width], previous[width:]
+                levels.append(np.where(values[left] >= values[right], left, right))
+                width *= 2
+            self._tables[column] = (values, levels)
+        return self._tables[column]
+
+    def largest_in_window(self, start, end, by='Déficit (€·jours)'):
+        """
+        The run overlapping [start, end] with the largest value of column by
+        (row of runs), or None when no run overlaps the window
+        """
+        if len(self.runs) == 0:
+            return None
+        start = np.datetime64(pd.Timestamp(start), 'ns')
+        end = np.datetime64(pd.Timestamp(end), 'ns')
+        # Runs are sorted and disjoint: the overlapping ones are a contiguous slice
+        first = int(np.searchsorted(self._ends, start, side='left'))
+        last = int(np.searchsorted(self._starts, end, side='right')) - 1
+        if first > last:
+            return None
+
+        values, levels = self._sparse_table(by)
+        level = int(np.log2(last - first + 1))
+        left = levels[level][first]
+        right = levels[level][last - (1 << level) + 1]
+        return self.runs.iloc[left if values[left] >= values[right] else right]
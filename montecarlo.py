@@ -0,0 +1,196 @@
+"""
+Monte Carlo cash-flow simulator for the treasury scenario planner
+
+Each path replays the planned movements of the ledger over the horizon with
+two sources of noise, both resampled from history (empirical bootstrap):
+- payment-date slippage of the outflows: the historical payment delays of the
+  supplier invoices (processed_data) beyond the standard delay; invoices paid
+  within it do not move a planned outflow earlier
+- paid-vs-planned deviation of the outflows: the 'Écart' / 'Montant prévu'
+  ratio of the movements already paid in the ledger
+
+Paths are simulated as (paths x movements) matrices: daily flows are summed
+with one bincount and the balances are a cumulative sum along the days. The
+percentile bands come from one in-place sort of each day's balances. Above
+POOL_THRESHOLD_PATHS paths, the batches are split across a process pool: each
+worker sorts the balances of its chunk and the sorted chunks are merged.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from treasury import compute_balances, signed_flows, TYPE_OUTFLOW
+
+DEFAULT_PATHS = 10_000
+DEFAULT_HORIZON_DAYS = 365
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Paths simulated per batch: bounds the size of the intermediate matrices
+BATCH_PATHS = int(os.environ.get("MONTE_CARLO_BATCH_PATHS", "20000"))
+
+# Above this many paths the batches run in a process pool (the page slider stops at 100,000)
+POOL_THRESHOLD_PATHS = int(os.environ.get("MONTE_CARLO_POOL_THRESHOLD", "100000"))
+
+
+def fit_slippage(processed, standard_delay=60):
+    """
+    Historical payment-date slippage in days: delay of each paid invoice beyond the standard delay
+    Invoices paid within the standard delay count as no slippage (0), not as early payments
+    """
+    if processed is None or 'Délai de paiement' not in processed.columns:
+        return np.zeros(1, dtype=np.int64)
+    delays = pd.to_numeric(processed['Délai de paiement'], errors='coerce').dropna().to_numpy()
+    if len(delays) == 0:
+        return np.zeros(1, dtype=np.int64)
+    return np.clip(np.round(delays - standard_delay), 0, None).astype(np.int64)
+
+
+def fit_deviation(ledger, today):
+    """
+    Historical paid-vs-planned deviation of the outflows, as a fraction of the planned amount
+    (0.05 = 5% less paid than planned); taken from the outflows dated up to today
+    """
+    planned = pd.to_numeric(ledger['Montant prévu'], errors='coerce').to_numpy(dtype=np.float64)
+    paid = pd.to_numeric(ledger['Montant payé'], errors='coerce').to_numpy(dtype=np.float64)
+    realized = (
+        (ledger['Type'] == TYPE_OUTFLOW).to_numpy() &
+        (pd.to_datetime(ledger['Date']) <= pd.Timestamp(today)).to_numpy() &
+        (planned > 0) & (paid > 0)
+    )
+    if not realized.any():
+        return np.zeros(1)
+    return (planned[realized] - paid[realized]) / planned[realized]
+
+
+def _simulate_batch(opening, offsets, amounts, outflow, slippage, deviation, horizon, n_paths, seed):
+    """
+    Balances of n_paths paths on each day 0..horizon, as a float32 (days x paths) matrix
+    Movements that slip beyond the horizon fall in an extra day that is dropped
+    """
+    rng = np.random.default_rng(seed)
+    shape = (n_paths, len(offsets))
+
+    slip = np.where(outflow, slippage[rng.integers(0, len(slippage), shape)], 0)
+    days = np.clip(offsets + slip, 1, horizon + 1)
+    ratio = np.where(outflow, deviation[rng.integers(0, len(deviation), shape)], 0.0)
+    flows = amounts * (1.0 - ratio)
+
+    # Days are the rows: the running sum adds whole contiguous rows, and the
+    # percentiles are later taken along contiguous rows as well
+    flat = (days * n_paths + np.arange(n_paths)[:, None]).ravel()
+    daily = np.bincount(flat, weights=flows.ravel(), minlength=(horizon + 2) * n_paths).reshape(horizon + 2, n_paths)
+    balances = daily[:horizon + 1]
+    balances[0] += opening
+    # Running sum in place, one row addition per day (several times faster than cumsum along axis 0)
+    for day in range(1, horizon + 1):
+        np.add(balances[day], balances[day - 1], out=balances[day])
+    return balances.astype(np.float32)
+
+
+def _batches(n_paths, seed):
+    """(size, seed) of each batch of paths; the same batches whether they run in process or in the pool"""
+    seeds = np.random.SeedSequence(seed).spawn(-(-n_paths // BATCH_PATHS))
+    sizes = [min(BATCH_PATHS, n_paths - start) for start in range(0, n_paths, BATCH_PATHS)]
+    return list(zip(sizes, seeds))
+
+
+def simulate_balances(opening, offsets, amounts, outflow, slippage, deviation, horizon,
+                      n_paths=DEFAULT_PATHS, seed=None):
+    """
+    Balance matrix (days x paths) of the planned movements
+    offsets: day of each movement after today (1..horizon), amounts: signed planned amounts,
+    outflow: mask of the movements that slip and deviate
+    """
+    return np.concatenate([
+        _simulate_batch(opening, offsets, amounts, outflow, slippage, deviation, horizon, size, batch_seed)
+        for size, batch_seed in _batches(n_paths, seed)
+    ], axis=1)
+
+
+def _simulate_sorted_chunk(args):
+    """Pool worker: balances of a chunk of batches with each day's balances sorted, and their negative counts"""
+    opening, offsets, amounts, outflow, slippage, deviation, horizon, batches = args
+    balances = np.concatenate([
+        _simulate_batch(opening, offsets, amounts, outflow, slippage, deviation, horizon, size, batch_seed)
+        for size, batch_seed in batches
+    ], axis=1)
+    negative = (balances < 0).sum(axis=1)
+    balances.sort(axis=1)
+    return balances, negative
+
+
+def simulate_sorted_balances(opening, offsets, amounts, outflow, slippage, deviation, horizon,
+                             n_paths=DEFAULT_PATHS, seed=None, workers=None):
+    """
+    simulate_balances with each day's balances sorted, and the number of negative balances of each day
+    Up to POOL_THRESHOLD_PATHS paths (or with a single worker) everything runs in process; above,
+    the batches are split across workers processes, which sort their chunk, and the sorted chunks
+    are merged (a stable sort of the concatenated runs). The same seed gives the same result either way
+    """
+    workers = workers or os.cpu_count() or 1
+    batches = _batches(n_paths, seed)
+    if n_paths <= POOL_THRESHOLD_PATHS or workers < 2 or len(batches) < 2:
+        return _simulate_sorted_chunk((opening, offsets, amounts, outflow, slippage, deviation, horizon, batches))
+
+    chunks = [batches[start::workers] for start in range(min(workers, len(batches)))]
+    with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+        results = list(pool.map(_simulate_sorted_chunk, [
+            (opening, offsets, amounts, outflow, slippage, deviation, horizon, chunk) for chunk in chunks
+        ]))
+    balances = np.concatenate([chunk_balances for chunk_balances, _ in results], axis=1)
+    # Timsort merges the sorted runs of the chunks instead of sorting from scratch
+    balances.sort(axis=1, kind='stable')
+    return balances, sum(negative for _, negative in results)
+
+
+def percentile_bands(balances, percentiles=DEFAULT_PERCENTILES, presorted=False):
+    """
+    Percentiles of each day's balances (rows of balances), as np.percentile(balances, percentiles, axis=1)
+    Sorts balances in place, unless presorted: one vectorized sort per row is much faster than
+    selecting several percentiles
+    """
+    if not presorted:
+        balances.sort(axis=1)
+    positions = np.asarray(percentiles, dtype=np.float64) / 100 * (balances.shape[1] - 1)
+    low = np.floor(positions).astype(np.int64)
+    high = np.minimum(low + 1, balances.shape[1] - 1)
+    weight = (positions - low)[:, None]
+    lower, upper = balances[:, low].T.astype(np.float64), balances[:, high].T.astype(np.float64)
+    return lower + (upper - lower) * weight
+
+
+def monte_carlo(ledger, processed, today, horizon_days=DEFAULT_HORIZON_DAYS, n_paths=DEFAULT_PATHS,
+                percentiles=DEFAULT_PERCENTILES, standard_delay=60, seed=None, workers=None):
+    """
+    Simulate the balance of the treasury ledger over the next horizon_days
+    Returns one row per day: the balance percentiles ('P5', 'P50'...) and the
+    probability (in %) of a negative balance
+    workers: processes used above POOL_THRESHOLD_PATHS paths (default: one per CPU)
+    """
+    today = pd.Timestamp(today).normalize()
+    ledger = compute_balances(ledger)
+
+    past = ledger['Date'] <= today
+    opening = float(ledger.loc[past, 'Solde'].iloc[-1]) if past.any() else 0.0
+
+    future = ledger[~past & (ledger['Date'] <= today + pd.Timedelta(days=horizon_days))]
+    amounts = signed_flows(future, 'Montant prévu', include_opening=False)
+    moving = amounts != 0
+    offsets = (future['Date'] - today).dt.days.to_numpy()[moving]
+    outflow = (future['Type'] == TYPE_OUTFLOW).to_numpy()[moving]
+
+    balances, negative = simulate_sorted_balances(
+        opening, offsets, amounts[moving], outflow,
+        fit_slippage(processed, standard_delay), fit_deviation(ledger, today),
+        horizon_days, n_paths=n_paths, seed=seed, workers=workers
+    )
+    negative = negative / n_paths * 100
+    bands = percentile_bands(balances, percentiles, presorted=True)
+
+    result = pd.DataFrame({'Date': today + pd.to_timedelta(np.arange(horizon_days + 1), unit='D')})
+    for q, band in zip(percentiles, bands):
+        result[f'P{q}'] = band
+    result['Probabilité de solde négatif'] = negative
+    return result
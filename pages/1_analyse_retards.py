@@ -1,9 +1,9 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-from utils import process_data
+from utils import PAYMENT_STATUSES, STANDARD_PAYMENT_DELAY
+import database as db
+import analytics
+from paginated_table import paginated_table
 
 # Page configuration
 st.set_page_config(
@@ -21,6 +21,9 @@ if 'processed_data' not in st.session_state or st.session_state['processed_data'
     st.warning("Aucune donnée n'est chargée. Veuillez retourner à la page principale pour charger des données.")
     st.stop()
 
+# Plotting libraries are only loaded once there is data to chart
+import plotly.express as px
+
 # Get data from session state
 data = st.session_state['processed_data']
 
@@ -32,9 +35,31 @@ with st.sidebar:
     suppliers = ["Tous"] + sorted(data['Nom du fournisseur'].unique().tolist())
     selected_supplier = st.selectbox("Fournisseur", suppliers, key="supplier_filter_delay")
     
-    # Filter by delay
-    min_delay = int(data['Délai de paiement'].min()) if 'Délai de paiement' in data.columns else 0
-    max_delay = int(data['Délai de paiement'].max()) if 'Délai de paiement' in data.columns else 100
+    # Filter by order date and by delay (the database source keeps the per-supplier overview, with their bounds)
+    if st.session_state.get('data_source') == 'database':
+        date_min, date_max = data['Première commande'].min(), data['Dernière commande'].max()
+        min_delay, max_delay = data['Délai minimum'].min(), data['Délai maximum'].max()
+    else:
+        date_min, date_max = data['Date de commande'].min(), data['Date de commande'].max()
+        min_delay = data['Délai de paiement'].min() if 'Délai de paiement' in data.columns else 0
+        max_delay = data['Délai de paiement'].max() if 'Délai de paiement' in data.columns else 100
+    
+    # No paid invoice yet: no delay to bound the slider, which then spans the standard delay
+    if pd.isna(min_delay) or pd.isna(max_delay):
+        min_delay, max_delay = 0, STANDARD_PAYMENT_DELAY
+    min_delay, max_delay = int(min_delay), int(max_delay)
+    # The slider needs two distinct bounds (e.g. a single paid invoice)
+    max_delay = max(max_delay, min_delay + 1)
+    
+    date_range = st.date_input(
+        "Période",
+        [date_min, date_max],
+        min_value=date_min,
+        max_value=date_max,
+        format="DD/MM/YYYY",
+        key="period_filter_delay"
+    )
+    date_from, date_to = date_range if len(date_range) == 2 else (None, None)
     
     delay_range = st.slider(
         "Délai de paiement (jours)",
@@ -44,22 +69,53 @@ with st.sidebar:
     )
     
     # Filter by payment status
-    statuses = ["Tous", "Dans les délais", "En retard"]
+    statuses = ["Tous"] + PAYMENT_STATUSES
     selected_status = st.selectbox("Statut de paiement", statuses, key="status_filter_delay")
     
     # Apply filters
-    filtered_data = data.copy()
-    
-    if selected_supplier != "Tous":
-        filtered_data = filtered_data[filtered_data['Nom du fournisseur'] == selected_supplier]
-    
-    filtered_data = filtered_data[
-        (filtered_data['Délai de paiement'] >= delay_range[0]) &
-        (filtered_data['Délai de paiement'] <= delay_range[1])
-    ]
-    
-    if selected_status != "Tous":
-        filtered_data = filtered_data[filtered_data['Statut du paiement'] == selected_status]
+    filtered_summary = None
+    if st.session_state.get('data_source') == 'database':
+        # Full delay range on whole months: the metrics and aggregates read the monthly summary table
+        window = analytics.month_window(date_from, date_to, date_min, date_max)
+        if tuple(delay_range) == (min_delay, max_delay) and window is not None:
+            filtered_summary = db.get_supplier_month_summary(
+                supplier=None if selected_supplier == "Tous" else selected_supplier,
+                status=None if selected_status == "Tous" else selected_status,
+                month_from=window[0],
+                month_to=window[1]
+            )
+        
+        # All the filters run in SQLite on the table indexes
+        filtered_data = db.query_suppliers(
+            supplier=None if selected_supplier == "Tous" else selected_supplier,
+            date_from=date_from,
+            date_to=date_to,
+            status=None if selected_status == "Tous" else selected_status,
+            delay_min=delay_range[0],
+            delay_max=delay_range[1]
+        )
+    else:
+        filtered_data = data.copy()
+        
+        if selected_supplier != "Tous":
+            filtered_data = filtered_data[filtered_data['Nom du fournisseur'] == selected_supplier]
+        
+        if date_from is not None:
+            filtered_data = filtered_data[
+                (filtered_data['Date de commande'] >= pd.to_datetime(date_from)) &
+                (filtered_data['Date de commande'] <= pd.to_datetime(date_to))
+            ]
+        
+        if selected_status != "Tous":
+            filtered_data = filtered_data[filtered_data['Statut du paiement'] == selected_status]
+        
+        filtered_data = filtered_data[
+            (filtered_data['Délai de paiement'] >= delay_range[0]) &
+            (filtered_data['Délai de paiement'] <= delay_range[1])
+        ]
+
+# Hashed once for the cached aggregates and the table of the page
+data_fingerprint = analytics.fingerprint(filtered_data)
 
 # Main content
 st.header("Tableau des retards de paiement")
@@ -67,17 +123,24 @@ st.header("Tableau des retards de paiement")
 # Summary metrics
 col1, col2, col3 = st.columns(3)
 
+if filtered_summary is not None:
+    metrics = analytics.summary_metrics(filtered_summary)
+    avg_delay, max_delay = metrics['Délai moyen'], metrics['Délai maximum']
+    # The delay filter drops unpaid invoices from the rows: count the paid ones only
+    late_payments, payments_count = metrics['Factures en retard'], metrics['Factures payées']
+else:
+    avg_delay, max_delay = filtered_data['Délai de paiement'].mean(), filtered_data['Délai de paiement'].max()
+    late_payments = filtered_data[filtered_data['Statut du paiement'] == 'En retard'].shape[0]
+    payments_count = filtered_data.shape[0]
+
 with col1:
-    avg_delay = filtered_data['Délai de paiement'].mean()
     st.metric("Délai moyen de paiement", f"{avg_delay:.1f} jours")
     
 with col2:
-    late_payments = filtered_data[filtered_data['Statut du paiement'] == 'En retard'].shape[0]
-    late_payments_pct = late_payments / filtered_data.shape[0] * 100 if filtered_data.shape[0] > 0 else 0
+    late_payments_pct = late_payments / payments_count * 100 if payments_count > 0 else 0
     st.metric("Paiements en retard", f"{late_payments} ({late_payments_pct:.1f}%)")
     
 with col3:
-    max_delay = filtered_data['Délai de paiement'].max()
     st.metric("Délai maximum", f"{max_delay:.0f} jours")
 
 # Create visualizations
@@ -100,7 +163,10 @@ with col1:
     
 with col2:
     # Average delay by supplier
-    avg_delay_by_supplier = filtered_data.groupby('Nom du fournisseur')['Délai de paiement'].mean().reset_index()
+    if filtered_summary is not None:
+        avg_delay_by_supplier = analytics.summary_supplier_delay_means(filtered_summary)
+    else:
+        avg_delay_by_supplier = analytics.supplier_delay_means(filtered_data, data_fingerprint=data_fingerprint)
     avg_delay_by_supplier = avg_delay_by_supplier.sort_values('Délai de paiement', ascending=False)
     
     fig_avg_delay = px.bar(
@@ -117,19 +183,30 @@ with col2:
 # Delays over time
 st.subheader("Évolution des retards dans le temps")
 
-# Convert dates to month for time series analysis
-filtered_data['Mois commande'] = pd.to_datetime(filtered_data['Date de commande']).dt.to_period('M').astype(str)
-
-# Group by month and calculate average delay
-delay_by_month = filtered_data.groupby('Mois commande')['Délai de paiement'].mean().reset_index()
+# Average delay by order period (day, week, month or quarter)
+granularity = st.selectbox(
+    "Granularité",
+    list(analytics.PERIOD_COLUMNS),
+    index=2,
+    format_func=analytics.PERIOD_COLUMNS.get,
+    key="period_delay"
+)
+period_column = analytics.PERIOD_COLUMNS[granularity]
+if filtered_summary is not None and granularity in analytics.SUMMARY_PERIODS:
+    delay_by_period = analytics.summary_period(filtered_summary, granularity)
+else:
+    delay_by_period = analytics.period_summary(
+        filtered_data, 'Date de commande', granularity, data_fingerprint=data_fingerprint
+    )
+delay_by_period = delay_by_period.rename(columns={'Délai moyen': 'Délai de paiement'})
 
 fig_time_series = px.line(
-    delay_by_month,
-    x='Mois commande',
+    delay_by_period,
+    x=period_column,
     y='Délai de paiement',
-    title="Évolution du délai moyen de paiement par mois",
+    title=f"Évolution du délai moyen de paiement par {period_column.lower()}",
     markers=True,
-    labels={'Délai de paiement': 'Délai moyen (jours)', 'Mois commande': 'Mois'}
+    labels={'Délai de paiement': 'Délai moyen (jours)'}
 )
 
 # Add a horizontal line for the standard delay (e.g., 60 days)
@@ -146,9 +223,6 @@ st.plotly_chart(fig_time_series, use_container_width=True)
 # Display detailed data
 st.subheader("Données détaillées des retards")
 
-# Sort by delay in descending order to highlight the longest delays
-sorted_data = filtered_data.sort_values('Délai de paiement', ascending=False)
-
 # Add color-coding for status
 def highlight_status(val):
     if val == 'En retard':
@@ -157,10 +231,13 @@ def highlight_status(val):
         return 'background-color: rgba(0, 255, 0, 0.2)'
     return ''
 
-# Display with styling
-st.dataframe(
-    sorted_data.style.applymap(highlight_status, subset=['Statut du paiement']),
-    use_container_width=True
+# Sorted by delay in descending order to highlight the longest delays; only the visible page is styled
+paginated_table(
+    filtered_data,
+    key='delay_details',
+    sort_by='Délai de paiement',
+    style=lambda styler: styler.map(highlight_status, subset=['Statut du paiement']),
+    data_fingerprint=data_fingerprint
 )
 
 # Add summary analysis and recommendations
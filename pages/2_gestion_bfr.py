@@ -1,8 +1,5 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
 from utils import calculate_bfr
 
 # Page configuration
@@ -21,6 +18,10 @@ if 'processed_data' not in st.session_state or st.session_state['processed_data'
     st.warning("Aucune donnée n'est chargée. Veuillez retourner à la page principale pour charger des données.")
     st.stop()
 
+# Plotting libraries are only loaded once there is data to chart
+import plotly.express as px
+import plotly.graph_objects as go
+
 # Get data from session state
 data = st.session_state['processed_data']
 
@@ -37,8 +38,11 @@ with col2:
     creances_clients = st.number_input("Créances clients", min_value=0.0, value=75000.0, step=1000.0, format="%.2f")
 
 with col3:
-    # Calculate total supplier debt from the data
-    dettes_fournisseurs_default = data['Montant de la commande'].sum() if not data.empty else 50000.0
+    # Calculate total supplier debt from the data (per-supplier totals for the database source)
+    if st.session_state.get('data_source') == 'database':
+        dettes_fournisseurs_default = float(data['Montant total'].sum())
+    else:
+        dettes_fournisseurs_default = data['Montant de la commande'].sum() if not data.empty else 50000.0
     dettes_fournisseurs = st.number_input(
         "Dettes fournisseurs", 
         min_value=0.0, 
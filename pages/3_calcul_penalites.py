@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
 from utils import calculate_penalties, PENALTY_INTEREST_RATE
+from penalties import TERMS_COLUMNS, SCHEDULE_COLUMNS, START_REFERENCES, rate_schedule
+import parquet_mirror
+import analytics
+from paginated_table import paginated_table
 
 # Page configuration
 st.set_page_config(
@@ -21,6 +22,9 @@ if 'processed_data' not in st.session_state or st.session_state['processed_data'
     st.warning("Aucune donnée n'est chargée. Veuillez retourner à la page principale pour charger des données.")
     st.stop()
 
+# Plotting libraries are only loaded once there is data to chart
+import plotly.express as px
+
 # Get data from session state
 data = st.session_state['processed_data']
 
@@ -35,6 +39,7 @@ with st.expander("Informations sur la loi 69-21"):
     - **Délai légal standard**: 60 jours à compter de la date de facturation, sauf accord spécifique
     - **Taux d'intérêt applicable**: 3% (dans le cadre de cette application)
     - **Calcul des pénalités**: (Montant de la facture × Taux d'intérêt × Jours de retard) / 365
+    - **Changement de taux**: les intérêts sont calculés au taux en vigueur chaque jour de retard
     
     #### Exemple:
     Pour une facture de 10 000 € payée avec 15 jours de retard:
@@ -70,20 +75,64 @@ with col2:
         help="Taux d'intérêt applicable pour le calcul des pénalités"
     ) / 100  # Convert percentage to decimal
 
-# Calculate penalties
-data_with_penalties = data.copy()
+# Negotiated terms per supplier and dated rate changes
+with st.expander("Conditions par fournisseur et barème des taux"):
+    st.write(
+        "Les fournisseurs sans conditions négociées sont soumis au délai standard à compter de la date de commande. "
+        "Le taux ci-dessus s'applique jusqu'à la première date d'effet du barème."
+    )
 
-# Calculate days of delay beyond standard
-data_with_penalties['Jours de retard'] = data_with_penalties['Délai de paiement'].apply(
-    lambda x: max(0, x - standard_delay)
-)
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader("Conditions négociées")
+        terms = st.data_editor(
+            pd.DataFrame(columns=TERMS_COLUMNS),
+            num_rows="dynamic",
+            column_config={
+                'Nom du fournisseur': st.column_config.SelectboxColumn(
+                    "Fournisseur",
+                    options=sorted(data['Nom du fournisseur'].dropna().astype(str).unique().tolist()),
+                    required=True
+                ),
+                'Délai contractuel': st.column_config.NumberColumn(
+                    "Délai contractuel (jours)", min_value=0, max_value=120, step=1, default=standard_delay
+                ),
+                'Point de départ': st.column_config.SelectboxColumn(
+                    "Point de départ", options=START_REFERENCES, default=START_REFERENCES[0]
+                )
+            },
+            use_container_width=True,
+            key="penalty_terms"
+        )
+
+    with col2:
+        st.subheader("Barème des taux")
+        rate_changes = st.data_editor(
+            pd.DataFrame({SCHEDULE_COLUMNS[0]: pd.Series(dtype='datetime64[ns]'), SCHEDULE_COLUMNS[1]: pd.Series(dtype=float)}),
+            num_rows="dynamic",
+            column_config={
+                SCHEDULE_COLUMNS[0]: st.column_config.DateColumn("Date d'effet", format="DD/MM/YYYY", required=True),
+                SCHEDULE_COLUMNS[1]: st.column_config.NumberColumn(
+                    "Taux annuel (%)", min_value=0.0, max_value=100.0, step=0.1, format="%.2f", required=True
+                )
+            },
+            use_container_width=True,
+            key="penalty_rate_schedule"
+        )
+
+# Base rate first, then the rate changes (entered in %)
+schedule = [(pd.Timestamp('1970-01-01'), interest_rate)] + [
+    (date, rate / 100)
+    for date, rate in rate_changes.dropna().itertuples(index=False)
+]
 
-# Calculate penalty amount based on the law
-data_with_penalties['Montant pénalité'] = (
-    data_with_penalties['Montant de la commande'] * 
-    interest_rate * 
-    data_with_penalties['Jours de retard']
-) / 365
+# Shared with the supplier dashboard and the audit summary
+st.session_state['penalty_settings'] = {
+    'standard_delay': standard_delay,
+    'interest_rate': rate_schedule(schedule) if len(schedule) > 1 else interest_rate,
+    'terms': terms.dropna(subset=['Nom du fournisseur']) if not terms.empty else None
+}
 
 # Filters
 st.header("Filtrer les résultats")
@@ -92,22 +141,32 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Filter by supplier
-    suppliers = ["Tous"] + sorted(data_with_penalties['Nom du fournisseur'].unique().tolist())
+    suppliers = ["Tous"] + sorted(data['Nom du fournisseur'].unique().tolist())
     selected_supplier = st.selectbox("Fournisseur", suppliers, key="supplier_filter_penalties")
 
 with col2:
     # Filter to show only late payments
     show_only_late = st.checkbox("Afficher uniquement les paiements en retard", value=True)
 
+# The database source keeps the per-supplier overview: read the invoices of the selected
+# supplier (from the Parquet mirror when there is one)
+if st.session_state.get('data_source') == 'database':
+    data = parquet_mirror.query_suppliers(supplier=None if selected_supplier == "Tous" else selected_supplier)
+elif selected_supplier != "Tous":
+    data = data[data['Nom du fournisseur'] == selected_supplier]
+
+# Calculate penalties
+data_with_penalties = calculate_penalties(data, **st.session_state['penalty_settings'])
+
 # Apply filters
 filtered_data = data_with_penalties.copy()
 
-if selected_supplier != "Tous":
-    filtered_data = filtered_data[filtered_data['Nom du fournisseur'] == selected_supplier]
-
 if show_only_late:
     filtered_data = filtered_data[filtered_data['Jours de retard'] > 0]
 
+# Hashed once for the cached aggregates and the table of the page
+data_fingerprint = analytics.fingerprint(filtered_data)
+
 # Summary metrics
 st.header("Résumé des pénalités")
 
@@ -134,7 +193,7 @@ col1, col2 = st.columns(2)
 
 with col1:
     # Penalties by supplier
-    penalties_by_supplier = filtered_data.groupby('Nom du fournisseur')['Montant pénalité'].sum().reset_index()
+    penalties_by_supplier = analytics.supplier_penalty_totals(filtered_data, data_fingerprint=data_fingerprint)
     penalties_by_supplier = penalties_by_supplier.sort_values('Montant pénalité', ascending=False)
     
     fig_penalties = px.bar(
@@ -168,9 +227,6 @@ with col2:
 # Detailed data table
 st.header("Tableau détaillé des pénalités")
 
-# Sort by penalty amount in descending order
-sorted_data = filtered_data.sort_values('Montant pénalité', ascending=False)
-
 # Format the table for better readability
 display_cols = [
     'Nom du fournisseur', 
@@ -188,10 +244,14 @@ def highlight_late(val):
         return 'color: red'
     return ''
 
-# Display with styling
-st.dataframe(
-    sorted_data[display_cols].style.applymap(highlight_late, subset=['Jours de retard', 'Montant pénalité']),
-    use_container_width=True
+# Sorted by penalty amount in descending order; only the visible page is styled
+paginated_table(
+    filtered_data,
+    key='penalty_details',
+    columns=display_cols,
+    sort_by='Montant pénalité',
+    style=lambda styler: styler.map(highlight_late, subset=['Jours de retard', 'Montant pénalité']),
+    data_fingerprint=data_fingerprint
 )
 
 # Summary analysis
@@ -228,22 +288,33 @@ with col2:
 # Penalty projection
 st.header("Projection des pénalités")
 
-# Calculate penalties over time (by month)
-filtered_data['Mois paiement'] = pd.to_datetime(filtered_data['Date de paiement']).dt.to_period('M').astype(str)
-penalties_by_month = filtered_data.groupby('Mois paiement')['Montant pénalité'].sum().reset_index()
+# Penalties by payment period (unpaid invoices carry no penalty yet)
+granularity = st.selectbox(
+    "Granularité",
+    list(analytics.PERIOD_COLUMNS),
+    index=2,
+    format_func=analytics.PERIOD_COLUMNS.get,
+    key="period_penalties"
+)
+period_column = analytics.PERIOD_COLUMNS[granularity]
+penalties_by_period = analytics.period_summary(
+    filtered_data, 'Date de paiement', granularity, data_fingerprint=data_fingerprint
+)[
+    [period_column, 'Montant pénalité']
+]
 
-if not penalties_by_month.empty:
+if not penalties_by_period.empty:
     fig_time = px.line(
-        penalties_by_month,
-        x='Mois paiement',
+        penalties_by_period,
+        x=period_column,
         y='Montant pénalité',
-        title="Évolution des pénalités par mois",
+        title=f"Évolution des pénalités par {period_column.lower()}",
         markers=True,
-        labels={'Montant pénalité': 'Montant des pénalités (€)', 'Mois paiement': 'Mois'}
+        labels={'Montant pénalité': 'Montant des pénalités (€)'}
     )
     st.plotly_chart(fig_time, use_container_width=True)
 else:
-    st.info("Données insuffisantes pour afficher l'évolution des pénalités par mois.")
+    st.info(f"Données insuffisantes pour afficher l'évolution des pénalités par {period_column.lower()}.")
 
 # Warning about legal implications
 st.warning("""
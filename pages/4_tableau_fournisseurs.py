@@ -1,8 +1,9 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
+import numpy as np
+from utils import calculate_penalties
+import database as db
+import analytics
 
 # Page configuration
 st.set_page_config(
@@ -20,39 +21,31 @@ if 'processed_data' not in st.session_state or st.session_state['processed_data'
     st.warning("Aucune donnée n'est chargée. Veuillez retourner à la page principale pour charger des données.")
     st.stop()
 
+# Plotting libraries are only loaded once there is data to chart
+import plotly.express as px
+
 # Get data from session state
 data = st.session_state['processed_data']
 
-# Calculate penalties if not already done
-if 'Montant pénalité' not in data.columns:
-    # We'll assume a standard delay of 60 days and an interest rate of 3%
-    standard_delay = 60
-    interest_rate = 0.03
-    
-    # Calculate days of delay beyond standard
-    data['Jours de retard'] = data['Délai de paiement'].apply(
-        lambda x: max(0, x - standard_delay)
-    )
+# The database source keeps the per-supplier overview: the rows are queried below with the filters
+if st.session_state.get('data_source') != 'database':
+    # Calculate penalties if not already done, with the terms and rates of the penalty page
+    # (standard delay of 60 days and interest rate of 3% until they are set there)
+    if 'Montant pénalité' not in data.columns:
+        data = calculate_penalties(data, **st.session_state.get('penalty_settings', {}))
     
-    # Calculate penalty amount
-    data['Montant pénalité'] = (
-        data['Montant de la commande'] * 
-        interest_rate * 
-        data['Jours de retard']
-    ) / 365
-
-# Calculate unpaid amounts (we'll assume a payment is unpaid if the payment date is missing)
-data['Statut de la commande'] = data['Date de paiement'].apply(
-    lambda x: 'Payée' if pd.notna(x) else 'Non payée'
-)
+    # Calculate unpaid amounts (we'll assume a payment is unpaid if the payment date is missing)
+    data['Statut de la commande'] = np.where(data['Date de paiement'].notna(), 'Payée', 'Non payée')
 
 # Sidebar filters
 with st.sidebar:
     st.header("Filtres")
     
     # Filter by date range
-    date_min = data['Date de commande'].min()
-    date_max = data['Date de commande'].max()
+    if st.session_state.get('data_source') == 'database':
+        date_min, date_max = data['Première commande'].min(), data['Dernière commande'].max()
+    else:
+        date_min, date_max = data['Date de commande'].min(), data['Date de commande'].max()
     
     date_range = st.date_input(
         "Période",
@@ -66,16 +59,29 @@ with st.sidebar:
     selected_payment_status = st.selectbox("Statut de la commande", payment_statuses)
     
     # Apply filters
-    filtered_data = data.copy()
-    
-    if len(date_range) == 2:
-        filtered_data = filtered_data[
-            (filtered_data['Date de commande'] >= pd.to_datetime(date_range[0])) &
-            (filtered_data['Date de commande'] <= pd.to_datetime(date_range[1]))
-        ]
-    
-    if selected_payment_status != "Tous":
-        filtered_data = filtered_data[filtered_data['Statut de la commande'] == selected_payment_status]
+    if st.session_state.get('data_source') == 'database':
+        # Date and payment filters run in SQLite on the table indexes
+        filtered_data = db.query_suppliers(
+            date_from=date_range[0] if len(date_range) == 2 else None,
+            date_to=date_range[1] if len(date_range) == 2 else None,
+            paid=None if selected_payment_status == "Tous" else selected_payment_status == "Payée"
+        )
+        # Penalties with the terms and rates of the penalty page, not the amounts stored at import
+        filtered_data = calculate_penalties(filtered_data, **st.session_state.get('penalty_settings', {}))
+        filtered_data['Statut de la commande'] = np.where(
+            filtered_data['Date de paiement'].notna(), 'Payée', 'Non payée'
+        )
+    else:
+        filtered_data = data.copy()
+        
+        if len(date_range) == 2:
+            filtered_data = filtered_data[
+                (filtered_data['Date de commande'] >= pd.to_datetime(date_range[0])) &
+                (filtered_data['Date de commande'] <= pd.to_datetime(date_range[1]))
+            ]
+        
+        if selected_payment_status != "Tous":
+            filtered_data = filtered_data[filtered_data['Statut de la commande'] == selected_payment_status]
 
 # Main content
 # Top-level metrics
@@ -102,24 +108,11 @@ with col4:
 # Supplier analysis section
 st.header("Analyse par fournisseur")
 
-# Prepare data for charts
-supplier_metrics = filtered_data.groupby('Nom du fournisseur').agg({
-    'Montant de la commande': 'sum',
-    'Délai de paiement': 'mean',
-    'Montant pénalité': 'sum',
-    'Statut de la commande': lambda x: (x == 'Non payée').mean() * 100  # Percentage of unpaid orders
-}).reset_index()
-
-supplier_metrics.columns = [
-    'Nom du fournisseur', 
-    'Montant total', 
-    'Délai moyen de paiement', 
-    'Pénalités totales',
-    'Pourcentage non payé'
-]
+# Per-supplier KPIs (amounts, delays, penalties, unpaid share, late rate) in one pass
+supplier_kpis = analytics.supplier_kpis(filtered_data)
 
 # Sort by total amount for visualization
-supplier_metrics = supplier_metrics.sort_values('Montant total', ascending=False)
+supplier_metrics = supplier_kpis.sort_values('Montant total', ascending=False)
 
 # Create 2x2 dashboard with different charts
 col1, col2 = st.columns(2)
@@ -205,23 +198,6 @@ with col2:
 # Supplier KPI table
 st.header("Indicateurs clés par fournisseur")
 
-# Calculate additional metrics
-supplier_counts = filtered_data.groupby('Nom du fournisseur').size().reset_index(name='Nombre de commandes')
-supplier_late_payments = filtered_data[filtered_data['Statut du paiement'] == 'En retard'].groupby('Nom du fournisseur').size().reset_index(name='Commandes en retard')
-supplier_unpaid = filtered_data[filtered_data['Statut de la commande'] == 'Non payée'].groupby('Nom du fournisseur')['Montant de la commande'].sum().reset_index(name='Montant non payé')
-
-# Merge all metrics
-supplier_kpis = supplier_metrics.merge(supplier_counts, on='Nom du fournisseur', how='left')
-supplier_kpis = supplier_kpis.merge(supplier_late_payments, on='Nom du fournisseur', how='left')
-supplier_kpis = supplier_kpis.merge(supplier_unpaid, on='Nom du fournisseur', how='left')
-
-# Fill NaN values with 0
-supplier_kpis['Commandes en retard'] = supplier_kpis['Commandes en retard'].fillna(0)
-supplier_kpis['Montant non payé'] = supplier_kpis['Montant non payé'].fillna(0)
-
-# Calculate late payment rate
-supplier_kpis['Taux de retard (%)'] = (supplier_kpis['Commandes en retard'] / supplier_kpis['Nombre de commandes'] * 100).round(1)
-
 # Select and order columns for display
 display_cols = [
     'Nom du fournisseur',
@@ -247,26 +223,8 @@ st.dataframe(supplier_kpis_sorted.style.format({
 # Supplier risk analysis
 st.header("Analyse des risques fournisseurs")
 
-# Create a risk score based on multiple factors
-supplier_kpis['Score de risque'] = (
-    # High weight for late payment rate
-    supplier_kpis['Taux de retard (%)'] * 0.4 +
-    # Medium weight for percentage unpaid
-    supplier_kpis['Pourcentage non payé'] * 0.3 +
-    # Lower weight for average delay over 60 days
-    (supplier_kpis['Délai moyen de paiement'].apply(lambda x: max(0, x - 60)) / 10) * 0.3
-).round(1)
-
-# Categorize suppliers based on risk score
-def risk_category(score):
-    if score < 15:
-        return 'Faible'
-    elif score < 35:
-        return 'Moyen'
-    else:
-        return 'Élevé'
-
-supplier_kpis['Catégorie de risque'] = supplier_kpis['Score de risque'].apply(risk_category)
+# Risk score: 40% late payment rate, 30% unpaid share, 30% average delay over 60 days
+supplier_kpis = analytics.supplier_risk_scores(supplier_kpis)
 
 # Create a visualization of risk
 fig_risk = px.bar(
@@ -1,9 +1,13 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import numpy as np
+from treasury import carry_forward, projected_balance, simulate_scenario
+from montecarlo import monte_carlo, DEFAULT_PERCENTILES
+from liquidity import daily_balances, negative_runs
+from utils import STANDARD_PAYMENT_DELAY
+import database as db
+import parquet_mirror
 
 # Page configuration
 st.set_page_config(
@@ -21,15 +25,15 @@ if 'processed_data' not in st.session_state or st.session_state['processed_data'
     st.warning("Aucune donnée n'est chargée. Veuillez retourner à la page principale pour charger des données.")
     st.stop()
 
+# Plotting libraries are only loaded once there is data to chart
+import plotly.express as px
+import plotly.graph_objects as go
+
 # Get data from session state
 data = st.session_state['processed_data']
 
-# Initialize treasury_data in session state if it doesn't exist
-if 'treasury_data' not in st.session_state:
-    # Get unique suppliers from the data
-    suppliers = data['Nom du fournisseur'].unique().tolist()
-    
-    # Create initial treasury data with some example records
+# Example movements built from the supplier names, only stored on an explicit request
+def example_movements(suppliers):
     today = datetime.now()
     initial_balance = 100000  # Example initial balance
     
@@ -42,12 +46,10 @@ if 'treasury_data' not in st.session_state:
         'Fournisseur': '',
         'Montant prévu': initial_balance,
         'Montant payé': initial_balance,
-        'Écart': 0,
-        'Solde': initial_balance
+        'Écart': 0
     })
     
     # Generate some example future payments based on supplier data
-    current_balance = initial_balance
     for i in range(1, 11):  # Generate 10 example payments
         payment_date = today + timedelta(days=i*7)  # Weekly payments
         supplier = np.random.choice(suppliers)
@@ -57,23 +59,16 @@ if 'treasury_data' not in st.session_state:
         paid_amount = amount * np.random.uniform(0.9, 1.1) if i % 3 == 0 else amount
         difference = amount - paid_amount
         
-        current_balance -= paid_amount
-        
         treasury_data.append({
             'Date': payment_date.strftime('%Y-%m-%d'),
             'Type': 'Décaissement',
             'Fournisseur': supplier,
             'Montant prévu': amount,
             'Montant payé': paid_amount,
-            'Écart': difference,
-            'Solde': current_balance
+            'Écart': difference
         })
     
-    st.session_state['treasury_data'] = pd.DataFrame(treasury_data)
-    st.session_state['initial_balance'] = initial_balance
-
-# Get treasury data from session state
-treasury_data = st.session_state['treasury_data']
+    return pd.DataFrame(treasury_data)
 
 # Input section for new treasury entry
 st.header("Ajouter un mouvement de trésorerie")
@@ -122,55 +117,62 @@ with st.form("new_treasury_entry"):
         # Calculate difference
         difference = entry_amount_expected - entry_amount_paid
         
-        # Calculate new balance
-        if entry_type == "Décaissement":
-            new_balance = treasury_data['Solde'].iloc[-1] - entry_amount_paid
-        elif entry_type == "Encaissement":
-            new_balance = treasury_data['Solde'].iloc[-1] + entry_amount_paid
-        else:
-            new_balance = treasury_data['Solde'].iloc[-1]  # No change for "Autre"
-        
-        # Create new entry
-        new_entry = pd.DataFrame([{
-            'Date': entry_date.strftime('%Y-%m-%d'),
+        # Store the movement; the database updates the balances from its date onward
+        added = db.add_treasury_movement({
+            'Date': entry_date,
             'Type': entry_type,
             'Fournisseur': entry_supplier,
             'Montant prévu': entry_amount_expected,
             'Montant payé': entry_amount_paid,
             'Écart': difference,
-            'Solde': new_balance,
             'Notes': entry_notes
-        }])
-        
-        # Append to treasury data
-        st.session_state['treasury_data'] = pd.concat([treasury_data, new_entry], ignore_index=True)
-        
-        # Sort by date
-        st.session_state['treasury_data'] = st.session_state['treasury_data'].sort_values('Date')
+        })
         
-        st.success("Mouvement ajouté avec succès!")
-        st.rerun()  # Refresh the page to show the new entry
-
-# Get updated treasury data
-treasury_data = st.session_state['treasury_data']
-
-# Convert Date column to datetime
-treasury_data['Date'] = pd.to_datetime(treasury_data['Date'])
+        if added:
+            st.success("Mouvement ajouté avec succès!")
+            st.rerun()  # Refresh the page to show the new entry
+        else:
+            st.error("Erreur lors de l'ajout du mouvement.")
+
+# The ledger is shared by every session: it is never filled with example movements implicitly
+if not db.treasury_has_data():
+    st.info("Le registre de trésorerie est vide. Ajoutez un mouvement ci-dessus ou chargez un exemple.")
+    if st.button("Charger un exemple"):
+        # Balances are computed by the database on insert
+        if db.add_treasury_movements(example_movements(data['Nom du fournisseur'].unique().tolist())):
+            st.rerun()
+        else:
+            st.error("Erreur lors du chargement de l'exemple.")
+    st.stop()
 
 # Sidebar filters
 with st.sidebar:
     st.header("Filtres")
     
-    # Date range filter
-    date_min = treasury_data['Date'].min()
-    date_max = treasury_data['Date'].max() + timedelta(days=30)  # Add a month to include future projections
+    # Date range filter: only this window of the ledger is loaded from the database
+    first_date, last_date = db.get_treasury_date_range()
+    date_min = first_date
+    date_max = last_date + timedelta(days=30)  # Add a month to include future projections
+    now = pd.Timestamp(datetime.now()).normalize()
     
+    # Default window around today, clamped at both ends into the ledger range
+    default_start = min(max(date_min, now - timedelta(days=90)), date_max)
+    default_end = max(min(date_max, now + timedelta(days=365)), date_min)
     date_range = st.date_input(
         "Période",
-        [date_min, date_max],
+        [default_start, default_end],
         min_value=date_min,
         max_value=date_max
     )
+    window_start = pd.Timestamp(date_range[0])
+    window_end = pd.Timestamp(date_range[1]) if len(date_range) == 2 else date_max
+    
+    # Load the window and carry the balance of the movements before it
+    treasury_data = carry_forward(
+        db.get_treasury_movements(window_start, window_end).drop(columns='id'),
+        db.get_treasury_balance_before(window_start),
+        window_start
+    )
     
     # Transaction type filter
     types = ["Tous"] + treasury_data['Type'].unique().tolist()
@@ -179,15 +181,13 @@ with st.sidebar:
     # Apply filters
     filtered_treasury = treasury_data.copy()
     
-    if len(date_range) == 2:
-        filtered_treasury = filtered_treasury[
-            (filtered_treasury['Date'] >= pd.to_datetime(date_range[0])) &
-            (filtered_treasury['Date'] <= pd.to_datetime(date_range[1]))
-        ]
-    
     if selected_type != "Tous":
         filtered_treasury = filtered_treasury[filtered_treasury['Type'] == selected_type]
 
+# Opening balance of the loaded window, the starting point of the scenarios
+openings = treasury_data.loc[treasury_data['Type'] == 'Solde initial', 'Montant payé']
+st.session_state['initial_balance'] = float(openings.iloc[0]) if not openings.empty else 0.0
+
 # Treasury overview
 st.header("Aperçu de la trésorerie")
 
@@ -208,27 +208,15 @@ with col2:
     st.metric("Paiements à venir (30j)", f"{future_payments:,.2f} €")
 
 with col3:
-    # Projected balance (30 days)
-    projected_balance = current_balance
+    # Projected balance (30 days): expected inflows and outflows of the next 30 days
+    projected = projected_balance(treasury_data, current_balance, datetime.now(), days=30)
     
-    # Subtract upcoming payments
-    upcoming_payments = treasury_data[
-        (treasury_data['Date'] > datetime.now()) & 
-        (treasury_data['Date'] <= datetime.now() + timedelta(days=30))
-    ]
-    
-    for _, row in upcoming_payments.iterrows():
-        if row['Type'] == 'Décaissement':
-            projected_balance -= row['Montant prévu']
-        elif row['Type'] == 'Encaissement':
-            projected_balance += row['Montant prévu']
-    
-    balance_change = projected_balance - current_balance
+    balance_change = projected - current_balance
     delta_color = "normal" if balance_change >= 0 else "inverse"
     
     st.metric(
         "Solde projeté (30j)", 
-        f"{projected_balance:,.2f} €", 
+        f"{projected:,.2f} €", 
         delta=f"{balance_change:,.2f} €",
         delta_color=delta_color
     )
@@ -375,7 +363,7 @@ sorted_treasury = filtered_treasury.sort_values('Date')
 
 # Display with styling
 st.dataframe(
-    sorted_treasury[display_cols].style.applymap(highlight_deficit, subset=['Écart', 'Solde']).format({
+    sorted_treasury[display_cols].style.map(highlight_deficit, subset=['Écart', 'Solde']).format({
         'Montant prévu': '{:,.2f} €',
         'Montant payé': '{:,.2f} €',
         'Écart': '{:,.2f} €',
@@ -394,36 +382,18 @@ with col1:
     
     # Check for potential issues
     future_treasury = treasury_data[treasury_data['Date'] > datetime.now()]
-    daily_balances = future_treasury.sort_values('Date')
-    
-    # Check for negative balance periods
-    negative_periods = []
-    current_period = None
-    
-    for idx, row in daily_balances.iterrows():
-        if row['Solde'] < 0 and current_period is None:
-            current_period = {
-                'start_date': row['Date'],
-                'min_balance': row['Solde']
-            }
-        elif row['Solde'] < 0 and current_period is not None:
-            current_period['min_balance'] = min(current_period['min_balance'], row['Solde'])
-            current_period['end_date'] = row['Date']
-        elif row['Solde'] >= 0 and current_period is not None:
-            current_period['end_date'] = row['Date'] - timedelta(days=1)
-            negative_periods.append(current_period)
-            current_period = None
-    
-    # Add the last period if it's still open
-    if current_period is not None:
-        current_period['end_date'] = daily_balances.iloc[-1]['Date']
-        negative_periods.append(current_period)
-    
-    if negative_periods:
-        for period in negative_periods:
-            start_str = period['start_date'].strftime('%d/%m/%Y')
-            end_str = period['end_date'].strftime('%d/%m/%Y')
-            st.warning(f"⚠️ **Solde négatif** du {start_str} au {end_str} (minimum: {period['min_balance']:,.2f} €)")
+    
+    # Negative balance periods, over every calendar day from today on (not only movement dates)
+    negative_periods = negative_runs(daily_balances(treasury_data, start=datetime.now()))
+    
+    if not negative_periods.empty:
+        for _, period in negative_periods.iterrows():
+            start_str = period['Début'].strftime('%d/%m/%Y')
+            end_str = period['Fin'].strftime('%d/%m/%Y')
+            st.warning(
+                f"⚠️ **Solde négatif** du {start_str} au {end_str} "
+                f"(minimum: {period['Solde minimum']:,.2f} €, déficit cumulé: {period['Déficit (€·jours)']:,.0f} €·jours)"
+            )
     else:
         st.success("✅ Aucune période de solde négatif prévue dans l'horizon actuel.")
     
@@ -445,9 +415,9 @@ with col2:
     recommendations = []
     
     # Check for cash flow issues
-    if any(period['min_balance'] < -10000 for period in negative_periods):
+    if (negative_periods['Solde minimum'] < -10000).any():
         recommendations.append("🔴 **Urgent**: Prévoir un financement à court terme pour couvrir les périodes de solde fortement négatif.")
-    elif negative_periods:
+    elif not negative_periods.empty:
         recommendations.append("🟠 **Important**: Échelonner certains paiements pour éviter les périodes de solde négatif.")
     
     # Check for payment concentration
@@ -519,81 +489,16 @@ with st.expander("Outils de planification"):
         )
     
     if st.button("Simuler ce scénario"):
-        # Create a copy of the original data
-        scenario_data = treasury_data.copy()
-        
-        # Adjust initial balance
-        balance_diff = new_initial_balance - st.session_state['initial_balance']
-        scenario_data.loc[0, 'Montant prévu'] = new_initial_balance
-        scenario_data.loc[0, 'Montant payé'] = new_initial_balance
-        scenario_data.loc[0, 'Solde'] = new_initial_balance
-        
-        # Update all subsequent balances by the same amount
-        for i in range(1, len(scenario_data)):
-            scenario_data.loc[i, 'Solde'] += balance_diff
-        
-        # Delay future payments
-        if delay_days > 0:
-            today = datetime.now()
-            future_indices = scenario_data[scenario_data['Date'] > today].index
-            scenario_data.loc[future_indices, 'Date'] = scenario_data.loc[future_indices, 'Date'] + timedelta(days=delay_days)
-        
-        # Reduce future payments
-        if payment_reduction > 0:
-            today = datetime.now()
-            future_payment_indices = scenario_data[
-                (scenario_data['Date'] > today) & 
-                (scenario_data['Type'] == 'Décaissement')
-            ].index
-            
-            reduction_factor = 1 - (payment_reduction / 100)
-            scenario_data.loc[future_payment_indices, 'Montant prévu'] *= reduction_factor
-            scenario_data.loc[future_payment_indices, 'Montant payé'] *= reduction_factor
-            
-            # Recalculate balances
-            current_balance = scenario_data.loc[0, 'Solde']
-            for i in range(1, len(scenario_data)):
-                if scenario_data.loc[i, 'Type'] == 'Décaissement':
-                    current_balance -= scenario_data.loc[i, 'Montant payé']
-                elif scenario_data.loc[i, 'Type'] == 'Encaissement':
-                    current_balance += scenario_data.loc[i, 'Montant payé']
-                scenario_data.loc[i, 'Solde'] = current_balance
-        
-        # Add emergency funding
-        if emergency_funding > 0:
-            # Find the earliest future date
-            today = datetime.now()
-            future_dates = scenario_data[scenario_data['Date'] > today]['Date']
-            
-            if not future_dates.empty:
-                funding_date = future_dates.min()
-                
-                # Create a new entry for the emergency funding
-                funding_entry = pd.DataFrame([{
-                    'Date': funding_date,
-                    'Type': 'Encaissement',
-                    'Fournisseur': 'Financement d\'urgence',
-                    'Montant prévu': emergency_funding,
-                    'Montant payé': emergency_funding,
-                    'Écart': 0,
-                    'Solde': 0,  # Will be calculated below
-                    'Notes': 'Financement d\'urgence (simulation)'
-                }])
-                
-                # Add to scenario data
-                scenario_data = pd.concat([scenario_data, funding_entry], ignore_index=True)
-                
-                # Sort by date
-                scenario_data = scenario_data.sort_values('Date')
-                
-                # Recalculate balances
-                current_balance = scenario_data.iloc[0]['Solde']
-                for i in range(1, len(scenario_data)):
-                    if scenario_data.iloc[i]['Type'] == 'Décaissement':
-                        current_balance -= scenario_data.iloc[i]['Montant payé']
-                    elif scenario_data.iloc[i]['Type'] == 'Encaissement':
-                        current_balance += scenario_data.iloc[i]['Montant payé']
-                    scenario_data.iloc[i, scenario_data.columns.get_loc('Solde')] = current_balance
+        # Chain the scenario transforms on the ledger, then recompute the balances once
+        today = datetime.now()
+        scenario_data = simulate_scenario(
+            treasury_data,
+            today,
+            opening_balance=new_initial_balance,
+            delay_days=delay_days,
+            outflow_reduction=payment_reduction / 100,
+            funding=emergency_funding
+        )
         
         # Create the chart for the scenario
         fig_scenario = px.line(
@@ -640,3 +545,84 @@ with st.expander("Outils de planification"):
             st.warning("⚠️ Ce scénario génère un solde négatif. Des mesures supplémentaires peuvent être nécessaires.")
         else:
             st.success("✅ Ce scénario maintient un solde positif tout au long de la période.")
+    
+    # Stochastic mode: the same scenario replayed over many simulated paths
+    st.subheader("Mode stochastique (Monte Carlo)")
+    st.write(
+        "Les décalages de dates de paiement et les écarts entre montants prévus et payés "
+        "sont tirés de l'historique des factures et des mouvements déjà réglés."
+    )
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        n_paths = st.select_slider(
+            "Nombre de trajectoires",
+            options=[1000, 10000, 50000, 100000],
+            value=10000
+        )
+    
+    with col2:
+        horizon_days = st.slider(
+            "Horizon (jours)",
+            min_value=30,
+            max_value=365,
+            value=365
+        )
+    
+    if st.button("Lancer la simulation Monte Carlo"):
+        today = datetime.now()
+        scenario_ledger = simulate_scenario(
+            treasury_data,
+            today,
+            opening_balance=new_initial_balance,
+            delay_days=delay_days,
+            outflow_reduction=payment_reduction / 100,
+            funding=emergency_funding
+        )
+        
+        # Database sessions hold a per-supplier overview: the delays are read from the invoices
+        if st.session_state.get('data_source') == 'database':
+            invoices = parquet_mirror.query_suppliers(columns=['Délai de paiement'])
+        else:
+            invoices = data
+        
+        with st.spinner("Simulation en cours..."):
+            bands = monte_carlo(
+                scenario_ledger,
+                invoices,
+                today,
+                horizon_days=horizon_days,
+                n_paths=n_paths,
+                standard_delay=STANDARD_PAYMENT_DELAY
+            )
+        
+        low, high = f"P{DEFAULT_PERCENTILES[0]}", f"P{DEFAULT_PERCENTILES[-1]}"
+        
+        # Fan chart: outer percentile band and median balance
+        fig_bands = go.Figure()
+        fig_bands.add_trace(go.Scatter(x=bands['Date'], y=bands[high], mode='lines', line=dict(width=0), showlegend=False))
+        fig_bands.add_trace(go.Scatter(
+            x=bands['Date'], y=bands[low], mode='lines', line=dict(width=0), fill='tonexty',
+            fillcolor='rgba(31, 119, 180, 0.2)', name=f"{low} – {high}"
+        ))
+        fig_bands.add_trace(go.Scatter(x=bands['Date'], y=bands['P50'], mode='lines', name="Médiane"))
+        fig_bands.add_hline(y=0, line_dash="dash", line_color="red")
+        fig_bands.update_layout(title="Simulation Monte Carlo : bandes de solde", yaxis_title="Solde (€)")
+        st.plotly_chart(fig_bands, use_container_width=True)
+        
+        fig_negative = px.line(
+            bands,
+            x='Date',
+            y='Probabilité de solde négatif',
+            title="Probabilité de solde négatif",
+            labels={'Probabilité de solde négatif': 'Probabilité (%)'}
+        )
+        st.plotly_chart(fig_negative, use_container_width=True)
+        
+        worst = bands.loc[bands['Probabilité de solde négatif'].idxmax()]
+        st.metric(
+            "Probabilité maximale de solde négatif",
+            f"{worst['Probabilité de solde négatif']:.1f}%",
+            help=f"Atteinte le {worst['Date'].strftime('%d/%m/%Y')}"
+        )
@@ -1,7 +1,5 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from utils import (
     calculate_dpo, calculate_bfr, calculate_cash_ratio,
@@ -24,9 +22,21 @@ if 'processed_data' not in st.session_state or st.session_state['processed_data'
     st.warning("Aucune donnée n'est chargée. Veuillez retourner à la page principale pour charger des données.")
     st.stop()
 
+# Plotting libraries are only loaded once there is data to chart
+import plotly.express as px
+import plotly.graph_objects as go
+
 # Get data from session state
 data = st.session_state['processed_data']
 
+# Purchases and unpaid invoices: per-supplier totals for the database source, invoice rows otherwise
+if st.session_state.get('data_source') == 'database':
+    purchases_total = float(data['Montant total'].sum())
+    unpaid_total = float(data['Montant non payé'].sum())
+else:
+    purchases_total = float(data['Montant de la commande'].sum())
+    unpaid_total = float(data[data['Date de paiement'].isna()]['Montant de la commande'].sum())
+
 # Inputs for financial ratio calculations
 st.header("Données financières pour le calcul des ratios")
 
@@ -36,7 +46,7 @@ with col1:
     total_achats = st.number_input(
         "Total des achats fournisseurs TTC",
         min_value=0.0,
-        value=float(data['Montant de la commande'].sum()),
+        value=purchases_total,
         step=10000.0,
         format="%.2f",
         help="Montant total des achats sur la période"
@@ -45,7 +55,7 @@ with col1:
     total_dettes = st.number_input(
         "Total des dettes fournisseurs",
         min_value=0.0,
-        value=float(data[data['Date de paiement'].isna()]['Montant de la commande'].sum()),
+        value=unpaid_total,
         step=10000.0,
         format="%.2f",
         help="Montant total des factures non réglées"
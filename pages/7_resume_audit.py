@@ -1,9 +1,11 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import numpy as np
+from datetime import datetime
+from utils import calculate_penalties
+import parquet_mirror
+import analytics
+import reports
+from paginated_table import paginated_table
 
 # Page configuration
 st.set_page_config(
@@ -21,34 +23,27 @@ if 'processed_data' not in st.session_state or st.session_state['processed_data'
     st.warning("Aucune donnée n'est chargée. Veuillez retourner à la page principale pour charger des données.")
     st.stop()
 
+# Plotting libraries are only loaded once there is data to chart
+import plotly.express as px
+
 # Get data from session state
 data = st.session_state['processed_data']
 
-# Add penalties calculation if not already done
-if 'Montant pénalité' not in data.columns:
-    # Standard delay based on Law 69-21 (assumed 60 days)
-    standard_delay = 60
-    interest_rate = 0.03  # 3% interest rate
-    
-    # Calculate days of delay beyond standard
-    data['Jours de retard'] = data['Délai de paiement'].apply(
-        lambda x: max(0, x - standard_delay)
-    )
-    
-    # Calculate penalty amount based on the law
-    data['Montant pénalité'] = (
-        data['Montant de la commande'] * 
-        interest_rate * 
-        data['Jours de retard']
-    ) / 365
+# Add penalties calculation if not already done, with the terms and rates of the penalty page
+# (standard delay of 60 days, 3% interest rate until they are set there); the database source
+# keeps the per-supplier overview: the penalties of its rows are calculated once they are queried below
+if st.session_state.get('data_source') != 'database' and 'Montant pénalité' not in data.columns:
+    data = calculate_penalties(data, **st.session_state.get('penalty_settings', {}))
 
 # Sidebar filters
 with st.sidebar:
     st.header("Filtres d'audit")
     
     # Date range filter
-    date_min = data['Date de commande'].min()
-    date_max = data['Date de commande'].max()
+    if st.session_state.get('data_source') == 'database':
+        date_min, date_max = data['Première commande'].min(), data['Dernière commande'].max()
+    else:
+        date_min, date_max = data['Date de commande'].min(), data['Date de commande'].max()
     
     audit_period = st.date_input(
         "Période d'audit",
@@ -62,40 +57,47 @@ with st.sidebar:
     selected_supplier = st.selectbox("Fournisseur", suppliers)
     
     # Apply filters
-    filtered_data = data.copy()
-    
-    if len(audit_period) == 2:
-        filtered_data = filtered_data[
-            (filtered_data['Date de commande'] >= pd.to_datetime(audit_period[0])) &
-            (filtered_data['Date de commande'] <= pd.to_datetime(audit_period[1]))
-        ]
-    
-    if selected_supplier != "Tous":
-        filtered_data = filtered_data[filtered_data['Nom du fournisseur'] == selected_supplier]
+    if st.session_state.get('data_source') == 'database':
+        # Audit period and supplier filters run in SQLite on the table indexes, or on the
+        # Parquet mirror when there is one (months outside the period are not read)
+        filtered_data = parquet_mirror.query_suppliers(
+            supplier=None if selected_supplier == "Tous" else selected_supplier,
+            date_from=audit_period[0] if len(audit_period) == 2 else None,
+            date_to=audit_period[1] if len(audit_period) == 2 else None,
+            columns=reports.NON_COMPLIANT_COLUMNS + ['Date de réception', 'Statut du paiement']
+        )
+        # The stored penalties do not follow the terms and rates of the penalty page: recalculate them
+        filtered_data = calculate_penalties(filtered_data, **st.session_state.get('penalty_settings', {}))
+    else:
+        filtered_data = data.copy()
+        
+        if len(audit_period) == 2:
+            filtered_data = filtered_data[
+                (filtered_data['Date de commande'] >= pd.to_datetime(audit_period[0])) &
+                (filtered_data['Date de commande'] <= pd.to_datetime(audit_period[1]))
+            ]
+        
+        if selected_supplier != "Tous":
+            filtered_data = filtered_data[filtered_data['Nom du fournisseur'] == selected_supplier]
+
+# Hashed once for the cached aggregates and the report of the page
+data_fingerprint = analytics.fingerprint(filtered_data)
 
 # Calculate key audit metrics
-total_invoices = filtered_data.shape[0]
-non_compliant_invoices = filtered_data[filtered_data['Statut du paiement'] == 'En retard'].shape[0]
-total_penalties = filtered_data['Montant pénalité'].sum()
-compliance_rate = ((total_invoices - non_compliant_invoices) / total_invoices * 100) if total_invoices > 0 else 0
-
-# Find supplier with most late payments
-if non_compliant_invoices > 0:
-    late_by_supplier = filtered_data[filtered_data['Statut du paiement'] == 'En retard'].groupby('Nom du fournisseur').size().reset_index(name='count')
-    worst_supplier = late_by_supplier.loc[late_by_supplier['count'].idxmax(), 'Nom du fournisseur']
-else:
-    worst_supplier = "N/A"
-
-# Determine audit position
-if compliance_rate >= 90:
-    audit_position = "Position favorable"
-    position_color = "green"
-elif compliance_rate >= 70:
-    audit_position = "Position neutre"
-    position_color = "orange"
-else:
-    audit_position = "Position d'alerte"
-    position_color = "red"
+audit_summary = analytics.audit_summary(filtered_data, data_fingerprint=data_fingerprint)
+total_invoices = audit_summary["Nombre total de factures"]
+paid_invoices = audit_summary["Factures payées"]
+non_compliant_invoices = audit_summary["Factures non conformes"]
+total_penalties = audit_summary["Total des pénalités"]
+compliance_rate = audit_summary["Taux de conformité"]
+worst_supplier = audit_summary["Fournisseur avec le plus de retards"]
+audit_position = audit_summary["Position d'audit"]
+
+# Color of the audit position
+position_color = {
+    "Position favorable": "green",
+    "Position neutre": "orange"
+}.get(audit_position, "red")
 
 # Display summary metrics
 st.header("Indicateurs clés d'audit")
@@ -138,8 +140,8 @@ col1, col2 = st.columns(2)
 with col1:
     # Pie chart for compliance status
     compliance_data = pd.DataFrame({
-        'Status': ['Conforme', 'Non conforme'],
-        'Count': [total_invoices - non_compliant_invoices, non_compliant_invoices]
+        'Status': ['Conforme', 'Non conforme', 'Non payé'],
+        'Count': [paid_invoices - non_compliant_invoices, non_compliant_invoices, total_invoices - paid_invoices]
     })
     
     fig_pie = px.pie(
@@ -148,7 +150,7 @@ with col1:
         names='Status',
         title="Répartition des factures par statut de conformité",
         color='Status',
-        color_discrete_map={'Conforme': 'green', 'Non conforme': 'red'},
+        color_discrete_map={'Conforme': 'green', 'Non conforme': 'red', 'Non payé': 'grey'},
         hole=0.4
     )
     
@@ -171,28 +173,28 @@ with col2:
 # Detailed compliance analysis
 st.header("Analyse détaillée de la conformité")
 
-# Trends over time
-monthly_data = filtered_data.copy()
-monthly_data['Mois'] = pd.to_datetime(monthly_data['Date de commande']).dt.to_period('M').astype(str)
-
-# Group by month and calculate compliance rate
-monthly_compliance = pd.DataFrame()
-for month in monthly_data['Mois'].unique():
-    month_data = monthly_data[monthly_data['Mois'] == month]
-    if month_data.shape[0] > 0:
-        compliant = month_data.shape[0] - month_data[month_data['Statut du paiement'] == 'En retard'].shape[0]
-        compliance_rate = (compliant / month_data.shape[0]) * 100
-    else:
-        compliance_rate = 0
-    monthly_compliance = pd.concat([monthly_compliance, pd.DataFrame([{'Mois': month, 'Taux de conformité': compliance_rate}])])
+# Trends over time: compliance rate by order period
+granularity = st.selectbox(
+    "Granularité",
+    list(analytics.PERIOD_COLUMNS),
+    index=2,
+    format_func=analytics.PERIOD_COLUMNS.get,
+    key="period_compliance"
+)
+period_column = analytics.PERIOD_COLUMNS[granularity]
+compliance_trend = analytics.period_summary(
+    filtered_data, 'Date de commande', granularity, data_fingerprint=data_fingerprint
+)[
+    [period_column, 'Taux de conformité']
+]
 
 fig_trend = px.line(
-    monthly_compliance,
-    x='Mois',
+    compliance_trend,
+    x=period_column,
     y='Taux de conformité',
-    title="Évolution du taux de conformité par mois",
+    title=f"Évolution du taux de conformité par {period_column.lower()}",
     markers=True,
-    labels={'Taux de conformité': 'Taux de conformité (%)', 'Mois': 'Mois'}
+    labels={'Taux de conformité': 'Taux de conformité (%)'}
 )
 
 # Add reference lines for compliance thresholds
@@ -217,14 +219,8 @@ st.plotly_chart(fig_trend, use_container_width=True)
 # Risk matrix: Supplier analysis
 st.subheader("Matrice de risque fournisseurs")
 
-# Calculate risk parameters for each supplier
-supplier_risk = filtered_data.groupby('Nom du fournisseur').agg({
-    'Montant de la commande': 'sum',  # Financial exposure
-    'Délai de paiement': 'mean',  # Average payment delay
-    'Statut du paiement': lambda x: (x == 'En retard').mean() * 100  # Late payment rate
-}).reset_index()
-
-supplier_risk.columns = ['Nom du fournisseur', 'Exposition financière', 'Délai moyen', 'Taux de retard (%)']
+# Risk parameters for each supplier: financial exposure, average delay and late payment rate
+supplier_risk = analytics.supplier_risk(filtered_data, data_fingerprint=data_fingerprint)
 
 # Create bubble chart for risk visualization
 fig_risk = px.scatter(
@@ -266,7 +262,7 @@ st.plotly_chart(fig_risk, use_container_width=True)
 st.header("Détail des factures non conformes")
 
 if non_compliant_invoices > 0:
-    non_compliant_data = filtered_data[filtered_data['Statut du paiement'] == 'En retard'].sort_values('Délai de paiement', ascending=False)
+    non_compliant_data = filtered_data[filtered_data['Statut du paiement'] == 'En retard']
     
     # Select and order columns for display
     display_cols = [
@@ -285,15 +281,18 @@ if non_compliant_invoices > 0:
             return f'background-color: rgba(255, 0, 0, {min(val/120, 0.8)})'
         return ''
     
-    # Display with styling
-    st.dataframe(
-        non_compliant_data[display_cols].style.map(highlight_delays, subset=['Jours de retard']).format({
+    # Sorted by delay in descending order; only the visible page is styled
+    paginated_table(
+        non_compliant_data,
+        key='audit_non_compliant',
+        columns=display_cols,
+        sort_by='Délai de paiement',
+        style=lambda styler: styler.map(highlight_delays, subset=['Jours de retard']).format({
             'Date de commande': lambda x: x.strftime('%d/%m/%Y'),
             'Date de paiement': lambda x: x.strftime('%d/%m/%Y'),
             'Montant de la commande': '{:,.2f} €',
             'Montant pénalité': '{:,.2f} €'
-        }),
-        use_container_width=True
+        })
     )
 else:
     st.success("Aucune facture non conforme détectée dans la période d'audit sélectionnée.")
@@ -315,6 +314,7 @@ else:
 
 # Supplier-specific recommendations
 if worst_supplier != "N/A":
+    late_by_supplier = analytics.supplier_late_counts(filtered_data, data_fingerprint=data_fingerprint)
     supplier_late_count = late_by_supplier.loc[late_by_supplier['Nom du fournisseur'] == worst_supplier, 'count'].iloc[0]
     supplier_late_rate = (supplier_late_count / filtered_data[filtered_data['Nom du fournisseur'] == worst_supplier].shape[0]) * 100
     
@@ -379,47 +379,23 @@ else:
 # Export options
 st.header("Exporter le rapport d'audit")
 
-# Create a downloadable Excel report
-def create_audit_report():
-    # Create a BytesIO object
-    output = pd.ExcelWriter('audit_report.xlsx', engine='xlsxwriter')
-    
-    # Write summary sheet
-    summary_data = pd.DataFrame([
-        {"Indicateur": "Nombre total de factures", "Valeur": total_invoices},
-        {"Indicateur": "Factures non conformes", "Valeur": non_compliant_invoices},
-        {"Indicateur": "Taux de conformité", "Valeur": f"{compliance_rate:.1f}%"},
-        {"Indicateur": "Total des pénalités", "Valeur": f"{total_penalties:.2f} €"},
-        {"Indicateur": "Fournisseur avec le plus de retards", "Valeur": worst_supplier},
-        {"Indicateur": "Position d'audit", "Valeur": audit_position}
-    ])
-    
-    summary_data.to_excel(output, sheet_name='Résumé', index=False)
-    
-    # Write non-compliant invoices
-    if non_compliant_invoices > 0:
-        non_compliant_data[display_cols].to_excel(output, sheet_name='Factures non conformes', index=False)
-    
-    # Write monthly compliance
-    monthly_compliance.to_excel(output, sheet_name='Évolution mensuelle', index=False)
-    
-    # Write supplier risk
-    supplier_risk.to_excel(output, sheet_name='Risque fournisseurs', index=False)
-    
-    # Save the workbook
-    output.close()
-    
-    with open('audit_report.xlsx', 'rb') as f:
-        return f.read()
-
-# Create download button
-report = create_audit_report()
-st.download_button(
-    label="Télécharger le rapport d'audit (Excel)",
-    data=report,
-    file_name=f"rapport_audit_fournisseurs_{datetime.now().strftime('%Y-%m-%d')}.xlsx",
-    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-)
+# The Excel report is only built when requested, once per set of filters
+report_params = (tuple(str(day) for day in audit_period), selected_supplier)
+
+if st.button("Préparer le rapport d'audit (Excel)"):
+    st.session_state['audit_report_params'] = report_params
+
+if st.session_state.get('audit_report_params') == report_params:
+    report = reports.audit_report(
+        filtered_data, reports.summary_rows(audit_summary), data_fingerprint=data_fingerprint
+    )
+    st.download_button(
+        label="Télécharger le rapport d'audit (Excel)",
+        data=report,
+        file_name=f"rapport_audit_fournisseurs_{datetime.now().strftime('%Y-%m-%d')}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        on_click="ignore"
+    )
 
 # Audit completion certificate
 st.header("Certificat d'audit")
@@ -2,7 +2,10 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from utils import process_data
+from utils import process_data, calculate_penalties
+from schema import apply_schema
+from change_sets import editor_changes, valid_rows, patch_frame
+from ingestion import parse_quick_import
 import database as db
 
 # Page configuration
@@ -20,15 +23,17 @@ st.write("Ajoutez et modifiez des données sans importer de fichier Excel")
 if 'manual_data' not in st.session_state:
     # Vérifier si la base de données contient des données
     if db.db_has_data():
-        st.session_state['manual_data'] = db.get_suppliers_dataframe()
+        st.session_state['manual_data'] = db.get_suppliers_dataframe(categories=False)
     else:
         # Si la base de données est vide, créer un dataframe vide
         st.session_state['manual_data'] = pd.DataFrame({
+            'id': [],
             'Nom du fournisseur': [],
             'Date de commande': [],
             'Montant de la commande': [],
             'Date de réception': [],
-            'Date de paiement': []
+            'Date de paiement': [],
+            'Numéro de facture': []
         })
 
 # Create a function to add data to the session state and database
@@ -38,30 +43,34 @@ def add_entry_to_data():
         'Date de commande': st.session_state.order_date,
         'Montant de la commande': st.session_state.order_amount,
         'Date de réception': st.session_state.reception_date,
-        'Date de paiement': st.session_state.payment_date if st.session_state.is_paid else None
+        'Date de paiement': st.session_state.payment_date if st.session_state.is_paid else None,
+        'Numéro de facture': st.session_state.invoice_number.strip() or None
     }
     
     # Process the entry to calculate delays and status
-    processed_entry = process_data(pd.DataFrame([new_entry])).iloc[0].to_dict()
+    processed_entry = process_data(pd.DataFrame([new_entry]))
     
-    # Add to database
-    if db.add_supplier(processed_entry):
+    # Add to database, keeping the id it was given
+    new_ids = db.save_supplier_changes(inserts=processed_entry)
+    if new_ids:
+        processed_entry['id'] = new_ids
+        
         # Append to the manual data
-        st.session_state['manual_data'] = pd.concat([
-            st.session_state['manual_data'], 
-            pd.DataFrame([processed_entry])
-        ], ignore_index=True)
+        st.session_state['manual_data'] = patch_frame(
+            st.session_state['manual_data'], apply_schema(processed_entry, categorical=False)
+        )
         
         # Add to the main processed data
-        if 'processed_data' in st.session_state:
-            # If processed_data exists, append the new entry
+        if st.session_state.get('data_source') in ('upload', 'sample'):
+            # If processed_data comes from a file import, append the new entry
             st.session_state['processed_data'] = pd.concat([
                 st.session_state['processed_data'],
-                pd.DataFrame([processed_entry])
+                processed_entry
             ], ignore_index=True)
         else:
-            # If processed_data doesn't exist, create it from the manual data
-            st.session_state['processed_data'] = st.session_state['manual_data'].copy()
+            # Database session (or no data yet): refresh the per-supplier overview the session keeps
+            st.session_state['processed_data'] = db.get_suppliers_overview()
+            st.session_state['data_source'] = 'database'
         
         # Reset the form fields
         st.session_state.supplier_name = ""
@@ -119,6 +128,8 @@ with st.form(key='data_entry_form'):
             key="reception_date"
         )
         
+        st.text_input("Numéro de facture (optionnel)", key="invoice_number")
+        
         is_paid = st.checkbox("Commande payée", key="is_paid")
         
         if is_paid:
@@ -137,12 +148,16 @@ with st.form(key='data_entry_form'):
 st.header("Données en base")
 
 if not st.session_state['manual_data'].empty:
+    # The editor key changes after each save so that its pending edits start over
+    editor_key = f"manual_data_editor_{st.session_state.get('manual_data_version', 0)}"
+    
     # Add an option to edit or delete entries
     edited_data = st.data_editor(
         st.session_state['manual_data'],
         use_container_width=True,
         num_rows="dynamic",
         hide_index=True,
+        key=editor_key,
         column_config={
             "id": st.column_config.NumberColumn("ID", disabled=True),
             "Nom du fournisseur": st.column_config.TextColumn("Fournisseur"),
@@ -153,56 +168,50 @@ if not st.session_state['manual_data'].empty:
             "Délai de paiement": st.column_config.NumberColumn("Délai (jours)"),
             "Statut du paiement": st.column_config.TextColumn("Statut"),
             "Jours de retard": st.column_config.NumberColumn("Jours retard"),
-            "Montant pénalité": st.column_config.NumberColumn("Pénalité (€)", format="%.2f €")
+            "Montant pénalité": st.column_config.NumberColumn("Pénalité (€)", format="%.2f €"),
+            "Numéro de facture": st.column_config.TextColumn("N° facture")
         }
     )
     
     # Button to save edited data
     if st.button("Enregistrer les modifications en base de données"):
         try:
-            # Update the database with edited data
-            success_count = 0
-            
-            # Process the edited data to recalculate delays and status
-            processed_edited_data = process_data(edited_data)
-            
-            for _, row in processed_edited_data.iterrows():
-                row_dict = row.to_dict()
-                
-                if 'id' in row_dict and row_dict['id'] is not None:
-                    # Update existing supplier
-                    if db.update_supplier(row_dict['id'], row_dict):
-                        success_count += 1
-                else:
-                    # Add new supplier
-                    if db.add_supplier(row_dict):
-                        success_count += 1
-            
-            # Get fresh data from database
-            fresh_data = db.get_suppliers_dataframe()
+            # Only the rows changed, added or deleted in the editor are processed and saved
+            changed, added, deleted_ids = editor_changes(
+                st.session_state['manual_data'], st.session_state.get(editor_key, {})
+            )
+            valid_changed, valid_added = valid_rows(changed), valid_rows(added)
+            ignored_count = int((~valid_changed).sum() + (~valid_added).sum())
             
-            # Update session states
-            st.session_state['manual_data'] = fresh_data
+            # Recalculate delays, status and penalties of those rows only
+            changed = calculate_penalties(process_data(changed[valid_changed].reset_index(drop=True)))
+            added = calculate_penalties(process_data(added[valid_added].reset_index(drop=True)))
             
-            if 'processed_data' in st.session_state:
-                # Update the main processed data
-                # Preserve any data from file imports, only update or add the database entries
-                db_ids = fresh_data['id'].tolist() if 'id' in fresh_data.columns else []
+            # Save the whole change set in one transaction
+            new_ids = db.save_supplier_changes(changed, added, deleted_ids)
+            if new_ids is None:
+                st.error("Erreur lors de l'enregistrement des modifications en base de données.")
+            else:
+                saved = pd.concat([changed, added.assign(id=new_ids)], ignore_index=True)
                 
-                # Get processed data without the database entries
-                if db_ids and 'id' in st.session_state['processed_data'].columns:
-                    non_db_data = st.session_state['processed_data'][~st.session_state['processed_data']['id'].isin(db_ids)]
-                else:
-                    # No way to distinguish, so replace all
-                    non_db_data = pd.DataFrame()
+                # Patch the session frames by id instead of reloading the table
+                st.session_state['manual_data'] = patch_frame(
+                    st.session_state['manual_data'], apply_schema(saved, categorical=False), deleted_ids
+                )
+                # The pages now show the database (imported data cannot be matched with its rows):
+                # the session keeps the per-supplier overview, not the rows
+                st.session_state['processed_data'] = db.get_suppliers_overview()
+                st.session_state['data_source'] = 'database'
+                st.session_state['manual_data_version'] = st.session_state.get('manual_data_version', 0) + 1
                 
-                # Combine with fresh data
-                st.session_state['processed_data'] = pd.concat([non_db_data, fresh_data], ignore_index=True)
-            else:
-                st.session_state['processed_data'] = fresh_data.copy()
-            
-            st.success(f"{success_count} entrées mises à jour avec succès dans la base de données!")
-            st.rerun()
+                message = (
+                    f"{len(changed)} entrée(s) modifiée(s), {len(added)} ajoutée(s) et "
+                    f"{len(deleted_ids)} supprimée(s) dans la base de données!"
+                )
+                if ignored_count:
+                    message += f" {ignored_count} ligne(s) ignorée(s): nom, date de commande ou montant manquant."
+                st.success(message)
+                st.rerun()
         except Exception as e:
             st.error(f"Erreur lors de la mise à jour des données: {e}")
 else:
@@ -212,78 +221,54 @@ else:
 st.header("Import rapide de données")
 st.write("""
 Vous pouvez saisir plusieurs entrées à la fois en utilisant le format CSV ci-dessous.
-Format: Nom du fournisseur, Date de commande (JJ/MM/AAAA), Montant, Date de réception (JJ/MM/AAAA), Date de paiement (JJ/MM/AAAA)
+Format: Nom du fournisseur, Date de commande (JJ/MM/AAAA), Montant, Date de réception (JJ/MM/AAAA), Date de paiement (JJ/MM/AAAA), Numéro de facture
 """)
 
 csv_data = st.text_area(
     "Collez vos données au format CSV (une ligne par entrée)",
     height=150,
-    placeholder="Fournisseur A, 01/05/2025, 10000, 10/05/2025, 01/06/2025\nFournisseur B, 05/05/2025, 25000, 15/05/2025, 05/07/2025"
+    placeholder="Fournisseur A, 01/05/2025, 10000, 10/05/2025, 01/06/2025, FA-2025-001\nFournisseur B, 05/05/2025, 25000, 15/05/2025, 05/07/2025, 7841"
 )
 
 if st.button("Importer ces données"):
     if csv_data:
-        # Parse the CSV data
-        rows = csv_data.strip().split('\n')
-        new_data = []
-        errors = []
-        
-        for row in rows:
-            try:
-                parts = [part.strip() for part in row.split(',')]
-                if len(parts) >= 3:  # At minimum, we need supplier, date, and amount
-                    entry = {
-                        'Nom du fournisseur': parts[0],
-                        'Date de commande': pd.to_datetime(parts[1], format='%d/%m/%Y', errors='coerce'),
-                        'Montant de la commande': float(parts[2]),
-                        'Date de réception': pd.to_datetime(parts[3], format='%d/%m/%Y', errors='coerce') if len(parts) > 3 else None,
-                        'Date de paiement': pd.to_datetime(parts[4], format='%d/%m/%Y', errors='coerce') if len(parts) > 4 else None
-                    }
-                    new_data.append(entry)
-            except Exception as e:
-                errors.append(f"Ligne: {row}. Erreur: {e}")
+        # Parse the whole block at once; invalid lines are reported with their line number
+        new_df, errors = parse_quick_import(csv_data)
         
         if errors:
             st.error(f"Erreurs lors du traitement de {len(errors)} ligne(s):")
-            for error in errors[:5]:  # Show first 5 errors
-                st.error(error)
+            for line_number, line, reason in errors[:5]:  # Show first 5 errors
+                st.error(f"Ligne {line_number}: {line}. Erreur: {reason}")
             if len(errors) > 5:
                 st.error(f"... et {len(errors) - 5} autres erreurs.")
         
         # Add the new data to the database
-        if new_data:
+        if not new_df.empty:
             # Process the data to calculate delays and status
-            new_df = process_data(pd.DataFrame(new_data))
+            new_df = process_data(new_df)
             
-            # Add to database
-            success_count, total_count = db.add_suppliers_from_dataframe(new_df)
+            # Add to database: entries already there (same supplier and invoice number) are updated
+            inserted, updated, unchanged = db.upsert_suppliers(new_df)
             
-            if success_count > 0:
+            if inserted + updated + unchanged > 0:
                 # Get fresh data from database
-                fresh_data = db.get_suppliers_dataframe()
+                fresh_data = db.get_suppliers_dataframe(categories=False)
                 
-                # Update session states
+                # Update session states (the editor starts over on the reloaded rows)
                 st.session_state['manual_data'] = fresh_data
+                st.session_state['manual_data_version'] = st.session_state.get('manual_data_version', 0) + 1
                 
-                # Update the main processed data
-                if 'processed_data' in st.session_state:
-                    # Identify database entries vs imported data
-                    db_ids = fresh_data['id'].tolist() if 'id' in fresh_data.columns else []
-                    
-                    # Get processed data without the database entries
-                    if db_ids and 'id' in st.session_state['processed_data'].columns:
-                        non_db_data = st.session_state['processed_data'][~st.session_state['processed_data']['id'].isin(db_ids)]
-                    else:
-                        # No way to distinguish, so replace all
-                        non_db_data = pd.DataFrame()
-                    
-                    # Combine with fresh data
-                    st.session_state['processed_data'] = pd.concat([non_db_data, fresh_data], ignore_index=True)
-                else:
-                    st.session_state['processed_data'] = fresh_data.copy()
+                # The pages now show the database: the session keeps its per-supplier overview
+                st.session_state['processed_data'] = db.get_suppliers_overview()
+                st.session_state['data_source'] = 'database'
                 
-                st.success(f"{success_count}/{total_count} entrées importées avec succès dans la base de données!")
-                st.rerun()
+                st.success(
+                    f"{inserted} entrée(s) ajoutée(s), {updated} mise(s) à jour et {unchanged} inchangée(s) "
+                    f"sur {len(new_df)} dans la base de données!"
+                )
+                # Keep the errors of the invalid lines on screen
+                if not errors:
+                    st.rerun()
             else:
                 st.error("Aucune entrée n'a pu être ajoutée à la base de données.")
     else:
@@ -319,8 +304,10 @@ with col2:
         if confirm:
             # Delete all data from the database
             if db.delete_all_suppliers():
-                # Remove manual data from processed_data
-                if 'processed_data' in st.session_state and not st.session_state['manual_data'].empty:
+                # Remove manual data from processed_data (the overview of a database session is now empty)
+                if st.session_state.get('data_source') == 'database':
+                    st.session_state['processed_data'] = db.get_suppliers_overview()
+                elif 'processed_data' in st.session_state and not st.session_state['manual_data'].empty:
                     manual_suppliers = st.session_state['manual_data']['Nom du fournisseur'].tolist()
                     manual_dates = st.session_state['manual_data']['Date de commande'].tolist()
                     
@@ -334,11 +321,13 @@ with col2:
                 
                 # Clear manual data
                 st.session_state['manual_data'] = pd.DataFrame({
+                    'id': [],
                     'Nom du fournisseur': [],
                     'Date de commande': [],
                     'Montant de la commande': [],
                     'Date de réception': [],
-                    'Date de paiement': []
+                    'Date de paiement': [],
+                    'Numéro de facture': []
                 })
                 
                 st.success("Les données ont été supprimées avec succès de la base de données.")
@@ -0,0 +1,153 @@
+"""
+Paginated display of the detailed data tables
+
+st.dataframe sends every row it is given to the browser, and a Styler adds the
+CSS of every cell on top. paginated_table keeps the frame on the server: the
+search, the sort and the page slicing run in pandas (row_order is memoized on
+the frame fingerprint, so paging does not sort again) and only the visible rows
+are styled and sent. "Charger plus" appends the next page below the visible
+rows, up to TABLE_MAX_ROWS rows.
+
+TABLE_PAGE_SIZE is the default number of rows per page; each table lets the
+user pick another one among PAGE_SIZES.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import analytics
+
+TABLE_PAGE_SIZE = int(os.environ.get("TABLE_PAGE_SIZE", "100"))
+TABLE_MAX_ROWS = int(os.environ.get("TABLE_MAX_ROWS", "5000"))
+PAGE_SIZES = sorted({25, 50, 100, 250, 500, 1000, TABLE_PAGE_SIZE})
+
+ORDER_DESCENDING = "Décroissant"
+ORDER_ASCENDING = "Croissant"
+
+
+def _text_columns(df, columns):
+    return [
+        column for column in columns
+        if isinstance(df[column].dtype, pd.CategoricalDtype) or pd.api.types.is_object_dtype(df[column].dtype)
+    ]
+
+
+def search_mask(df, text, columns=None):
+    """Rows where one of the text columns contains text (case-insensitive)"""
+    mask = np.zeros(len(df), dtype=bool)
+    for column in _text_columns(df, df.columns if columns is None else columns):
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # One test per category instead of one per row; code -1 (missing) picks the trailing False
+            matches = series.cat.categories.astype(str).str.contains(text, case=False, regex=False)
+            mask |= np.append(np.asarray(matches, dtype=bool), False)[series.cat.codes.to_numpy()]
+        else:
+            mask |= series.str.contains(text, case=False, regex=False, na=False).to_numpy(dtype=bool)
+    return mask
+
+
+@analytics.cached_aggregate
+def row_order(df, sort_by=None, ascending=True, search='', columns=None):
+    """
+    Positions of the rows of df matching search, in the order of sort_by
+    Ties keep the frame order and missing values come last, as in sort_values
+    """
+    positions = np.arange(len(df))
+    if search:
+        positions = positions[search_mask(df, search, columns)]
+    if sort_by is not None:
+        values = df[sort_by].iloc[positions].reset_index(drop=True)
+        order = values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+        positions = positions[order]
+    # Shared between sessions by the cache
+    positions.flags.writeable = False
+    return positions
+
+
+def page_rows(df, positions, start, stop, columns=None):
+    """Rows positions[start:stop] of df, restricted to columns"""
+    rows = df.iloc[positions[start:stop]]
+    return rows if columns is None else rows[list(columns)]
+
+
+def _first_page(key):
+    st.session_state[f"{key}_page"] = 1
+    st.session_state[f"{key}_loaded"] = 1
+
+
+def _page_changed(key):
+    st.session_state[f"{key}_loaded"] = 1
+
+
+def _load_more(key):
+    st.session_state[f"{key}_loaded"] = st.session_state.get(f"{key}_loaded", 1) + 1
+
+
+def paginated_table(df, key, columns=None, sort_by=None, ascending=False, style=None, data_fingerprint=None):
+    """
+    Display df one page at a time, with a search box, a sort column and "Charger plus"
+
+    key identifies the table in st.session_state. style(styler) -> styler adds
+    the conditional formatting (Styler.map, .format, ...) and only ever
+    receives the visible rows. data_fingerprint is analytics.fingerprint(df)
+    when the page already computed it.
+    """
+    columns = list(df.columns) if columns is None else list(columns)
+
+    controls = st.columns([3, 2, 1, 1])
+    search = controls[0].text_input(
+        "Rechercher", key=f"{key}_search", on_change=_first_page, args=(key,),
+        placeholder="Fournisseur, statut..."
+    )
+    sort_options = [None] + columns
+    sort_column = controls[1].selectbox(
+        "Trier par", sort_options, index=sort_options.index(sort_by), key=f"{key}_sort",
+        format_func=lambda column: "Ordre d'origine" if column is None else column,
+        on_change=_first_page, args=(key,)
+    )
+    order = controls[2].selectbox(
+        "Ordre", [ORDER_DESCENDING, ORDER_ASCENDING], index=int(ascending), key=f"{key}_order",
+        on_change=_first_page, args=(key,)
+    )
+    page_size = controls[3].selectbox(
+        "Lignes par page", PAGE_SIZES, index=PAGE_SIZES.index(TABLE_PAGE_SIZE), key=f"{key}_size",
+        on_change=_first_page, args=(key,)
+    )
+
+    positions = row_order(
+        df, sort_column, order == ORDER_ASCENDING, search.strip(), tuple(columns), data_fingerprint=data_fingerprint
+    )
+    total = len(positions)
+    pages = max(1, -(-total // page_size))
+
+    # The number of pages shrinks when the search or the filters of the page narrow the rows
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        _first_page(key)
+    page = st.session_state.get(f"{key}_page", 1)
+    loaded = st.session_state.get(f"{key}_loaded", 1)
+    start = (page - 1) * page_size
+    stop = min(total, start + min(loaded * page_size, TABLE_MAX_ROWS))
+
+    visible = page_rows(df, positions, start, stop, columns)
+    st.dataframe(style(visible.style) if style is not None else visible, use_container_width=True)
+
+    footer = st.columns([4, 1, 1])
+    if total:
+        footer[0].caption(f"Lignes {start + 1:,} à {stop:,} sur {total:,}")
+    else:
+        footer[0].caption("Aucune ligne ne correspond à la recherche")
+    footer[1].number_input(
+        "Page", min_value=1, max_value=pages, step=1, key=f"{key}_page",
+        on_change=_page_changed, args=(key,), label_visibility="collapsed"
+    )
+    limit_reached = stop - start >= TABLE_MAX_ROWS
+    footer[2].button(
+        "Charger plus", key=f"{key}_more", on_click=_load_more, args=(key,),
+        disabled=stop >= total or limit_reached, use_container_width=True
+    )
+    if limit_reached and stop < total:
+        st.caption(
+            f"Affichage limité à {TABLE_MAX_ROWS:,} lignes : affinez la recherche ou téléchargez les données."
+        )
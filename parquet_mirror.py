@@ -0,0 +1,283 @@
+"""
+Parquet mirror of the suppliers table, partitioned by order month
+
+sync_mirror() copies the suppliers table of database.py to MIRROR_DIR as a
+hive-partitioned dataset, one file per order month (mois=YYYY-MM/part-0.parquet),
+with the table's column names. The manifest (_manifest.json) records the month
+versions of the table at the last sync (database.get_month_versions) and, for
+each partition, its row count and the min/max of its main columns. A sync only
+rewrites the months whose version changed since the last sync.
+
+read_suppliers() answers the filtered page queries from the mirror: the
+manifest statistics skip the partitions outside the requested date range, only
+the requested columns are read, memory-mapped by pyarrow, and the supplier and
+status filters are pushed down to the Parquet reader. The mirror is opt-in:
+query_suppliers() only uses it once a first sync has created it, and syncs it
+first whenever a write made it stale.
+
+Usage: python parquet_mirror.py [--full] [--directory DIR]
+"""
+import json
+import os
+import shutil
+import threading
+import time
+
+import pandas as pd
+
+import database as db
+from schema import apply_schema
+
+MIRROR_DIR = os.environ.get("PARQUET_MIRROR_DIR", "data/parquet_mirror")
+MANIFEST_NAME = "_manifest.json"
+PARTITION_FILE = "part-0.parquet"
+
+# Columns whose min/max are kept per partition in the manifest
+STATS_COLUMNS = ['id', 'date_commande', 'montant_commande', 'date_paiement', 'delai_paiement']
+
+# Column labels of the processed frame -> Parquet columns (the suppliers table columns)
+FIELDS = {'id': 'id', **db.COLUMN_MAPPING}
+LABELS = {field: label for label, field in FIELDS.items()}
+
+# Syncs of this process run one at a time
+_sync_lock = threading.Lock()
+
+
+def _schema():
+    """Arrow schema of the partitions (the types of the suppliers table), identical in every file"""
+    import pyarrow as pa
+
+    return pa.schema([
+        ('id', pa.int64()),
+        ('nom_fournisseur', pa.string()),
+        ('date_commande', pa.date32()),
+        ('montant_commande', pa.float64()),
+        ('date_reception', pa.date32()),
+        ('date_paiement', pa.date32()),
+        ('delai_paiement', pa.int32()),
+        ('jours_retard', pa.int32()),
+        ('statut_paiement', pa.string()),
+        ('montant_penalite', pa.float64()),
+        ('numero_facture', pa.string())
+    ])
+
+
+def _partition_dir(directory, month):
+    return os.path.join(directory, f"mois={month}")
+
+
+def load_manifest(directory=MIRROR_DIR):
+    """Manifest of the mirror, or None when there is no mirror"""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(directory, manifest):
+    """Replace the manifest atomically: readers see the old or the new one, never a partial file"""
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _month_bounds(month):
+    start = pd.Timestamp(f"{month}-01")
+    return start, start + pd.offsets.MonthEnd(0)
+
+
+def _month_table(month):
+    """
+    Rows of one order month as an Arrow table with the suppliers table columns
+    and types, or None when the month has no invoices. Database errors are
+    raised: they abort the sync instead of passing for an empty month
+    """
+    import pyarrow as pa
+
+    start, end = _month_bounds(month)
+    frame = db.read_order_period(start, end, categories=False)
+    if frame.empty:
+        return None
+    frame = frame.rename(columns=FIELDS)
+    schema = _schema()
+    # Dates as date32 and day counts as nullable int32, whatever dtypes apply_schema chose for this month
+    return pa.Table.from_arrays(
+        [pa.array(frame[field.name], from_pandas=True).cast(field.type) for field in schema],
+        schema=schema
+    )
+
+
+def _statistics(table):
+    """Min/max of STATS_COLUMNS in a partition, as JSON values (ISO dates)"""
+    import pyarrow.compute as pc
+
+    stats = {}
+    for column in STATS_COLUMNS:
+        bounds = pc.min_max(table[column]).as_py()
+        stats[column] = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in (bounds['min'], bounds['max'])
+        ]
+    return stats
+
+
+def sync_mirror(directory=MIRROR_DIR, full=False):
+    """
+    Bring the mirror up to date with the suppliers table: months whose version
+    changed are rewritten, months without invoices are removed
+    full=True rewrites every month. Returns the number of months rewritten or removed
+    """
+    with _sync_lock:
+        return _sync(directory, full)
+
+
+def _sync(directory, full):
+    import pyarrow.parquet as pq
+
+    os.makedirs(directory, exist_ok=True)
+    # Versions are read first: a write during the sync leaves the mirror stale, never wrong
+    versions = db.get_month_versions()
+    if versions is None:
+        raise RuntimeError("versions des mois indisponibles")
+    manifest = load_manifest(directory) if not full else None
+    partitions = dict(manifest['partitions']) if manifest else {}
+    synced_versions = manifest['versions'] if manifest else {}
+
+    changed = sorted(
+        month for month in set(versions) | set(synced_versions) | set(partitions)
+        if synced_versions.get(month) != versions.get(month) or (month in partitions) != (month in versions)
+    )
+    # A failed read raises before its partition is touched and before the manifest is written:
+    # the months left stale are synced again next time
+    for month in changed:
+        path = _partition_dir(directory, month)
+        table = _month_table(month) if month in versions else None
+        if table is None:
+            shutil.rmtree(path, ignore_errors=True)
+            partitions.pop(month, None)
+            continue
+        os.makedirs(path, exist_ok=True)
+        pq.write_table(table, os.path.join(path, PARTITION_FILE + ".tmp"))
+        os.replace(os.path.join(path, PARTITION_FILE + ".tmp"), os.path.join(path, PARTITION_FILE))
+        partitions[month] = {'rows': table.num_rows, 'stats': _statistics(table)}
+
+    _write_manifest(directory, {'synced_at': time.time(), 'versions': versions, 'partitions': partitions})
+    return len(changed)
+
+
+def is_current(directory=MIRROR_DIR, manifest=None):
+    """True when the mirror exists and every month version matches the database"""
+    manifest = manifest if manifest is not None else load_manifest(directory)
+    if manifest is None:
+        return False
+    return manifest['versions'] == db.get_month_versions()
+
+
+def prune_partitions(manifest, date_from=None, date_to=None):
+    """Months of the manifest whose order dates overlap [date_from, date_to]"""
+    low = pd.Timestamp(date_from).strftime('%Y-%m-%d') if date_from is not None else None
+    high = pd.Timestamp(date_to).strftime('%Y-%m-%d') if date_to is not None else None
+    months = []
+    for month, partition in sorted(manifest['partitions'].items()):
+        first, last = partition['stats']['date_commande']
+        if (high is not None and first > high) or (low is not None and last < low):
+            continue
+        months.append(month)
+    return months
+
+
+def read_suppliers(supplier=None, date_from=None, date_to=None, status=None, delay_min=None,
+                   delay_max=None, columns=None, categories=True, directory=MIRROR_DIR, manifest=None):
+    """
+    database.query_suppliers answered from the mirror: same filters, same
+    columns (the id is always included) and the same frame, in id order
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    manifest = manifest if manifest is not None else load_manifest(directory)
+    labels = list(db.COLUMN_MAPPING) if columns is None else [c for c in columns if c != 'id']
+    fields = ['id'] + [FIELDS[label] for label in labels]
+
+    filters = []
+    for field, value in (('nom_fournisseur', supplier), ('statut_paiement', status)):
+        if value is not None:
+            filters.append((field, 'in', [value] if isinstance(value, str) else list(value)))
+    if date_from is not None:
+        filters.append(('date_commande', '>=', pd.Timestamp(date_from).date()))
+    if date_to is not None:
+        filters.append(('date_commande', '<=', pd.Timestamp(date_to).date()))
+    if delay_min is not None:
+        filters.append(('delai_paiement', '>=', int(delay_min)))
+    if delay_max is not None:
+        filters.append(('delai_paiement', '<=', int(delay_max)))
+
+    tables = [
+        pq.read_table(
+            os.path.join(_partition_dir(directory, month), PARTITION_FILE),
+            columns=fields,
+            filters=filters or None,
+            memory_map=True
+        )
+        for month in prune_partitions(manifest, date_from, date_to)
+    ]
+    if not tables:
+        return pd.DataFrame(columns=['id'] + labels)
+
+    table = pa.concat_tables(tables).sort_by('id')
+    frame = table.to_pandas(date_as_object=False).rename(columns=LABELS)
+    for label in ['Date de commande', 'Date de réception', 'Date de paiement']:
+        if label in frame.columns:
+            frame[label] = frame[label].astype('datetime64[ns]')
+    return apply_schema(frame, categorical=categories)
+
+
+def sync_if_enabled(directory=MIRROR_DIR):
+    """Sync the mirror if there is one (e.g. after an import); errors are printed, not raised"""
+    if load_manifest(directory) is None:
+        return
+    try:
+        sync_mirror(directory)
+    except Exception as e:
+        print(f"Erreur lors de la synchronisation du miroir Parquet: {e}")
+
+
+def query_suppliers(**filters):
+    """
+    database.query_suppliers answered from the mirror when there is one
+    A stale mirror is synced first (only the changed months are rewritten);
+    without a mirror, or when the sync fails, the query runs in SQLite
+    """
+    manifest = load_manifest()
+    if manifest is None:
+        return db.query_suppliers(**filters)
+    if not is_current(manifest=manifest):
+        try:
+            sync_mirror()
+            manifest = load_manifest()
+        except Exception as e:
+            print(f"Erreur lors de la synchronisation du miroir Parquet: {e}")
+            return db.query_suppliers(**filters)
+    return read_suppliers(manifest=manifest, **filters)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Synchronise le miroir Parquet de la table suppliers")
+    parser.add_argument("--full", action="store_true", help="réécrire tous les mois")
+    parser.add_argument("--directory", default=MIRROR_DIR)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    months = sync_mirror(args.directory, full=args.full)
+    manifest = load_manifest(args.directory)
+    rows = sum(partition['rows'] for partition in manifest['partitions'].values())
+    print(f"{months} mois synchronisé(s) en {time.perf_counter() - start:.1f} s : "
+          f"{len(manifest['partitions'])} partitions, {rows:,} factures dans {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
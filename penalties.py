@@ -0,0 +1,153 @@
+"""
+Late payment penalty engine (Loi 69-21) with per-supplier terms and a dated rate schedule
+
+Every invoice falls due a number of days after its start reference (order or
+receipt date): the negotiated terms of its supplier, or the standard delay.
+A paid invoice accrues interest from its due date to its payment date, at the
+yearly rate in force on each day. The rate integral F(t) (rate × days) is
+piecewise linear between the effective dates of the schedule and its value at
+each breakpoint is computed once, so an invoice only needs the rate period of
+its due date and of its payment date (np.searchsorted over the breakpoints):
+penalty = amount × (F(payment) - F(due)) / 365. Everything is vectorized over
+the invoices; supplier terms are looked up once per supplier category.
+"""
+import numpy as np
+import pandas as pd
+
+REFERENCE_ORDER = 'commande'
+REFERENCE_RECEIPT = 'réception'
+START_REFERENCES = [REFERENCE_ORDER, REFERENCE_RECEIPT]
+
+# Terms table: negotiated delay (days) and start reference of each supplier
+TERMS_COLUMNS = ['Nom du fournisseur', 'Délai contractuel', 'Point de départ']
+# Rate schedule: yearly rate (0.03 = 3%) in force from each effective date
+SCHEDULE_COLUMNS = ["Date d'effet", 'Taux annuel']
+
+DAY_COUNT = 365
+
+
+def rate_schedule(rates):
+    """
+    Normalize a rate schedule to a DataFrame of SCHEDULE_COLUMNS sorted by date
+    rates: a single yearly rate, a DataFrame of SCHEDULE_COLUMNS or
+    (effective date, rate) pairs. Incomplete rows are dropped and the last rate
+    given for a date wins; the first rate also applies before its effective date
+    """
+    if np.isscalar(rates):
+        rates = [(pd.Timestamp('1970-01-01'), rates)]
+    schedule = pd.DataFrame(rates, columns=SCHEDULE_COLUMNS) if not isinstance(rates, pd.DataFrame) else rates
+    schedule = pd.DataFrame({
+        SCHEDULE_COLUMNS[0]: pd.to_datetime(schedule[SCHEDULE_COLUMNS[0]], errors='coerce').dt.normalize(),
+        SCHEDULE_COLUMNS[1]: pd.to_numeric(schedule[SCHEDULE_COLUMNS[1]], errors='coerce').astype(np.float64)
+    }).dropna()
+    if schedule.empty:
+        raise ValueError("The rate schedule has no complete (date, rate) row")
+    return (
+        schedule.drop_duplicates(SCHEDULE_COLUMNS[0], keep='last')
+        .sort_values(SCHEDULE_COLUMNS[0])
+        .reset_index(drop=True)
+    )
+
+
+def _breakpoints(schedule):
+    """Day numbers, rates and rate integral at each breakpoint of a schedule"""
+    schedule = rate_schedule(schedule)
+    days = schedule[SCHEDULE_COLUMNS[0]].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    rates = schedule[SCHEDULE_COLUMNS[1]].to_numpy()
+    cumulative = np.concatenate([[0.0], np.cumsum(rates[:-1] * np.diff(days))])
+    return days, rates, cumulative
+
+
+def accrued_rate_days(start, end, schedule):
+    """
+    Integral of the yearly rate over each [start, end) interval of day numbers
+    (int64 arrays, end >= start), split across the rate periods of the schedule
+    """
+    days, rates, cumulative = _breakpoints(schedule)
+    start_period = np.maximum(np.searchsorted(days, start, side='right') - 1, 0)
+    end_period = np.maximum(np.searchsorted(days, end, side='right') - 1, 0)
+
+    # Within one period: a single rate over the interval, without going through
+    # the (large) integral values
+    single_rate = rates[start_period] * (end - start)
+    at_end = cumulative[end_period] + rates[end_period] * (end - days[end_period])
+    at_start = cumulative[start_period] + rates[start_period] * (start - days[start_period])
+    return np.where(start_period == end_period, single_rate, at_end - at_start)
+
+
+def _day_numbers(values):
+    """Dates as int64 day numbers (days since 1970-01-01) and their missing mask"""
+    dates = pd.to_datetime(pd.Series(values), errors='coerce').to_numpy(dtype='datetime64[D]')
+    missing = np.isnat(dates)
+    return np.where(missing, 0, dates.astype(np.int64)), missing
+
+
+def _supplier_positions(names, supplier_names):
+    """Row of each invoice supplier in the terms table (-1 without terms)"""
+    index = pd.Index(supplier_names.astype(str))
+    if isinstance(names.dtype, pd.CategoricalDtype):
+        codes = names.cat.codes.to_numpy()
+        positions = index.get_indexer(names.cat.categories.astype(str))
+        return np.where(codes >= 0, positions[codes], -1)
+    return np.where(names.notna().to_numpy(), index.get_indexer(names.astype(str)), -1)
+
+
+def normalize_terms(terms, standard_delay, reference=REFERENCE_ORDER):
+    """
+    Terms table with one row per supplier (the last one wins), missing delays and
+    references filled with the defaults
+    """
+    terms = terms.dropna(subset=[TERMS_COLUMNS[0]]).drop_duplicates(TERMS_COLUMNS[0], keep='last')
+    references = terms[TERMS_COLUMNS[2]].fillna(reference).astype(str)
+    unknown = sorted(set(references) - set(START_REFERENCES))
+    if unknown:
+        raise ValueError(f"Unknown start reference(s) {unknown}: expected one of {START_REFERENCES}")
+    return pd.DataFrame({
+        TERMS_COLUMNS[0]: terms[TERMS_COLUMNS[0]].astype(str),
+        TERMS_COLUMNS[1]: pd.to_numeric(terms[TERMS_COLUMNS[1]], errors='coerce').fillna(standard_delay).astype(np.int64),
+        TERMS_COLUMNS[2]: references
+    }).reset_index(drop=True)
+
+
+def due_days(df, terms=None, standard_delay=60, reference=REFERENCE_ORDER):
+    """
+    Due date of each invoice as a day number (and its missing mask)
+    Suppliers without terms fall due standard_delay days after the reference
+    date; a missing receipt date falls back to the order date
+    """
+    delays = np.full(len(df), standard_delay, dtype=np.int64)
+    from_receipt = np.full(len(df), reference == REFERENCE_RECEIPT)
+    if terms is not None and not terms.empty:
+        terms = normalize_terms(terms, standard_delay, reference)
+        positions = _supplier_positions(df['Nom du fournisseur'], terms[TERMS_COLUMNS[0]])
+        known = positions >= 0
+        delays[known] = terms[TERMS_COLUMNS[1]].to_numpy()[positions[known]]
+        from_receipt[known] = (terms[TERMS_COLUMNS[2]] == REFERENCE_RECEIPT).to_numpy()[positions[known]]
+
+    start, missing = _day_numbers(df['Date de commande'])
+    if from_receipt.any() and 'Date de réception' in df.columns:
+        receipt, receipt_missing = _day_numbers(df['Date de réception'])
+        use_receipt = from_receipt & ~receipt_missing
+        start = np.where(use_receipt, receipt, start)
+        missing = np.where(use_receipt, False, missing)
+    return start + delays, missing
+
+
+def accrue_penalties(df, terms=None, schedule=0.03, standard_delay=60, reference=REFERENCE_ORDER,
+                     day_count=DAY_COUNT):
+    """
+    Days late (int32) and penalty amount (float64) of every invoice of df
+    terms: optional DataFrame of TERMS_COLUMNS, schedule: a rate or a rate
+    schedule (see rate_schedule). Unpaid invoices accrue nothing: the penalty
+    is due with the payment
+    """
+    due, due_missing = due_days(df, terms, standard_delay, reference)
+    payment, payment_missing = _day_numbers(df['Date de paiement'])
+    late = np.where(due_missing | payment_missing, 0, np.maximum(payment - due, 0))
+
+    accrued = np.zeros(len(df))
+    paid_late = late > 0
+    accrued[paid_late] = accrued_rate_days(due[paid_late], payment[paid_late], schedule)
+
+    amounts = pd.to_numeric(df['Montant de la commande'], errors='coerce').to_numpy(dtype=np.float64)
+    return late.astype(np.int32), amounts * accrued / day_count
@@ -0,0 +1,104 @@
+"""
+Excel audit report of the audit summary page
+
+The workbook is written with xlsxwriter in constant_memory mode: rows are
+streamed to a per-workbook temporary file as they are written and the final
+.xlsx goes to an in-memory buffer, so nothing is written to the working
+directory and concurrent sessions never share a file. Reports are memoized in
+the analytics cache on the filtered frame and the summary values, so a report
+is only built once per set of filters.
+"""
+import io
+
+import pandas as pd
+import xlsxwriter
+
+import analytics
+from schema import STATUS_LATE
+
+NON_COMPLIANT_COLUMNS = [
+    'Nom du fournisseur',
+    'Date de commande',
+    'Date de paiement',
+    'Montant de la commande',
+    'Délai de paiement',
+    'Jours de retard',
+    'Montant pénalité'
+]
+
+# Rows converted to Python values at a time while streaming a sheet
+WRITE_CHUNK_ROWS = 10_000
+
+
+def _cell_values(df):
+    """Columns of df as object arrays of Excel-ready values (None for missing cells)"""
+    columns = []
+    for col in df.columns:
+        values = df[col].to_numpy(dtype=object, copy=True)
+        values[pd.isna(df[col]).to_numpy()] = None
+        columns.append(values)
+    return columns
+
+
+def write_sheet(workbook, name, df, header_format=None):
+    """
+    Write df to a new worksheet, header first and then strictly row by row
+    (constant_memory only keeps the current row: cells must never go back up)
+    """
+    worksheet = workbook.add_worksheet(name)
+    worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+
+    for start in range(0, len(df), WRITE_CHUNK_ROWS):
+        # Dates are Timestamps (datetime subclasses): written with the default date format
+        for offset, row in enumerate(zip(*_cell_values(df.iloc[start:start + WRITE_CHUNK_ROWS]))):
+            worksheet.write_row(start + offset + 1, 0, row)
+    return worksheet
+
+
+def build_workbook(sheets):
+    """Stream the (name, DataFrame) sheets into an .xlsx workbook and return its bytes"""
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'default_date_format': 'dd/mm/yyyy'})
+    header_format = workbook.add_format({'bold': True, 'border': 1})
+    for name, df in sheets:
+        write_sheet(workbook, name, df, header_format)
+    workbook.close()
+    return output.getvalue()
+
+
+def summary_rows(audit_summary):
+    """(indicator, display value) pairs of the summary sheet, from analytics.audit_summary"""
+    rows = dict(audit_summary)
+    rows["Taux de conformité"] = f"{rows['Taux de conformité']:.1f}%"
+    rows["Total des pénalités"] = f"{rows['Total des pénalités']:.2f} €"
+    return tuple(rows.items())
+
+
+def audit_tables(filtered_data, summary, data_fingerprint=None):
+    """
+    The (sheet name, DataFrame) tables of the audit report, in report order
+    The non-compliant invoices sheet is left out when there are none
+    data_fingerprint: analytics.fingerprint(filtered_data), if already computed
+    """
+    non_compliant = filtered_data[filtered_data['Statut du paiement'] == STATUS_LATE].sort_values(
+        'Délai de paiement', ascending=False
+    )
+
+    tables = [('Résumé', pd.DataFrame(list(summary), columns=['Indicateur', 'Valeur']))]
+    if not non_compliant.empty:
+        tables.append(('Factures non conformes', non_compliant[NON_COMPLIANT_COLUMNS]))
+    tables.append((
+        'Évolution mensuelle',
+        analytics.monthly_summary(filtered_data, 'Date de commande', data_fingerprint)[['Mois', 'Taux de conformité']]
+    ))
+    tables.append(('Risque fournisseurs', analytics.supplier_risk(filtered_data, data_fingerprint=data_fingerprint)))
+    return tables
+
+
+@analytics.cached_aggregate
+def audit_report(filtered_data, summary):
+    """
+    Audit report workbook of the filtered invoices (bytes)
+    summary: tuple of (indicator, value) pairs for the summary sheet (see summary_rows)
+    """
+    return build_workbook(audit_tables(filtered_data, summary))
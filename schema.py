@@ -0,0 +1,115 @@
+"""
+Canonical in-memory schema for the processed supplier frame
+
+The processed frame is kept in st.session_state for the whole session and
+copied by every page, so its dtypes drive the memory use of each session:
+- supplier names and payment statuses are categoricals
+- day counts are int16/int32 when they have no missing values, float32 otherwise
+- amounts stay float64: pandas accumulates float32 sums in float32, so totals
+  over a million invoices would drift by hundreds of euros
+"""
+import numpy as np
+import pandas as pd
+
+# Payment statuses, in the order of the categorical codes
+STATUS_ON_TIME = 'Dans les délais'
+STATUS_LATE = 'En retard'
+STATUS_UNPAID = 'Non payé'
+PAYMENT_STATUSES = [STATUS_ON_TIME, STATUS_LATE, STATUS_UNPAID]
+
+CATEGORY_COLUMNS = ['Nom du fournisseur', 'Statut du paiement']
+DAY_COLUMNS = ['Délai de paiement', 'Jours de retard']
+AMOUNT_COLUMNS = ['Montant de la commande', 'Montant pénalité']
+
+# Identifiers read as text from uploaded files: a number-like invoice number keeps its leading zeros
+TEXT_COLUMNS = ['Numéro de facture']
+READ_DTYPES = {col: str for col in TEXT_COLUMNS}
+
+
+def _compact_integer(series):
+    """
+    Downcast a count (days, ids) to the smallest integer type that holds it,
+    or to float32 when it has missing or fractional values
+    """
+    values = pd.to_numeric(series, errors='coerce')
+    array = values.to_numpy(dtype=np.float64)
+    finite = array[~np.isnan(array)]
+    if len(finite) < len(array) or not np.array_equal(finite, np.round(finite)):
+        return values.astype(np.float32)
+    if len(finite) == 0 or (finite.min() >= np.iinfo(np.int16).min and finite.max() <= np.iinfo(np.int16).max):
+        return values.astype(np.int16)
+    if finite.min() >= np.iinfo(np.int32).min and finite.max() <= np.iinfo(np.int32).max:
+        return values.astype(np.int32)
+    return values.astype(np.int64)
+
+
+def _status_categorical(series):
+    """Payment statuses as a categorical, keeping the canonical order first"""
+    extra = sorted(set(series.dropna().astype(str)) - set(PAYMENT_STATUSES))
+    return series.astype(pd.CategoricalDtype(PAYMENT_STATUSES + extra))
+
+
+def apply_schema(df, categorical=True):
+    """
+    Cast a supplier frame to the canonical compact dtypes
+    Columns that are missing are ignored; set categorical=False to keep
+    text columns as plain strings (e.g. for st.data_editor)
+    """
+    if df.empty:
+        return df
+
+    columns = {}
+    if categorical:
+        if 'Nom du fournisseur' in df.columns:
+            columns['Nom du fournisseur'] = df['Nom du fournisseur'].astype('category')
+        if 'Statut du paiement' in df.columns:
+            columns['Statut du paiement'] = _status_categorical(df['Statut du paiement'])
+    else:
+        for col in CATEGORY_COLUMNS:
+            if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype):
+                columns[col] = df[col].astype(object)
+
+    for col in DAY_COLUMNS:
+        if col in df.columns:
+            columns[col] = _compact_integer(df[col])
+
+    for col in AMOUNT_COLUMNS:
+        if col in df.columns:
+            columns[col] = pd.to_numeric(df[col], errors='coerce').astype(np.float64)
+
+    if 'id' in df.columns and not df['id'].isna().any():
+        columns['id'] = _compact_integer(df['id'])
+
+    return df.assign(**columns)
+
+
+def expand_schema(df):
+    """
+    Inverse of apply_schema: the default pandas dtypes (object text, int64/float64)
+    Used to measure what the frame would cost without the compact schema
+    """
+    columns = {}
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            columns[col] = df[col].astype(object)
+        elif pd.api.types.is_integer_dtype(dtype):
+            columns[col] = df[col].astype(np.int64)
+        elif pd.api.types.is_float_dtype(dtype):
+            columns[col] = df[col].astype(np.float64)
+    return df.assign(**columns)
+
+
+def memory_mb(df):
+    """Deep memory footprint of a frame, in MB"""
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def memory_report(df):
+    """Memory of a frame with default dtypes ('before') and with the compact schema ('after'), in MB"""
+    return {'before': memory_mb(expand_schema(df)), 'after': memory_mb(df)}
+
+
+def session_memory_mb(session_state):
+    """Total memory held by the DataFrames stored in a session state, in MB"""
+    return sum(memory_mb(value) for value in session_state.values() if isinstance(value, pd.DataFrame))
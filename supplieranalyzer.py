@@ -0,0 +1,190 @@
+"""
+Headless batch audit of supplier ledgers (Loi 69-21), without Streamlit
+
+Each input is a ledger exported like the uploads of the app (.csv, .xlsx,
+.xls) or a SQLite snapshot of the suppliers table (.db, .sqlite). Every input
+goes through process_data and calculate_penalties, then the audit summary,
+non-compliant invoices, monthly compliance, supplier risk matrix and supplier
+risk scores are written as an Excel workbook, CSV files and/or a JSON
+document. Several inputs are audited in parallel in a process pool.
+
+Only the calculation modules are imported (no streamlit, no plotly), so the
+command starts in well under a second.
+
+Penalties use the standard delay and interest rate, or negotiated terms per
+supplier and a dated rate schedule given as CSV files (see penalties.py).
+
+Usage: python supplieranalyzer.py LEDGER [LEDGER ...] [--output-dir DIR]
+       [--format xlsx csv json] [--workers N] [--standard-delay DAYS] [--interest-rate RATE]
+       [--terms TERMS.csv] [--rate-schedule RATES.csv]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import analytics
+import reports
+from penalties import TERMS_COLUMNS, SCHEDULE_COLUMNS, rate_schedule
+from schema import READ_DTYPES
+from utils import process_data, calculate_penalties, STANDARD_PAYMENT_DELAY, PENALTY_INTEREST_RATE
+
+LEDGER_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+SNAPSHOT_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+OUTPUT_FORMATS = ('xlsx', 'csv', 'json')
+
+# File name suffix of each report table in the CSV output
+TABLE_SLUGS = {
+    'Résumé': 'resume',
+    'Factures non conformes': 'factures_non_conformes',
+    'Évolution mensuelle': 'evolution_mensuelle',
+    'Risque fournisseurs': 'risque_fournisseurs',
+    'Tableau fournisseurs': 'tableau_fournisseurs'
+}
+
+
+def load_ledger(path):
+    """Raw supplier frame of a ledger file or of the suppliers table of a SQLite snapshot"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return pd.read_csv(path, dtype=READ_DTYPES)
+    if extension in ('.xlsx', '.xls'):
+        return pd.read_excel(path, dtype=READ_DTYPES)
+    if extension in SNAPSHOT_EXTENSIONS:
+        # Imported on demand: only snapshots need the database layer
+        import database
+        return database.read_suppliers_snapshot(path).drop(columns='id')
+    raise ValueError(f"Unsupported input {path!r}: expected {', '.join(LEDGER_EXTENSIONS + SNAPSHOT_EXTENSIONS)}")
+
+
+def audit_frame(df, standard_delay=STANDARD_PAYMENT_DELAY, interest_rate=PENALTY_INTEREST_RATE, terms=None):
+    """
+    Audit of a raw supplier frame: (summary dict, [(table name, DataFrame), ...])
+    The tables are those of the audit page report plus the supplier dashboard scores
+    interest_rate may be a rate schedule and terms a table of negotiated terms
+    """
+    processed = calculate_penalties(process_data(df, standard_delay), standard_delay, interest_rate, terms)
+    data_fingerprint = analytics.fingerprint(processed)
+    summary = analytics.audit_summary(processed, data_fingerprint=data_fingerprint)
+    tables = reports.audit_tables(processed, reports.summary_rows(summary), data_fingerprint)
+    tables.append((
+        'Tableau fournisseurs',
+        analytics.supplier_risk_scores(analytics.supplier_kpis(processed, data_fingerprint=data_fingerprint), standard_delay)
+    ))
+    return summary, tables
+
+
+def _json_value(value):
+    """JSON fallback for numpy scalars and timestamps"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def write_reports(name, summary, tables, output_dir, formats):
+    """Write the audit of one input in each format; returns the written paths"""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+
+    if 'xlsx' in formats:
+        path = os.path.join(output_dir, f"{name}_audit.xlsx")
+        with open(path, 'wb') as f:
+            f.write(reports.build_workbook(tables))
+        paths.append(path)
+
+    if 'csv' in formats:
+        for table_name, table in tables:
+            path = os.path.join(output_dir, f"{name}_{TABLE_SLUGS.get(table_name, table_name)}.csv")
+            table.to_csv(path, index=False)
+            paths.append(path)
+
+    if 'json' in formats:
+        path = os.path.join(output_dir, f"{name}_audit.json")
+        document = {
+            'source': name,
+            'summary': summary,
+            'tables': {
+                table_name: json.loads(table.to_json(orient='records', date_format='iso', force_ascii=False))
+                for table_name, table in tables
+            }
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, ensure_ascii=False, indent=2, default=_json_value)
+        paths.append(path)
+    return paths
+
+
+def audit_file(path, output_dir, formats, standard_delay, interest_rate, terms=None):
+    """
+    Load, audit and write the reports of one input (runs in a pool worker)
+    Errors are returned rather than raised so one bad file does not stop the batch
+    """
+    start = time.perf_counter()
+    try:
+        name = os.path.splitext(os.path.basename(path))[0]
+        summary, tables = audit_frame(load_ledger(path), standard_delay, interest_rate, terms)
+        paths = write_reports(name, summary, tables, output_dir, formats)
+        return {'input': path, 'summary': summary, 'outputs': paths, 'seconds': time.perf_counter() - start}
+    except Exception as e:
+        return {'input': path, 'error': f"{type(e).__name__}: {e}", 'seconds': time.perf_counter() - start}
+
+
+def _audit_file_args(args):
+    return audit_file(*args)
+
+
+def run(inputs, output_dir='reports', formats=('xlsx',), workers=None,
+        standard_delay=STANDARD_PAYMENT_DELAY, interest_rate=PENALTY_INTEREST_RATE, terms=None):
+    """Audit every input, in a process pool when there are several; results in input order"""
+    tasks = [(path, output_dir, tuple(formats), standard_delay, interest_rate, terms) for path in inputs]
+    if len(tasks) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_audit_file_args, tasks))
+    return [audit_file(*task) for task in tasks]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='supplieranalyzer',
+        description="Batch audit of supplier payment delays (Loi 69-21) without the Streamlit app"
+    )
+    parser.add_argument("inputs", nargs="+", help="ledger files (.csv, .xlsx, .xls) or SQLite snapshots (.db)")
+    parser.add_argument("--output-dir", default="reports")
+    parser.add_argument("--format", dest="formats", nargs="+", choices=OUTPUT_FORMATS, default=["xlsx"])
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--standard-delay", type=int, default=STANDARD_PAYMENT_DELAY, help="days")
+    parser.add_argument("--interest-rate", type=float, default=PENALTY_INTEREST_RATE, help="yearly rate, 0.03 = 3%%")
+    parser.add_argument("--terms", help=f"CSV of negotiated terms per supplier ({', '.join(TERMS_COLUMNS)})")
+    parser.add_argument(
+        "--rate-schedule",
+        help=f"CSV of dated yearly rates ({', '.join(SCHEDULE_COLUMNS)}), replaces --interest-rate"
+    )
+    args = parser.parse_args(argv)
+
+    terms = pd.read_csv(args.terms) if args.terms else None
+    interest_rate = rate_schedule(pd.read_csv(args.rate_schedule)) if args.rate_schedule else args.interest_rate
+    results = run(args.inputs, args.output_dir, args.formats, args.workers, args.standard_delay, interest_rate, terms)
+
+    failed = 0
+    for result in results:
+        if 'error' in result:
+            failed += 1
+            print(f"ERROR  {result['input']}: {result['error']}", file=sys.stderr)
+            continue
+        summary = result['summary']
+        position = summary["Position d'audit"]
+        print(
+            f"OK     {result['input']}: {summary['Nombre total de factures']} invoices, "
+            f"compliance {summary['Taux de conformité']:.1f}%, "
+            f"penalties {summary['Total des pénalités']:,.2f} €, "
+            f"{position} ({result['seconds']:.1f} s)"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
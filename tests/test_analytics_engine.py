@@ -0,0 +1,40 @@
+"""
+analytics_engine.aggregate reuses the rows the caller already loaded instead
+of scanning the suppliers table again with the selected engine
+"""
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SUPPLIERS_DB_PATH", os.path.join(tempfile.mkdtemp(), "test.db"))
+
+import analytics  # noqa: E402
+import analytics_engine  # noqa: E402
+from utils import process_data  # noqa: E402
+
+
+class ScanningEngine:
+    """Stands for DuckDB: any call is a scan of the table"""
+
+    def aggregate(self, name, period='M', **filters):
+        raise AssertionError("the table was scanned again")
+
+
+def test_loaded_rows_are_aggregated_without_a_second_scan(monkeypatch):
+    data = process_data(pd.DataFrame({
+        'Nom du fournisseur': ["Fournisseur A", "Fournisseur B", "Fournisseur A"],
+        'Date de commande': pd.to_datetime(["2024-03-01", "2024-03-15", "2024-04-02"]),
+        'Montant de la commande': [1500.0, 820.5, 300.0],
+        'Date de réception': pd.to_datetime(["2024-03-04", None, "2024-04-05"]),
+        'Date de paiement': pd.to_datetime([None, "2024-04-20", "2024-07-10"]),
+    }))
+    monkeypatch.setattr(analytics_engine, "_engine", ScanningEngine())
+
+    result = analytics_engine.aggregate('supplier_amount_totals', data, supplier="Fournisseur A")
+    pd.testing.assert_frame_equal(result, analytics.supplier_amount_totals(data))
+    result = analytics_engine.aggregate('period_summary', data, period='Q')
+    pd.testing.assert_frame_equal(result, analytics.period_summary(data, 'Date de commande', 'Q'))
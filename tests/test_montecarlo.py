@@ -0,0 +1,49 @@
+"""
+The process-pool fallback of the Monte Carlo simulator gives the same bands
+as the in-process path for the same seed
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import montecarlo  # noqa: E402
+from treasury import TYPE_OPENING, TYPE_OUTFLOW, TYPE_INFLOW  # noqa: E402
+
+TODAY = pd.Timestamp("2025-01-01")
+
+
+def make_ledger(n_rows=60, seed=0):
+    rng = np.random.default_rng(seed)
+    amounts = rng.integers(1000, 20000, n_rows).astype(float)
+    movements = pd.DataFrame({
+        'Date': TODAY + pd.to_timedelta(np.sort(rng.integers(-30, 90, n_rows)), unit="D"),
+        'Type': np.where(rng.random(n_rows) < 0.7, TYPE_OUTFLOW, TYPE_INFLOW),
+        'Fournisseur': 'Fournisseur',
+        'Montant prévu': amounts,
+        'Montant payé': amounts * rng.uniform(0.9, 1.0, n_rows),
+        'Écart': 0.0,
+        'Solde': 0.0,
+    })
+    opening = pd.DataFrame([{
+        'Date': TODAY - pd.Timedelta(days=60), 'Type': TYPE_OPENING, 'Fournisseur': '',
+        'Montant prévu': 200_000.0, 'Montant payé': 200_000.0, 'Écart': 0.0, 'Solde': 0.0
+    }])
+    return pd.concat([opening, movements], ignore_index=True)
+
+
+def test_pool_and_in_process_paths_give_the_same_bands(monkeypatch):
+    monkeypatch.setattr(montecarlo, 'BATCH_PATHS', 500)
+    monkeypatch.setattr(montecarlo, 'POOL_THRESHOLD_PATHS', 1000)
+    processed = pd.DataFrame({'Délai de paiement': [30, 60, 75, 90, 120]})
+    ledger = make_ledger()
+
+    in_process = montecarlo.monte_carlo(ledger, processed, TODAY, horizon_days=90, n_paths=3000, seed=7, workers=1)
+    pooled = montecarlo.monte_carlo(ledger, processed, TODAY, horizon_days=90, n_paths=3000, seed=7, workers=2)
+
+    pd.testing.assert_frame_equal(in_process, pooled)
+    assert in_process['P5'].le(in_process['P95']).all()
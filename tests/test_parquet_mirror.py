@@ -0,0 +1,57 @@
+"""
+A database error while the Parquet mirror reads a month aborts the sync: the
+partition is kept and the month stays stale, then the next sync rewrites it
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SUPPLIERS_DB_PATH", os.path.join(tempfile.mkdtemp(), "test.db"))
+
+import database as db  # noqa: E402
+import parquet_mirror  # noqa: E402
+from utils import process_data  # noqa: E402
+
+
+def make_ledger():
+    return process_data(pd.DataFrame({
+        'Nom du fournisseur': ["Fournisseur A", "Fournisseur B", "Fournisseur A"],
+        'Date de commande': pd.to_datetime(["2024-03-01", "2024-03-15", "2024-04-02"]),
+        'Montant de la commande': [1500.0, 820.5, 300.0],
+        'Date de réception': pd.to_datetime(["2024-03-04", None, "2024-04-05"]),
+        'Date de paiement': pd.to_datetime([None, "2024-04-20", "2024-05-10"]),
+    }))
+
+
+def test_failed_month_read_keeps_the_partition_and_is_retried(monkeypatch):
+    db.delete_all_suppliers()
+    db.add_suppliers_bulk(make_ledger())
+    directory = tempfile.mkdtemp()
+    parquet_mirror.sync_mirror(directory)
+    assert parquet_mirror.read_suppliers(directory=directory)['Montant de la commande'].sum() == 2620.5
+
+    # A new invoice in March, then a read failure (e.g. a locked database) during the sync
+    db.add_suppliers_bulk(make_ledger().iloc[:1])
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(db, "read_order_period", locked)
+    with pytest.raises(sqlite3.OperationalError):
+        parquet_mirror.sync_mirror(directory)
+    assert os.path.exists(os.path.join(directory, "mois=2024-03", parquet_mirror.PARTITION_FILE))
+    assert not parquet_mirror.is_current(directory)
+    assert len(parquet_mirror.read_suppliers(directory=directory)) == 3
+
+    monkeypatch.undo()
+    assert parquet_mirror.sync_mirror(directory) == 1
+    assert parquet_mirror.is_current(directory)
+    assert len(parquet_mirror.read_suppliers(directory=directory)) == 4
@@ -0,0 +1,124 @@
+"""
+Golden cases of the penalty engine (penalties.py through utils.calculate_penalties):
+the former single-rate formula, a rate change during the accrual, negotiated
+terms per supplier, unpaid invoices and invoices paid on their due date
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from penalties import TERMS_COLUMNS, SCHEDULE_COLUMNS, REFERENCE_ORDER, REFERENCE_RECEIPT  # noqa: E402
+from utils import (  # noqa: E402
+    process_data, calculate_penalties, late_days, PENALTY_INTEREST_RATE, STANDARD_PAYMENT_DELAY
+)
+
+
+def make_invoices(rows):
+    """Processed frame of (supplier, order date, amount, receipt date, payment date) rows"""
+    return process_data(pd.DataFrame(rows, columns=[
+        'Nom du fournisseur', 'Date de commande', 'Montant de la commande', 'Date de réception', 'Date de paiement'
+    ]))
+
+
+def make_ledger(n_rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    order_dates = pd.Timestamp("2022-01-01") + pd.to_timedelta(rng.integers(0, 3 * 365, n_rows), unit="D")
+    payment_dates = pd.Series(order_dates + pd.to_timedelta(rng.integers(0, 200, n_rows), unit="D"))
+    payment_dates[rng.random(n_rows) < 0.15] = pd.NaT
+    return process_data(pd.DataFrame({
+        'Nom du fournisseur': np.array(["Fournisseur A", "Fournisseur B", "Fournisseur C"])[rng.integers(0, 3, n_rows)],
+        'Date de commande': order_dates,
+        'Montant de la commande': rng.integers(10_000, 5_000_000, n_rows) / 100,
+        'Date de réception': order_dates + pd.Timedelta(days=7),
+        'Date de paiement': payment_dates.to_numpy(),
+    }))
+
+
+def test_single_rate_gives_the_former_formula():
+    data = make_ledger()
+    result = calculate_penalties(data)
+
+    late = late_days(data['Délai de paiement'], STANDARD_PAYMENT_DELAY)
+    expected = data['Montant de la commande'] * PENALTY_INTEREST_RATE * late / 365
+    np.testing.assert_array_equal(result['Jours de retard'].to_numpy(), late.to_numpy())
+    np.testing.assert_allclose(result['Montant pénalité'], expected, rtol=1e-12, atol=0)
+
+
+def test_single_rate_value():
+    # Due on 2024-03-01 (60 days after the order), paid 40 days later
+    result = calculate_penalties(make_invoices([
+        ("Fournisseur A", "2024-01-01", 10_000.0, "2024-01-05", "2024-04-10"),
+    ]))
+
+    assert result['Jours de retard'].iloc[0] == 40
+    assert result['Montant pénalité'].iloc[0] == pytest.approx(10_000 * 0.03 * 40 / 365)
+
+
+def test_rate_change_during_the_accrual():
+    schedule = pd.DataFrame({
+        SCHEDULE_COLUMNS[0]: pd.to_datetime(["2020-01-01", "2024-03-15"]),
+        SCHEDULE_COLUMNS[1]: [0.03, 0.06],
+    })
+    result = calculate_penalties(make_invoices([
+        # Late from 2024-03-01 to 2024-04-09: 14 days at 3%, then 26 days at 6%
+        ("Fournisseur A", "2024-01-01", 10_000.0, "2024-01-05", "2024-04-10"),
+        # Late entirely after the change
+        ("Fournisseur A", "2024-02-01", 5_000.0, "2024-02-05", "2024-04-20"),
+    ]), interest_rate=schedule)
+
+    assert result['Jours de retard'].tolist() == [40, 19]
+    np.testing.assert_allclose(result['Montant pénalité'], [
+        10_000 * (0.03 * 14 + 0.06 * 26) / 365,
+        5_000 * 0.06 * 19 / 365,
+    ])
+
+
+def test_supplier_terms():
+    terms = pd.DataFrame({
+        TERMS_COLUMNS[0]: ["Fournisseur A", "Fournisseur B"],
+        TERMS_COLUMNS[1]: [30, 45],
+        TERMS_COLUMNS[2]: [REFERENCE_ORDER, REFERENCE_RECEIPT],
+    })
+    result = calculate_penalties(make_invoices([
+        # 30 days from the order: due 2024-01-31, paid 10 days late (on time under the standard delay)
+        ("Fournisseur A", "2024-01-01", 10_000.0, "2024-01-20", "2024-02-10"),
+        # 45 days from the receipt: due 2024-03-05, paid 5 days late
+        ("Fournisseur B", "2024-01-01", 10_000.0, "2024-01-20", "2024-03-10"),
+        # Receipt date missing: 45 days from the order, due 2024-02-15
+        ("Fournisseur B", "2024-01-01", 10_000.0, None, "2024-02-20"),
+        # No terms: the standard 60 days from the order
+        ("Fournisseur C", "2024-01-01", 10_000.0, "2024-01-20", "2024-03-11"),
+    ]), terms=terms)
+
+    assert result['Jours de retard'].tolist() == [10, 5, 5, 10]
+    np.testing.assert_allclose(result['Montant pénalité'], 10_000 * 0.03 * np.array([10, 5, 5, 10]) / 365)
+    assert result['Statut du paiement'].tolist() == ['En retard'] * 4
+
+
+def test_unpaid_invoices_accrue_nothing():
+    result = calculate_penalties(make_invoices([
+        ("Fournisseur A", "2020-01-01", 10_000.0, "2020-01-05", None),
+        ("Fournisseur A", "2024-01-01", 10_000.0, "2024-01-05", "2024-04-10"),
+    ]), interest_rate=0.05)
+
+    assert result['Jours de retard'].tolist() == [0, 40]
+    assert result['Montant pénalité'].iloc[0] == 0
+    assert result['Statut du paiement'].iloc[0] == 'Non payé'
+
+
+def test_payment_on_the_due_date_is_not_late():
+    result = calculate_penalties(make_invoices([
+        ("Fournisseur A", "2024-01-01", 10_000.0, "2024-01-05", "2024-03-01"),
+        ("Fournisseur A", "2024-01-01", 10_000.0, "2024-01-05", "2024-03-02"),
+        ("Fournisseur A", "2024-01-01", 10_000.0, "2024-01-05", "2024-01-01"),
+    ]))
+
+    assert result['Jours de retard'].tolist() == [0, 1, 0]
+    np.testing.assert_allclose(result['Montant pénalité'], [0, 10_000 * 0.03 / 365, 0])
+    assert result['Statut du paiement'].tolist() == ['Dans les délais', 'En retard', 'Dans les délais']
@@ -0,0 +1,66 @@
+"""
+The batch audit reads SQLite snapshots created before the invoice number
+column (baseline schema of the suppliers table) without migrating them
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SUPPLIERS_DB_PATH", os.path.join(tempfile.mkdtemp(), "test.db"))
+
+import database as db  # noqa: E402
+from supplieranalyzer import load_ledger, audit_frame  # noqa: E402
+
+BASELINE_SCHEMA = """
+CREATE TABLE suppliers (
+    id INTEGER NOT NULL,
+    nom_fournisseur VARCHAR(100) NOT NULL,
+    date_commande DATE NOT NULL,
+    montant_commande FLOAT NOT NULL,
+    date_reception DATE,
+    date_paiement DATE,
+    delai_paiement INTEGER,
+    jours_retard INTEGER,
+    statut_paiement VARCHAR(20),
+    montant_penalite FLOAT,
+    PRIMARY KEY (id)
+)
+"""
+
+
+def make_baseline_snapshot(path):
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute(BASELINE_SCHEMA)
+        connection.executemany(
+            "INSERT INTO suppliers (nom_fournisseur, date_commande, montant_commande, date_reception, "
+            "date_paiement, delai_paiement) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                ("Fournisseur A", "2024-01-01", 10000.0, "2024-01-05", "2024-04-10", 100),
+                ("Fournisseur B", "2024-02-01", 2500.0, None, None, None),
+            ]
+        )
+    connection.close()
+
+
+def test_baseline_snapshot_is_read_without_invoice_numbers():
+    path = os.path.join(tempfile.mkdtemp(), "old.db")
+    make_baseline_snapshot(path)
+
+    df = db.read_suppliers_snapshot(path)
+    assert list(df.columns) == ['id'] + list(db.COLUMN_MAPPING)
+    assert len(df) == 2
+    assert df['Numéro de facture'].isna().all()
+
+    # Read-only: the snapshot is not migrated
+    connection = sqlite3.connect(path)
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(suppliers)")}
+    connection.close()
+    assert 'numero_facture' not in columns
+
+    summary, _ = audit_frame(load_ledger(path))
+    assert summary['Nombre total de factures'] == 2
+    assert summary['Factures non conformes'] == 1
@@ -0,0 +1,91 @@
+"""
+The late-payment figures of the delay analysis page are the same whether they
+come from the monthly summary table (database source) or from the invoice rows
+(uploaded file, or a partial delay range), unpaid invoices included in the data,
+and the compliance rates are taken over the paid invoices only
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["SUPPLIERS_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "test.db")
+
+import analytics  # noqa: E402
+import database as db  # noqa: E402
+from utils import process_data, calculate_penalties  # noqa: E402
+
+
+def make_ledger(n_rows=600, seed=0):
+    rng = np.random.default_rng(seed)
+    order_dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, n_rows), unit="D")
+    payment_dates = pd.Series(order_dates + pd.to_timedelta(rng.integers(10, 150, n_rows), unit="D"))
+    payment_dates[rng.random(n_rows) < 0.2] = pd.NaT
+    return pd.DataFrame({
+        'Nom du fournisseur': np.array(["Fournisseur A", "Fournisseur B", "Fournisseur C"])[rng.integers(0, 3, n_rows)],
+        'Date de commande': order_dates,
+        'Montant de la commande': rng.integers(100_000, 5_000_000, n_rows) / 100,
+        'Date de réception': order_dates + pd.Timedelta(days=7),
+        'Date de paiement': payment_dates.to_numpy(),
+    })
+
+
+@pytest.fixture(scope="module")
+def ledger():
+    processed = process_data(make_ledger())
+    db.delete_all_suppliers()
+    db.add_suppliers_from_dataframe(processed)
+    return processed
+
+
+def row_figures(rows):
+    """Page 1 on the invoice rows: the delay filter keeps the paid invoices only"""
+    paid = rows[rows['Délai de paiement'].notna()]
+    return int((paid['Statut du paiement'] == 'En retard').sum()), len(paid)
+
+
+@pytest.mark.parametrize("supplier, status", [
+    (None, None),
+    ("Fournisseur B", None),
+    (None, "En retard"),
+    (None, "Non payé"),
+])
+def test_summary_and_row_paths_count_the_same_invoices(ledger, supplier, status):
+    rows = ledger
+    if supplier is not None:
+        rows = rows[rows['Nom du fournisseur'] == supplier]
+    if status is not None:
+        rows = rows[rows['Statut du paiement'] == status]
+
+    metrics = analytics.summary_metrics(db.get_supplier_month_summary(supplier=supplier, status=status))
+
+    assert (metrics['Factures en retard'], metrics['Factures payées']) == row_figures(rows)
+
+
+def test_invoice_count_still_includes_unpaid_invoices(ledger):
+    metrics = analytics.summary_metrics(db.get_supplier_month_summary())
+
+    assert metrics['Nombre de factures'] == len(ledger)
+    assert metrics['Nombre de factures'] - metrics['Factures payées'] == ledger['Date de paiement'].isna().sum()
+
+
+@pytest.mark.parametrize("period", ["M", "Q"])
+def test_compliance_rate_is_over_paid_invoices(ledger, period):
+    rows = analytics.period_summary(ledger, 'Date de commande', period)
+    summary = analytics.summary_period(db.get_supplier_month_summary(), period)
+    column = analytics.PERIOD_COLUMNS[period]
+
+    paid = ledger[ledger['Délai de paiement'].notna()]
+    periods = analytics.period_labels(analytics.period_start(pd.to_datetime(paid['Date de commande']), period), period)
+    on_time = (paid['Statut du paiement'] == 'Dans les délais').groupby(periods.to_numpy()).mean() * 100
+    np.testing.assert_allclose(rows.set_index(column)['Taux de conformité'], on_time.loc[rows[column]])
+    np.testing.assert_allclose(summary['Taux de conformité'], rows['Taux de conformité'])
+
+    audit = analytics.audit_summary(calculate_penalties(ledger))
+    assert audit['Factures payées'] == len(paid)
+    assert audit['Taux de conformité'] == pytest.approx((paid['Statut du paiement'] == 'Dans les délais').mean() * 100)
@@ -0,0 +1,111 @@
+"""
+Re-importing a ledger with database.upsert_suppliers never duplicates its
+invoices, with or without invoice numbers, and a duplicate invoice number left
+in the table by an older version does not block the imports
+"""
+import io
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SUPPLIERS_DB_PATH", os.path.join(tempfile.mkdtemp(), "test.db"))
+
+import database as db  # noqa: E402
+from ingestion import ingest_upload, database_sink  # noqa: E402
+from utils import process_data  # noqa: E402
+
+
+def make_ledger(numbers=None):
+    """Three invoices, the first two identical (same supplier, dates and amount)"""
+    ledger = pd.DataFrame({
+        'Nom du fournisseur': ["Fournisseur A", "Fournisseur A", "Fournisseur B"],
+        'Date de commande': pd.to_datetime(["2024-03-01", "2024-03-01", "2024-03-05"]),
+        'Montant de la commande': [1500.0, 1500.0, 820.5],
+        'Date de réception': pd.to_datetime(["2024-03-04", "2024-03-04", None]),
+        'Date de paiement': pd.to_datetime([None, None, "2024-04-20"]),
+    })
+    if numbers is not None:
+        ledger['Numéro de facture'] = numbers
+    return process_data(ledger)
+
+
+@pytest.fixture(autouse=True)
+def empty_table():
+    db.delete_all_suppliers()
+    yield
+    db.delete_all_suppliers()
+
+
+def test_reimport_without_invoice_numbers_updates_instead_of_duplicating():
+    assert db.upsert_suppliers(make_ledger()) == (3, 0, 0)
+    assert db.upsert_suppliers(make_ledger()) == (0, 0, 3)
+
+    paid = make_ledger()
+    paid.loc[1, 'Date de paiement'] = pd.Timestamp("2024-04-10")
+    assert db.upsert_suppliers(process_data(paid)) == (0, 1, 2)
+
+    stored = db.get_suppliers_dataframe()
+    # The identical invoices stay two rows: only one of them was paid
+    assert len(stored) == 3
+    assert stored['Date de paiement'].notna().sum() == 2
+
+
+def test_rows_with_and_without_numbers_are_matched_separately():
+    db.upsert_suppliers(make_ledger(numbers=["F1", "F2", None]))
+    assert db.upsert_suppliers(make_ledger(numbers=["F1", "F2", None])) == (0, 0, 3)
+    # Same values as the numbered invoices, but without a number: new rows
+    assert db.upsert_suppliers(make_ledger()) == (2, 0, 1)
+    assert len(db.get_suppliers_dataframe()) == 5
+
+
+def test_duplicate_invoice_numbers_in_the_table_do_not_block_imports():
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql(f"DROP INDEX IF EXISTS {db.INVOICE_KEY_INDEX}")
+    db.add_suppliers_bulk(make_ledger(numbers=["F1", "F1", "F3"]))
+    assert len(db.get_duplicate_invoices()) == 1
+
+    paid = make_ledger(numbers=["F1", "F1", "F3"]).iloc[1:]
+    paid.loc[1, 'Date de paiement'] = pd.Timestamp("2024-04-10")
+    assert db.upsert_suppliers(process_data(paid)) == (0, 1, 1)
+    assert db.upsert_suppliers(make_ledger(numbers=["F4", None, None]).iloc[:1]) == (1, 0, 0)
+
+    stored = db.get_suppliers_dataframe().sort_values('id')
+    assert len(stored) == 4
+    # The first stored row of the duplicated number is the one updated
+    assert stored['Date de paiement'].notna().tolist() == [True, False, True, False]
+
+
+def test_other_keys_do_not_leave_a_unique_index():
+    ledger = make_ledger(numbers=["F1", "F2", "F3"])
+    key = ('nom_fournisseur', 'date_commande', 'montant_commande')
+    # The first two invoices share the key: the last one wins, like duplicate invoice numbers
+    assert db.upsert_suppliers(ledger, key=key) == (2, 0, 1)
+    assert db.upsert_suppliers(ledger, key=key) == (0, 0, 3)
+
+    indexes = {index['name'] for index in db.inspect(db.engine).get_indexes('suppliers')}
+    assert indexes <= {index.name for index in db.Supplier.__table__.indexes}
+    # Identical rows can still be added by the other writes
+    assert db.add_suppliers_bulk(make_ledger()) == (3, 3)
+
+
+@pytest.mark.parametrize("extension", [".csv", ".xlsx"])
+def test_number_like_invoice_numbers_keep_their_leading_zeros(extension):
+    ledger = make_ledger(numbers=["00123", "123", "7.50"])[
+        ['Nom du fournisseur', 'Date de commande', 'Montant de la commande', 'Date de réception',
+         'Date de paiement', 'Numéro de facture']
+    ]
+    source = io.BytesIO()
+    if extension == ".csv":
+        ledger.to_csv(source, index=False)
+    else:
+        ledger.to_excel(source, index=False)
+    source.seek(0)
+
+    assert ingest_upload(source, f"ledger{extension}", sink=database_sink) == (3, 3)
+    stored = db.get_suppliers_dataframe().sort_values('id')
+    assert stored['Numéro de facture'].tolist() == ["00123", "123", "7.50"]
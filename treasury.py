@@ -0,0 +1,171 @@
+"""
+Treasury ledger engine of the cash tracking page
+
+A ledger is a DataFrame of movements (Date, Type, Fournisseur, Montant prévu,
+Montant payé, Écart, Solde, Notes). Each movement is turned into a signed cash
+flow (+ opening balance and inflows, - outflows, 0 otherwise) and 'Solde' is
+the cumulative sum of those flows over the date-sorted ledger.
+
+The ledger is persisted in the treasury_movements table of the database, which
+maintains the same running balance on insert; carry_forward lets a date window
+of that table be used as a ledger on its own.
+
+Scenario transforms (opening balance, date shift, outflow scaling, funding)
+are vector operations that return a new ledger without balances; they can be
+chained freely and compute_balances is applied once at the end.
+"""
+import numpy as np
+import pandas as pd
+
+TYPE_OPENING = 'Solde initial'
+TYPE_OUTFLOW = 'Décaissement'
+TYPE_INFLOW = 'Encaissement'
+TYPE_OTHER = 'Autre'
+
+AMOUNT_COLUMNS = ['Montant prévu', 'Montant payé']
+
+
+def signed_flows(ledger, amount_column='Montant payé', include_opening=True):
+    """Cash flow of each movement: + for the opening balance and inflows, - for outflows, 0 otherwise"""
+    types = ledger['Type'].to_numpy()
+    amounts = pd.to_numeric(ledger[amount_column], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+    signs = np.select(
+        [types == TYPE_INFLOW, types == TYPE_OUTFLOW, types == TYPE_OPENING],
+        [1.0, -1.0, 1.0 if include_opening else 0.0],
+        default=0.0
+    )
+    return signs * amounts
+
+
+def _dates(ledger):
+    """Date column as datetime64 (the session ledger may still hold ISO strings)"""
+    dates = ledger['Date']
+    if pd.api.types.is_datetime64_any_dtype(dates.dtype):
+        return dates
+    return pd.to_datetime(dates)
+
+
+def sort_ledger(ledger):
+    """
+    Sort the movements by date, the opening balance first on its day
+    The sort is stable: movements of the same day keep their entry order
+    """
+    ledger = ledger.assign(Date=_dates(ledger))
+    not_opening = (ledger['Type'] != TYPE_OPENING).to_numpy()
+    order = np.lexsort((not_opening, ledger['Date'].to_numpy()))
+    return ledger.iloc[order].reset_index(drop=True)
+
+
+def compute_balances(ledger, amount_column='Montant payé'):
+    """Date-sorted copy of the ledger with 'Solde' recomputed as the running sum of the signed flows"""
+    ledger = sort_ledger(ledger)
+    ledger['Solde'] = np.cumsum(signed_flows(ledger, amount_column))
+    return ledger
+
+
+def carry_forward(ledger, balance, date, label='Solde reporté'):
+    """
+    Prepend an opening-balance row carrying the balance at date, so a ledger
+    window that starts after the real opening balance keeps its running balances
+    """
+    if balance is None:
+        return ledger
+    opening = pd.DataFrame([{
+        'Date': pd.Timestamp(date),
+        'Type': TYPE_OPENING,
+        'Fournisseur': '',
+        'Montant prévu': balance,
+        'Montant payé': balance,
+        'Écart': 0.0,
+        'Solde': balance,
+        'Notes': label
+    }])
+    return pd.concat([opening, ledger], ignore_index=True)
+
+
+def insert_movement(ledger, movement):
+    """
+    Insert one movement (dict) at its place in a date-sorted ledger and
+    recompute the balances
+    """
+    entry = pd.DataFrame([movement])
+    entry['Date'] = pd.to_datetime(entry['Date'])
+    ledger = sort_ledger(ledger)
+    position = int(ledger['Date'].searchsorted(entry['Date'].iloc[0], side='right'))
+    ledger = pd.concat([ledger.iloc[:position], entry, ledger.iloc[position:]], ignore_index=True)
+    return compute_balances(ledger)
+
+
+def _future(ledger, today):
+    return (_dates(ledger) > pd.Timestamp(today)).to_numpy()
+
+
+def _amounts(ledger, column):
+    return pd.to_numeric(ledger[column], errors='coerce').to_numpy(dtype=np.float64)
+
+
+def set_opening_balance(ledger, amount):
+    """Scenario transform: replace the opening balance"""
+    opening = (ledger['Type'] == TYPE_OPENING).to_numpy()
+    return ledger.assign(**{
+        column: np.where(opening, amount, _amounts(ledger, column)) for column in AMOUNT_COLUMNS
+    })
+
+
+def shift_dates(ledger, days, today):
+    """Scenario transform: move every movement after today by a number of days"""
+    dates = _dates(ledger)
+    future = _future(ledger, today)
+    return ledger.assign(Date=dates.where(~future, dates + pd.Timedelta(days=days)))
+
+
+def scale_outflows(ledger, factor, today):
+    """Scenario transform: multiply the expected and paid amounts of outflows after today"""
+    outflows = _future(ledger, today) & (ledger['Type'] == TYPE_OUTFLOW).to_numpy()
+    return ledger.assign(**{
+        column: np.where(outflows, _amounts(ledger, column) * factor, _amounts(ledger, column))
+        for column in AMOUNT_COLUMNS
+    })
+
+
+def inject_funding(ledger, amount, today, label="Financement d'urgence"):
+    """Scenario transform: add an inflow of amount on the first movement date after today (if any)"""
+    future_dates = _dates(ledger)[_future(ledger, today)]
+    if future_dates.empty:
+        return ledger
+    funding = pd.DataFrame([{
+        'Date': future_dates.min(),
+        'Type': TYPE_INFLOW,
+        'Fournisseur': label,
+        'Montant prévu': amount,
+        'Montant payé': amount,
+        'Écart': 0,
+        'Solde': 0.0,
+        'Notes': f"{label} (simulation)"
+    }])
+    return pd.concat([ledger, funding], ignore_index=True)
+
+
+def simulate_scenario(ledger, today, opening_balance=None, delay_days=0, outflow_reduction=0.0, funding=0.0):
+    """
+    Chain the scenario transforms and recompute the balances once
+    outflow_reduction is a fraction (0.2 = future outflows reduced by 20%)
+    """
+    scenario = ledger
+    if opening_balance is not None:
+        scenario = set_opening_balance(scenario, opening_balance)
+    if delay_days:
+        scenario = shift_dates(scenario, delay_days, today)
+    if outflow_reduction:
+        scenario = scale_outflows(scenario, 1 - outflow_reduction, today)
+    if funding:
+        scenario = inject_funding(scenario, funding, today)
+    return compute_balances(scenario)
+
+
+def projected_balance(ledger, current_balance, today, days=30):
+    """Current balance plus the expected inflows minus the expected outflows of the next days"""
+    dates = _dates(ledger)
+    window = ((dates > pd.Timestamp(today)) & (dates <= pd.Timestamp(today) + pd.Timedelta(days=days))).to_numpy()
+    flows = signed_flows(ledger, 'Montant prévu', include_opening=False)
+    return current_balance + flows[window].sum()
@@ -0,0 +1,124 @@
+"""
+On-disk cache of processed uploads, addressed by the SHA-256 of the file bytes
+
+Re-uploading a ledger that was already processed loads the typed frame from
+a pickle (categoricals and datetimes included) instead of parsing the xlsx
+again. Entries are evicted least recently used first once the cache exceeds
+its size limit, and entries written under another processing-rules version
+are ignored and purged.
+"""
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+from utils import PROCESSING_RULES_VERSION
+
+UPLOAD_CACHE_DIR = os.environ.get("UPLOAD_CACHE_DIR", "data/upload_cache")
+
+# Upper bound on the disk space used by cached uploads, in MB
+UPLOAD_CACHE_MAX_MB = float(os.environ.get("UPLOAD_CACHE_MAX_MB", "512"))
+
+# Pickle rather than Parquet: uploaded columns that Arrow cannot type (mixed
+# values in an object column) round-trip unchanged, and so does every dtype
+CACHE_SUFFIX = ".pkl"
+
+
+def file_digest(data):
+    """SHA-256 of the uploaded bytes, as a hex string"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def stream_digest(source, block_size=1 << 20):
+    """file_digest of a seekable file object, read block by block, then rewound"""
+    digest = hashlib.sha256()
+    source.seek(0)
+    for block in iter(lambda: source.read(block_size), b""):
+        digest.update(block)
+    source.seek(0)
+    return digest.hexdigest()
+
+
+class UploadCache:
+    """Directory of processed frames named <sha256>-v<rules version>.pkl, with LRU eviction on the access time"""
+
+    def __init__(self, directory, max_bytes, rules_version):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rules_version = str(rules_version)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.purge_stale()
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f"{digest}-v{self.rules_version}{CACHE_SUFFIX}")
+
+    def _entries(self):
+        """(path, size, last use) of every cached file"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def purge_stale(self):
+        """Delete the entries written under another processing-rules version"""
+        current = f"-v{self.rules_version}{CACHE_SUFFIX}"
+        for path, _, _ in self._entries():
+            if not path.endswith(current):
+                self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def get(self, digest):
+        """Processed frame of an upload, or None when it is not cached"""
+        path = self._path(digest)
+        if not os.path.exists(path):
+            return None
+        try:
+            df = pd.read_pickle(path)
+        except Exception:
+            # Truncated or unreadable entry: drop it and process the file again
+            self._remove(path)
+            return None
+        # Mark the entry as recently used for the LRU eviction
+        os.utime(path)
+        return df
+
+    def put(self, digest, df):
+        """Store the processed frame of an upload, then evict down to the size limit"""
+        path = self._path(digest)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits in max_bytes"""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+    @property
+    def size_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+
+upload_cache = UploadCache(UPLOAD_CACHE_DIR, int(UPLOAD_CACHE_MAX_MB * 1024 * 1024), PROCESSING_RULES_VERSION)
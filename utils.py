@@ -1,13 +1,16 @@
 import pandas as pd
 import numpy as np
-import streamlit as st
-from datetime import datetime, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
 import io
+from penalties import accrue_penalties
+from schema import apply_schema, PAYMENT_STATUSES
 
 # Constants for Law 69-21
 PENALTY_INTEREST_RATE = 0.03  # 3% as an example from Law 69-21
+STANDARD_PAYMENT_DELAY = 60  # Standard payment delay in days (assumed 60 days)
+
+# Version of the rules applied by process_data (delays, statuses, schema)
+# Bump it whenever they change: processed uploads cached on disk are then discarded
+PROCESSING_RULES_VERSION = f"2-{STANDARD_PAYMENT_DELAY}"
 
 def load_sample_data():
     """
@@ -25,7 +28,28 @@ def load_sample_data():
     ])
     return df
 
-def process_data(df):
+def payment_status(delays, standard_delay=STANDARD_PAYMENT_DELAY):
+    """
+    Classify payment delays as on time, late or unpaid (missing delay)
+    Returns a categorical Series aligned with the input
+    """
+    delays = pd.to_numeric(pd.Series(delays), errors='coerce')
+    values = delays.to_numpy(dtype=float)
+    codes = np.where(np.isnan(values), 2, np.where(values <= standard_delay, 0, 1))
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=PAYMENT_STATUSES),
+        index=delays.index
+    )
+
+def late_days(delays, standard_delay=STANDARD_PAYMENT_DELAY):
+    """
+    Calculate days of delay beyond the standard delay
+    Unpaid invoices (missing delay) count as 0 days
+    """
+    delays = pd.to_numeric(pd.Series(delays), errors='coerce')
+    return (delays - standard_delay).clip(lower=0).fillna(0)
+
+def process_data(df, standard_delay=STANDARD_PAYMENT_DELAY):
     """
     Process the uploaded data to calculate payment delays and status
     """
@@ -42,23 +66,24 @@ def process_data(df):
     if 'Date de commande' in df.columns and 'Date de paiement' in df.columns:
         df['Délai de paiement'] = (df['Date de paiement'] - df['Date de commande']).dt.days
     
-    # Determine payment status (assuming 60 days is the standard delay)
+    # Determine payment status (60 days by default, see STANDARD_PAYMENT_DELAY)
     # This threshold can be adjusted based on Law 69-21 specifications
-    standard_delay = 60
     if 'Délai de paiement' in df.columns:
-        df['Statut du paiement'] = df['Délai de paiement'].apply(
-            lambda x: 'Dans les délais' if x <= standard_delay else 'En retard'
-        )
+        df['Statut du paiement'] = payment_status(df['Délai de paiement'], standard_delay)
     
     # Ensure monetary values are numeric
     if 'Montant de la commande' in df.columns:
         df['Montant de la commande'] = pd.to_numeric(df['Montant de la commande'], errors='coerce')
     
-    return df
+    # Store the result with the compact in-memory dtypes (see schema.py)
+    return apply_schema(df)
 
-def calculate_penalties(df):
+def calculate_penalties(df, standard_delay=STANDARD_PAYMENT_DELAY, interest_rate=PENALTY_INTEREST_RATE, terms=None):
     """
     Calculate penalties for late payments according to Law 69-21
+    interest_rate is a yearly rate or a dated rate schedule and terms an optional
+    table of negotiated delays per supplier (see penalties.py); suppliers without
+    terms fall due standard_delay days after the order date
     """
     if df.empty:
         return df
@@ -66,21 +91,18 @@ def calculate_penalties(df):
     # Create a copy to avoid modifying the original
     df_with_penalties = df.copy()
     
-    # Standard delay based on Law 69-21 (assumed 60 days)
-    standard_delay = 60
+    # Days of delay beyond the due date and penalty amount, accrued over the rate periods
+    # Penalty = (Amount * Interest Rate * Days of Delay) / 365 within a single rate period
+    late, penalty = accrue_penalties(df_with_penalties, terms, interest_rate, standard_delay)
+    df_with_penalties['Jours de retard'] = late
+    df_with_penalties['Montant pénalité'] = penalty
     
-    # Calculate days of delay beyond standard
-    df_with_penalties['Jours de retard'] = df_with_penalties['Délai de paiement'].apply(
-        lambda x: max(0, x - standard_delay)
-    )
-    
-    # Calculate penalty amount based on the law
-    # Penalty = (Amount * Interest Rate * Days of Delay) / 365
-    df_with_penalties['Montant pénalité'] = (
-        df_with_penalties['Montant de la commande'] * 
-        PENALTY_INTEREST_RATE * 
-        df_with_penalties['Jours de retard']
-    ) / 365
+    # Negotiated terms decide which paid invoices are late
+    if terms is not None and not terms.empty:
+        paid = df_with_penalties['Date de paiement'].notna().to_numpy()
+        df_with_penalties['Statut du paiement'] = payment_status(
+            pd.Series(np.where(paid, late, np.nan), index=df_with_penalties.index), 0
+        )
     
     return df_with_penalties
 
@@ -116,6 +138,9 @@ def create_gauge_chart(value, min_val, max_val, threshold_bad, threshold_good, t
     """
     Create a gauge chart for visualization of financial metrics
     """
+    # Plotly is only needed by the ratio page: imported here so the calculations load without it
+    import plotly.graph_objects as go
+    
     # Determine color based on thresholds
     if value <= threshold_bad:
         color = "red"